@@ -1,17 +1,37 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
-import json
 import base64
-import uuid
+import math
 import re
 import sys
+import itertools
 import threading
 import time
+import traceback
+from storage import file_signature, file_lock, parse_json_lines, load_json_file, save_json_lines
+from marker_store import MarkerStore, JOURNAL_SUFFIX
+from marker_clusters import ClusterCache
+from preset_catalog import AssetIndex, PresetCatalog
+from image_info import ImageSizeCache
+from tiles import TileCache
+from thumbnails import ThumbnailCache
+from image_store import ImageStore, is_internal_file
+from item_details_store import ItemDetailsStore
+from search_index import SearchIndex, preset_documents, marker_documents, item_details_documents
+from item_locations import ItemLocationIndex, DROP_FIELDS, preset_contributions, marker_contributions
+from loot_yield import LootYieldEngine
+from http_cache import versioned_etag, not_modified, set_immutable, finalize_response
+from metrics import metrics, install_io_hooks
+from change_log import ChangeLog
 try:
-    from version_checker import get_window_title
+    from version_checker import get_cached_window_title, check_version_in_background
 except ImportError:
-    def get_window_title():
+    def get_cached_window_title(cache_file):
         return "Abiotic Factor Interactive Maps"
+    
+    def check_version_in_background(cache_file, on_title):
+        return None
 
 # Handle PyInstaller bundle paths
 def get_base_dir():
@@ -24,6 +44,8 @@ def get_base_dir():
 
 # Get the directory containing this script and its parent directory
 BASE_DIR = get_base_dir()
+# The data folder can be pointed elsewhere, e.g. at a generated tree by benchmarks/bench_api.py
+DATA_DIR = os.environ.get("ABIOTIC_MAPS_DATA_DIR") or os.path.join(BASE_DIR, "data")
 
 # Handle template and static folders for both script and executable modes
 if getattr(sys, 'frozen', False):
@@ -42,21 +64,64 @@ app = Flask(__name__,
 
 SHOW_HTTP_LOGS = True
 DEBUG_MODE = False
-
-PRESET_FOLDER = os.path.join(BASE_DIR, "data", "presets")
-MAPS_FOLDER = os.path.join(BASE_DIR, "data", "app-data", "maps")
-MAPS_LOADING_ORDER_FILE = os.path.join(BASE_DIR, "data", "app-data", "maps", "maps-loading-order.json")
+# Set by server.py when several worker processes share the data folder
+MULTI_PROCESS = os.environ.get("ABIOTIC_MAPS_MULTIPROCESS") == "1"
+# Requests slower than this many milliseconds are logged, and profiled when ABIOTIC_MAPS_PROFILE_SLOW=1
+SLOW_REQUEST_MS = float(os.environ.get("ABIOTIC_MAPS_SLOW_REQUEST_MS") or 0)
+PROFILE_SLOW_REQUESTS = SLOW_REQUEST_MS > 0 and os.environ.get("ABIOTIC_MAPS_PROFILE_SLOW") == "1"
+
+PRESET_FOLDER = os.path.join(DATA_DIR, "presets")
+ASSETS_FOLDER = os.path.join(DATA_DIR, "assets")
+MAPS_FOLDER = os.path.join(DATA_DIR, "app-data", "maps")
+MAPS_LOADING_ORDER_FILE = os.path.join(DATA_DIR, "app-data", "maps", "maps-loading-order.json")
+CACHE_FOLDER = os.path.join(DATA_DIR, "app-data", "cache")
+PINNED_FILE = os.path.join(DATA_DIR, "app-data", "pinned.txt")
+TEMPLATES_FOLDER = os.path.join(static_folder, "templates")
 
 SUPPORTED_IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.webp']
 DEFAULT_IMAGE = "Unknown.png"
 DEFAULT_MAP_SIZE = [1280, 720]
+HASHED_IMAGE_PATTERN = re.compile(r"^[0-9a-f]{32}\.\w+$")
+VERSION_CACHE_FILE = os.path.join(CACHE_FOLDER, "version-check.json")
+PROFILES_FOLDER = os.path.join(CACHE_FOLDER, "profiles")
+CHANGES_FILE = os.path.join(CACHE_FOLDER, "changes.txt")
+SERVER_URL = "http://127.0.0.1:5000"
+MAX_UPLOAD_SIZE = 32 * 1024 * 1024
+# Werkzeug stops reading any body past this with a 413, even one sent without a Content-Length;
+# the headroom covers the multipart framing and form fields around an upload
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE + 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+# How often the search and where-to-find indexes look for files changed outside the app
+INDEX_RESCAN_INTERVAL = 5.0
+EXPORT_FORMAT_VERSION = 1
+
+change_log = ChangeLog(CHANGES_FILE, MAPS_FOLDER)
+marker_store = MarkerStore(change_log=change_log, upgrade_legacy_marker=lambda marker: upgrade_legacy_marker(marker))
+cluster_cache = ClusterCache(marker_store)
+asset_index = AssetIndex(ASSETS_FOLDER)
+image_size_cache = ImageSizeCache(os.path.join(CACHE_FOLDER, "image-sizes.json"))
+tile_cache = TileCache(os.path.join(CACHE_FOLDER, "tiles"))
+thumbnail_cache = ThumbnailCache(os.path.join(CACHE_FOLDER, "thumbnails"))
+image_store = ImageStore()
+template_cache = {}
+# Write-behind would keep edits in one worker's memory where the others cannot see them
+item_details_store = ItemDetailsStore(write_delay=0 if MULTI_PROCESS else 1.0, change_log=change_log)
+search_index = SearchIndex()
+item_location_index = ItemLocationIndex()
+loot_yield_engine = LootYieldEngine(marker_store)
+# Only one profiler can be active per process, so concurrent slow requests take turns
+profiler_lock = threading.Lock()
+profile_counter = itertools.count(1)
+index_refresh_state = {}
+index_refresh_lock = threading.Lock()
+install_io_hooks()
 
 def validate_and_fix_image_path(entry, assets_folder):
     if "image" in entry:
         img_val = entry["image"]
         if isinstance(img_val, str) and not (img_val.startswith("http://") or img_val.startswith("https://")):
-            image_path = os.path.join(assets_folder, img_val)
-            if not os.path.exists(image_path):
+            if not asset_index.exists(os.path.join(assets_folder, img_val)):
                 entry["image"] = DEFAULT_IMAGE
         elif not isinstance(img_val, str):
             entry["image"] = DEFAULT_IMAGE
@@ -64,38 +129,6 @@ def validate_and_fix_image_path(entry, assets_folder):
 def normalize_map_path(map_path):
     return map_path.replace('\\', '/')
 
-def parse_json_lines(file_path):
-    results = []
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    try:
-                        results.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        pass
-    return results
-
-def load_json_file(file_path, default=None):
-    if not os.path.exists(file_path):
-        return default or {}
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return default or {}
-
-def save_json_file(file_path, data):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-def save_json_lines(file_path, items):
-    with open(file_path, "w") as f:
-        for item in items:
-            f.write(json.dumps(item) + "\n")
-
 def validate_request_data(data, required_fields=None):
     if not data:
         return False, "No data provided"
@@ -109,27 +142,23 @@ def handle_exceptions(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except RequestEntityTooLarge:
+            return jsonify({"error": "Request is too large"}), 413
         except Exception as e:
             print(f"Error in {func.__name__}: {e}")
+            traceback.print_exc()
             return jsonify({"error": str(e)}), 500
     wrapper.__name__ = func.__name__
     return wrapper
 
 def process_preset_entries(file_path, assets_folder):
-    entries = []
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    try:
-                        entry = json.loads(line)
-                        validate_and_fix_image_path(entry, assets_folder)
-                        entries.append(entry)
-                    except json.JSONDecodeError:
-                        pass
+    entries = parse_json_lines(file_path)
+    for entry in entries:
+        validate_and_fix_image_path(entry, assets_folder)
     return entries
 
+preset_catalog = PresetCatalog(PRESET_FOLDER, asset_index, process_preset_entries)
+
 
 def get_map_folder_path(map_path):
     parts = map_path.split('/')
@@ -165,31 +194,134 @@ def get_map_image_path(map_path):
     map_filename = os.path.basename(map_path)
     return os.path.join(map_folder, map_filename)
 
+def upgrade_legacy_marker(marker):
+    """Rescale a marker placed when every map was shown in a DEFAULT_MAP_SIZE frame to its image's real size.
+
+    Returns None while the map image is missing or unreadable, so the file is left to be upgraded later.
+    """
+    map_path = marker.get("map")
+    if not isinstance(map_path, str) or not isinstance(marker.get("x"), (int, float)) or not isinstance(marker.get("y"), (int, float)):
+        return marker
+    map_path = normalize_map_path(map_path)
+    size = image_size_cache.get(get_map_image_path(map_path), map_path)
+    if not size:
+        return None
+    if list(size) == DEFAULT_MAP_SIZE:
+        return marker
+    return dict(marker, x=marker["x"] * size[0] / DEFAULT_MAP_SIZE[0], y=marker["y"] * size[1] / DEFAULT_MAP_SIZE[1])
+
+if os.path.exists(MAPS_FOLDER):
+    marker_store.index_folder(MAPS_FOLDER)
+
 def load_markers_for_map(map_path):
-    marker_file = get_marker_file_path(map_path)
-    return parse_json_lines(marker_file)
+    return marker_store.get_markers(get_marker_file_path(map_path))
 
-def save_markers_for_map(map_path, markers):
-    save_json_lines(get_marker_file_path(map_path), markers)
+def has_marker_files(files):
+    return "markers.txt" in files or "markers.txt" + JOURNAL_SUFFIX in files
 
-def load_all_markers():
-    all_markers = []
-    
-    if not os.path.exists(MAPS_FOLDER):
-        return all_markers
-    
-    for root, dirs, files in os.walk(MAPS_FOLDER):
-        if "markers.txt" in files:
-            marker_file = os.path.join(root, "markers.txt")
-            all_markers.extend(parse_json_lines(marker_file))
-    
-    return all_markers
+def versioned_json(etag, build):
+    """Answer 304 if the client already holds this version, otherwise jsonify build() under the ETag"""
+    if not_modified(request, etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return response
+
+def iter_all_markers(marker_files):
+    """Yield every marker, reading one map's markers file at a time"""
+    for marker_file in marker_files:
+        yield from marker_store.get_markers(marker_file)
+
+def encode_json_stream(items, ndjson=False, chunk_size=STREAM_CHUNK_SIZE):
+    """Serialize items as a JSON array, or one document per line, in chunks of about chunk_size bytes"""
+    buffer, size = [], 0
+    empty = True
+    for item in items:
+        if ndjson:
+            text = app.json.dumps(item) + "\n"
+        else:
+            text = ("[" if empty else ",") + app.json.dumps(item)
+        empty = False
+        buffer.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if not ndjson:
+        buffer.append("[]\n" if empty else "]\n")
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def streamed_json(etag, items, ndjson=False):
+    """Like versioned_json, but items is an iterable that is serialized while the response is sent"""
+    if not_modified(request, etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(encode_json_stream(items, ndjson),
+                                      mimetype="application/x-ndjson" if ndjson else "application/json")
+        response.cache_control.no_cache = True
+    response.set_etag(etag)
+    return response
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+    if PROFILE_SLOW_REQUESTS and profiler_lock.acquire(blocking=False):
+        import cProfile
+        g.profiler = cProfile.Profile()
+        try:
+            g.profiler.enable()
+        except ValueError:
+            # Another profiling tool (a debugger, sys.monitoring user) is already active
+            g.profiler = None
+            profiler_lock.release()
+
+# Registered before apply_http_caching so it runs after it and times the compression too
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    counters = metrics.finish_request(endpoint, request.method, response.status_code, elapsed)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        profiler_lock.release()
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        io_summary = ", ".join(f"{name}={value}" for name, value in sorted(counters.items()))
+        print(f"Slow request: {request.method} {request.full_path.rstrip('?')} -> {response.status_code} in {elapsed * 1000:.1f} ms ({io_summary or 'no I/O'})")
+        if profiler is not None:
+            os.makedirs(PROFILES_FOLDER, exist_ok=True)
+            name = re.sub(r"[^\w.-]+", "_", endpoint).strip("_") or "root"
+            profile_path = os.path.join(PROFILES_FOLDER, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(profile_counter)}-{name}.prof")
+            profiler.dump_stats(profile_path)
+            print(f"Profile written to {profile_path}")
+    return response
+
+@app.teardown_request
+def release_profiler(exc):
+    # after_request hooks are skipped when a response could not be built at all
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        profiler_lock.release()
+
+@app.after_request
+def apply_http_caching(response):
+    return finalize_response(response, request)
 
 
 @app.route("/data/<path:filename>")
 def serve_data_files(filename):
     from flask import send_from_directory
-    return send_from_directory(os.path.join(BASE_DIR, "data"), filename)
+    return send_from_directory(DATA_DIR, filename)
 
 @app.route("/maps/<path:map_path>")
 def serve_map_files(map_path):
@@ -203,6 +335,79 @@ def serve_map_files(map_path):
     
     return send_from_directory("data", map_path)
 
+@app.route("/api/tiles/<path:map_path>/<int(signed=True):z>/<int:x>/<int(signed=True):y>")
+@handle_exceptions
+def serve_map_tile(map_path, z, x, y):
+    from flask import send_file
+    
+    if not TileCache.available():
+        return jsonify({"error": "Tile generation requires Pillow"}), 501
+    
+    map_path = normalize_map_path(map_path)
+    source_path = get_map_image_path(map_path)
+    if not map_path.endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS)) or not os.path.exists(source_path):
+        return "Map not found", 404
+    
+    pyramid_dir, meta = tile_cache.ensure_pyramid(source_path, map_path)
+    if meta is None:
+        return tiles_pending()
+    tile_path = tile_cache.tile_path(pyramid_dir, meta, z, x, y)
+    if tile_path is None:
+        return "Tile not found", 404
+    
+    # Pyramids live in a folder named after the source version, which tile-info hands out as ?v=
+    if request.args.get('v') != os.path.basename(pyramid_dir):
+        return send_file(tile_path)
+    return set_immutable(send_file(tile_path))
+
+@app.route("/api/tile-info/<path:map_path>")
+@handle_exceptions
+def get_tile_info(map_path):
+    if not TileCache.available():
+        return jsonify({"error": "Tile generation requires Pillow"}), 501
+    
+    map_path = normalize_map_path(map_path)
+    source_path = get_map_image_path(map_path)
+    if not map_path.endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS)) or not os.path.exists(source_path):
+        return jsonify({"error": "Map not found"}), 404
+    
+    pyramid_dir, meta = tile_cache.ensure_pyramid(source_path, map_path)
+    if meta is None:
+        return tiles_pending()
+    return jsonify(dict(meta, url=f"/api/tiles/{map_path}/{{z}}/{{x}}/{{y}}?v={os.path.basename(pyramid_dir)}"))
+
+def tiles_pending():
+    """Tiles are cut on a background thread; ask the client to come back shortly"""
+    response = jsonify({"error": "Tiles are still being generated"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "2"
+    return response
+
+@app.route("/api/health")
+def health():
+    return jsonify({"status": "ok"})
+
+@app.route("/api/metrics")
+def get_metrics():
+    """Latency histograms, per-endpoint I/O and cache hit rates of this process, in Prometheus text format"""
+    from flask import Response
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def wait_until_ready(url, timeout=30.0, interval=0.05):
+    """Poll the health route until the server answers; returns False if it never does"""
+    import urllib.request
+    
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/api/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(interval)
+    return False
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -224,28 +429,49 @@ def apply_loading_order(items, folder_path, loading_order):
 def count_maps_in_folder(folder_maps):
     return sum(1 if item["type"] == "map" else item.get("mapCount", 0) for item in folder_maps)
 
-def get_maps_recursive(folder_path, parent_path="", loading_order=None):
+def get_thumbnail_url(image_path, map_path):
+    if not ThumbnailCache.available():
+        return f"/maps/{map_path}"
+    return f"/api/map-thumbnails/{map_path}?v={thumbnail_cache.version(image_path, map_path)}"
+
+def scan_folder_tree(root):
+    """Walk root once and return {folder: (subfolders, files)} so several builders can share the scan"""
+    return {folder: (dirs, files) for folder, dirs, files in os.walk(root)}
+
+def list_folder(folder_path, tree=None):
+    if tree is not None and folder_path in tree:
+        return tree[folder_path]
+    dirs, files = [], []
+    for entry in os.scandir(folder_path):
+        (dirs if entry.is_dir() else files).append(entry.name)
+    return dirs, files
+
+def get_maps_recursive(folder_path, parent_path="", loading_order=None, tree=None):
     if loading_order is None:
         loading_order = {}
     
     maps = []
-    items = [item for item in sorted(os.listdir(folder_path)) if item != "maps-loading-order.json"]
+    dirs, files = list_folder(folder_path, tree)
+    items = [item for item in sorted(dirs + files) if item != "maps-loading-order.json"]
     
     for item in items:
         item_path = os.path.join(folder_path, item)
-        relative_path = os.path.join(parent_path, item) if parent_path else item
+        relative_path = f"{parent_path}/{item}" if parent_path else item
         
-        if os.path.isdir(item_path):
-            map_images = [f for f in os.listdir(item_path) if f.lower().endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS))]
+        if item in dirs:
+            map_images = [f for f in list_folder(item_path, tree)[1] if f.lower().endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS))]
             
             if map_images:
-                maps.extend([{
-                    "name": map_image,
-                    "type": "map",
-                    "path": f"{relative_path}/{map_image}" if relative_path else map_image
-                } for map_image in map_images])
+                for map_image in map_images:
+                    map_path = f"{relative_path}/{map_image}" if relative_path else map_image
+                    maps.append({
+                        "name": map_image,
+                        "type": "map",
+                        "path": map_path,
+                        "thumbnail": get_thumbnail_url(os.path.join(item_path, map_image), map_path)
+                    })
             else:
-                folder_maps = get_maps_recursive(item_path, relative_path, loading_order)
+                folder_maps = get_maps_recursive(item_path, relative_path, loading_order, tree)
                 if folder_maps:
                     folder_maps = apply_loading_order(folder_maps, relative_path, loading_order)
                     maps.append({
@@ -268,33 +494,55 @@ def get_maps():
     return jsonify(get_maps_recursive(MAPS_FOLDER, loading_order=loading_order))
 
 
-def get_sizes_recursive(folder_path, parent_path="", sizes=None):
+@app.route("/api/map-thumbnails/<path:map_path>")
+@handle_exceptions
+def serve_map_thumbnail(map_path):
+    from flask import send_file
+    
+    map_path = normalize_map_path(map_path)
+    source_path = get_map_image_path(map_path)
+    if not map_path.endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS)) or not os.path.exists(source_path):
+        return "Map not found", 404
+    if not ThumbnailCache.available():
+        return send_file(source_path)
+    
+    thumbnail_path, version = thumbnail_cache.thumbnail_path(source_path, map_path)
+    if request.args.get('v') != version:
+        return send_file(thumbnail_path, mimetype="image/jpeg")
+    
+    # The URL changes whenever the map image does, so browsers may keep this forever
+    return set_immutable(send_file(thumbnail_path, mimetype="image/jpeg"))
+
+
+def get_sizes_recursive(folder_path, parent_path="", sizes=None, tree=None):
     if sizes is None:
         sizes = {}
     
-    for item in os.listdir(folder_path):
+    dirs, files = list_folder(folder_path, tree)
+    for item in dirs + files:
         item_path = os.path.join(folder_path, item)
-        relative_path = os.path.join(parent_path, item) if parent_path else item
+        relative_path = f"{parent_path}/{item}" if parent_path else item
         
-        if os.path.isdir(item_path):
-            get_sizes_recursive(item_path, relative_path, sizes)
+        if item in dirs:
+            if item != "images":
+                get_sizes_recursive(item_path, relative_path, sizes, tree)
         elif item.lower().endswith(tuple(SUPPORTED_IMAGE_EXTENSIONS)):
-            sizes[relative_path] = DEFAULT_MAP_SIZE
+            sizes[relative_path] = image_size_cache.get(item_path, relative_path) or DEFAULT_MAP_SIZE
     
     return sizes
 
 @app.route("/api/map-sizes")
 @handle_exceptions
 def get_map_sizes():
-    return jsonify(get_sizes_recursive(MAPS_FOLDER) if os.path.exists(MAPS_FOLDER) else {})
+    sizes = get_sizes_recursive(MAPS_FOLDER) if os.path.exists(MAPS_FOLDER) else {}
+    image_size_cache.save()
+    return jsonify(sizes)
 
 
-@app.route("/api/categories")
-@handle_exceptions
-def get_categories():
+def list_categories():
     categories = {}
     if not os.path.exists(PRESET_FOLDER):
-        return jsonify(categories)
+        return categories
     
     for entry in os.listdir(PRESET_FOLDER):
         entry_path = os.path.join(PRESET_FOLDER, entry)
@@ -305,14 +553,110 @@ def get_categories():
         elif entry.endswith(".txt"):
             categories[entry[:-4]] = []
     
-    return jsonify(categories)
+    return categories
 
+@app.route("/api/categories")
+@handle_exceptions
+def get_categories():
+    return jsonify(list_categories())
+
+
+def parse_bbox(value):
+    """Return (min_x, min_y, max_x, max_y), or None unless it is four finite numbers with each min <= max"""
+    try:
+        min_x, min_y, max_x, max_y = (float(part) for part in value.split(','))
+    except ValueError:
+        return None
+    # float() also accepts inf and nan, which the grid index cannot turn into cells
+    if not all(math.isfinite(part) for part in (min_x, min_y, max_x, max_y)) or min_x > max_x or min_y > max_y:
+        return None
+    return (min_x, min_y, max_x, max_y)
 
 @app.route("/api/markers", methods=["GET"])
 @handle_exceptions
 def get_markers():
     map_name = request.args.get('map')
-    return jsonify(load_markers_for_map(map_name) if map_name else load_all_markers())
+    bbox = request.args.get('bbox')
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 0:
+        return jsonify({"error": "limit must not be negative"}), 400
+    
+    if not map_name:
+        if bbox:
+            return jsonify({"error": "bbox requires a map parameter"}), 400
+        versions = tuple((marker_file, marker_store.version(marker_file))
+                         for map_folder, marker_file, details_file in iter_map_data_files() if marker_file)
+        # Every map together can be large, so it is sent map by map instead of built as one list
+        ndjson = request.args.get('format') == 'ndjson'
+        return streamed_json(versioned_etag("markers", versions, ndjson),
+                             iter_all_markers([marker_file for marker_file, version in versions]), ndjson)
+    
+    marker_file = get_marker_file_path(map_name)
+    etag = versioned_etag("markers", marker_file, marker_store.version(marker_file), bbox, limit)
+    if bbox:
+        bbox = parse_bbox(bbox)
+        if bbox is None:
+            return jsonify({"error": "bbox must be minX,minY,maxX,maxY with finite numbers and min <= max"}), 400
+        # Like the unfiltered list, limit keeps the first markers in file order
+        return versioned_json(etag, lambda: marker_store.query_bbox(marker_file, bbox, limit))
+    
+    return versioned_json(etag, lambda: marker_store.get_markers(marker_file)[:limit])
+
+def iter_map_paths(maps):
+    for entry in maps:
+        if entry["type"] == "folder":
+            yield from iter_map_paths(entry["maps"])
+        else:
+            yield entry["path"]
+
+def iter_export_records():
+    """Yield one record per map, marker, item details entry and pinned popup, for /api/export"""
+    yield {"type": "export", "version": EXPORT_FORMAT_VERSION, "exportedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    yield {"type": "mapsLoadingOrder", "order": load_json_file(MAPS_LOADING_ORDER_FILE, {})}
+    
+    tree = scan_folder_tree(MAPS_FOLDER) if os.path.exists(MAPS_FOLDER) else {}
+    if tree:
+        for map_path in iter_map_paths(get_maps_recursive(MAPS_FOLDER, tree=tree)):
+            yield {"type": "map", "path": map_path}
+    for map_folder, marker_file, details_file in iter_map_data_files(tree):
+        if marker_file:
+            for marker in marker_store.get_markers(marker_file):
+                yield {"type": "marker", "folder": map_folder, "marker": marker}
+        if details_file:
+            for key, details in item_details_store.get(details_file).items():
+                yield {"type": "itemDetails", "folder": map_folder, "key": key, "details": details}
+    
+    for popup in parse_json_lines(PINNED_FILE):
+        yield {"type": "pinnedPopup", "popup": popup}
+
+@app.route("/api/export")
+@handle_exceptions
+def export_data():
+    response = app.response_class(encode_json_stream(iter_export_records(), ndjson=True), mimetype="application/x-ndjson")
+    response.headers["Content-Disposition"] = f"attachment; filename=abiotic-maps-export-{time.strftime('%Y%m%d-%H%M%S')}.ndjson"
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/api/markers/clusters", methods=["GET"])
+@handle_exceptions
+def get_marker_clusters():
+    map_name = request.args.get('map')
+    if not map_name:
+        return jsonify({"error": "Map parameter is required"}), 400
+    
+    zoom = request.args.get('zoom', type=float)
+    if zoom is None or not math.isfinite(zoom):
+        return jsonify({"error": "zoom must be a number"}), 400
+    
+    bbox = request.args.get('bbox')
+    if bbox:
+        bbox = parse_bbox(bbox)
+        if bbox is None:
+            return jsonify({"error": "bbox must be minX,minY,maxX,maxY with finite numbers and min <= max"}), 400
+    
+    marker_file = get_marker_file_path(map_name)
+    etag = versioned_etag("clusters", marker_file, marker_store.version(marker_file), zoom, bbox)
+    return versioned_json(etag, lambda: cluster_cache.get(marker_file, zoom, bbox or None))
 
 @app.route("/api/markers", methods=["POST"])
 @handle_exceptions
@@ -322,9 +666,7 @@ def save_marker():
     if not valid:
         return error, 400
     
-    markers = load_markers_for_map(marker['map'])
-    markers.append(marker)
-    save_markers_for_map(marker['map'], markers)
+    marker_store.put(get_marker_file_path(marker['map']), marker)
     return jsonify({"status": "saved"})
 
 @app.route("/api/markers/<int:marker_id>", methods=["PUT"])
@@ -335,16 +677,10 @@ def update_marker(marker_id):
     if not valid:
         return error, 400
     
-    markers = load_markers_for_map(updated_marker['map'])
-    
-    for i, marker in enumerate(markers):
-        if marker.get("id") == marker_id:
-            markers[i] = updated_marker
-            break
-    else:
-        markers.append(updated_marker)
-    
-    save_markers_for_map(updated_marker['map'], markers)
+    marker_file = get_marker_file_path(updated_marker['map'])
+    if updated_marker.get("id") != marker_id:
+        marker_store.delete(marker_file, marker_id)
+    marker_store.put(marker_file, updated_marker)
     return jsonify({"status": "updated"})
 
 
@@ -354,57 +690,96 @@ def delete_marker(marker_id):
     map_name = request.args.get('map')
     
     if map_name:
-        markers = load_markers_for_map(map_name)
-        marker_to_delete = next((m for m in markers if m.get("id") == marker_id), None)
+        marker_to_delete = marker_store.delete(get_marker_file_path(map_name), marker_id)
         
-        if marker_to_delete:
-            cleaned_up = cleanup_marker_items(marker_to_delete, map_name)
-            print(f"Cleaned up {len(cleaned_up)} items from marker {marker_id}")
+        if marker_to_delete is None:
+            return "Marker not found", 404
         
-        original_count = len(markers)
-        markers = [m for m in markers if m.get("id") != marker_id]
-        
-        if len(markers) < original_count:
-            save_markers_for_map(map_name, markers)
-            return jsonify({"status": "deleted"})
+        cleaned_up = cleanup_marker_items(marker_to_delete, map_name)
+        print(f"Cleaned up {len(cleaned_up)} items from marker {marker_id}")
+        return jsonify({"status": "deleted"})
+    
+    marker_file = marker_store.find_marker_file(marker_id, MAPS_FOLDER) if os.path.exists(MAPS_FOLDER) else None
+    if marker_file is None:
         return "Marker not found", 404
     
-    if not os.path.exists(MAPS_FOLDER):
+    marker_to_delete = marker_store.delete(marker_file, marker_id)
+    if marker_to_delete is None:
         return "Marker not found", 404
     
-    for root, dirs, files in os.walk(MAPS_FOLDER):
-        if "markers.txt" in files:
-            marker_file = os.path.join(root, "markers.txt")
-            markers = parse_json_lines(marker_file)
-            
-            marker_to_delete = next((m for m in markers if m.get("id") == marker_id), None)
-            original_count = len(markers)
-            markers = [m for m in markers if m.get("id") != marker_id]
-            
-            if len(markers) < original_count:
-                if marker_to_delete:
-                    relative_path = os.path.relpath(root, MAPS_FOLDER)
-                    map_name_from_path = relative_path.replace(os.sep, '/')
-                    cleaned_up = cleanup_marker_items(marker_to_delete, map_name_from_path)
-                    print(f"Cleaned up {len(cleaned_up)} items from marker {marker_id}")
-                
-                save_json_lines(marker_file, markers)
-                return jsonify({"status": "deleted"})
+    relative_path = os.path.relpath(os.path.dirname(marker_file), MAPS_FOLDER)
+    map_name_from_path = relative_path.replace(os.sep, '/')
+    cleaned_up = cleanup_marker_items(marker_to_delete, map_name_from_path)
+    print(f"Cleaned up {len(cleaned_up)} items from marker {marker_id}")
+    return jsonify({"status": "deleted"})
+
+
+@app.route("/api/markers/batch", methods=["POST"])
+@handle_exceptions
+def batch_markers():
+    data = request.get_json()
+    valid, error = validate_request_data(data, ['operations'])
+    if not valid:
+        return jsonify({"error": error}), 400
+    
+    operations = data['operations']
+    if not isinstance(operations, list):
+        return jsonify({"error": "operations must be an array"}), 400
+    
+    results = [None] * len(operations)
+    changes = []
+    change_indexes = []
+    
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        
+        if op in ("create", "update"):
+            marker = operation.get('marker')
+            valid, error = validate_request_data(marker if isinstance(marker, dict) else None, ['map'])
+            if valid and not isinstance(marker['map'], str):
+                valid, error = False, "map must be a string"
+            if not valid:
+                results[index] = {"op": op, "status": "error", "error": error}
+                continue
+            changes.append((get_marker_file_path(marker['map']), "put", marker))
+        elif op == "delete":
+            map_name = operation.get('map')
+            if map_name is not None and not isinstance(map_name, str):
+                results[index] = {"op": op, "id": operation.get('id'), "status": "error", "error": "map must be a string"}
+                continue
+            changes.append((get_marker_file_path(map_name) if map_name else None, "delete", operation.get('id')))
+        else:
+            results[index] = {"op": op, "status": "error", "error": "op must be create, update or delete"}
+            continue
+        change_indexes.append(index)
+    
+    applied = marker_store.apply_batch(changes, MAPS_FOLDER if os.path.exists(MAPS_FOLDER) else None)
+    
+    for index, (_, op, value), (marker_file, marker) in zip(change_indexes, changes, applied):
+        if op == "put":
+            results[index] = {"op": operations[index]['op'], "id": value.get('id'), "status": "saved"}
+        elif marker is None:
+            results[index] = {"op": "delete", "id": value, "status": "error", "error": "Marker not found"}
+        else:
+            map_name = os.path.relpath(os.path.dirname(marker_file), MAPS_FOLDER).replace(os.sep, '/')
+            cleanup_marker_items(marker, map_name)
+            results[index] = {"op": "delete", "id": value, "status": "deleted"}
     
-    return "Marker not found", 404
+    failed = sum(1 for result in results if result["status"] == "error")
+    return jsonify({"success": failed == 0, "results": results, "failed": failed})
 
 
 @app.route("/api/presets/<preset_type>")
 def get_presets_by_type(preset_type):
     path = os.path.join(PRESET_FOLDER, f"{preset_type}.txt")
-    assets_folder = os.path.join(BASE_DIR, "data", "assets", preset_type)
-    return jsonify(process_preset_entries(path, assets_folder))
+    assets_folder = os.path.join(ASSETS_FOLDER, preset_type)
+    return jsonify(preset_catalog.get_entries(path, assets_folder))
 
 @app.route("/api/presets/<category>/<subcategory>")
 def get_presets_by_subcategory(category, subcategory):
     path = os.path.join(PRESET_FOLDER, category, f"{subcategory}.txt")
-    assets_folder = os.path.join(BASE_DIR, "data", "assets", category, subcategory)
-    return jsonify(process_preset_entries(path, assets_folder))
+    assets_folder = os.path.join(ASSETS_FOLDER, category, subcategory)
+    return jsonify(preset_catalog.get_entries(path, assets_folder))
 
 
 @app.route("/presets/<path:filename>")
@@ -423,27 +798,188 @@ def serve_preset_file(filename):
     return send_from_directory(directory, file_name, mimetype='text/plain')
 
 
-def scan_directory(directory, category_prefix="", result=None):
-    if result is None:
-        result = {}
-    
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
+@app.route("/api/presets")
+@handle_exceptions
+def get_all_presets():
+    body, etag = preset_catalog.get_payload()
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def iter_map_data_files(tree=None):
+    """Yield (map_folder, markers file or None, item-details file or None) for each folder under the maps folder"""
+    if not os.path.exists(MAPS_FOLDER):
+        return
+    walk = ((root, dirs, files) for root, (dirs, files) in tree.items()) if tree is not None else os.walk(MAPS_FOLDER)
+    for root, dirs, files in walk:
+        if os.path.basename(root) == "images":
+            continue
+        map_folder = os.path.relpath(root, MAPS_FOLDER).replace(os.sep, '/')
+        marker_file = os.path.join(root, "markers.txt") if has_marker_files(files) else None
+        details_file = os.path.join(root, "item-details.json") if "item-details.json" in files else None
+        if marker_file or details_file:
+            yield map_folder, marker_file, details_file
+
+def change_entry_folder(entry):
+    """Absolute map folder of a change log entry"""
+    return os.path.join(MAPS_FOLDER, *entry.get("folder", ".").split('/'))
+
+def refresh_index(index, preset_factory, marker_factory, item_details_factory=None):
+    """Bring an index up to date without rescanning the data folder on every query.
+
+    Edits made through the app, in any worker, are applied straight away from the
+    change log. Preset files and hand edits are found by a full rescan, which runs
+    at most once every INDEX_RESCAN_INTERVAL seconds.
+    """
+    with index_refresh_lock:
+        state = index_refresh_state.setdefault(index, {"scannedAt": None, "seq": None})
+        latest = change_log.latest()
+        if state["scannedAt"] is None or time.monotonic() - state["scannedAt"] >= INDEX_RESCAN_INTERVAL:
+            rescan_index(index, preset_factory, marker_factory, item_details_factory)
+            state.update(scannedAt=time.monotonic(), seq=latest)
+            return
+        if latest == state["seq"]:
+            return
         
-        if os.path.isfile(item_path) and item.endswith(".txt"):
-            key = f"{category_prefix}/{item[:-4]}" if category_prefix else item[:-4]
-            assets_folder = os.path.join(BASE_DIR, "data", "assets", category_prefix or key)
-            result[key] = process_preset_entries(item_path, assets_folder)
-        elif os.path.isdir(item_path):
-            new_prefix = f"{category_prefix}/{item}" if category_prefix else item
-            scan_directory(item_path, new_prefix, result)
+        _, entries = change_log.since(state["seq"])
+        if entries is None:
+            rescan_index(index, preset_factory, marker_factory, item_details_factory)
+            state.update(scannedAt=time.monotonic(), seq=latest)
+            return
+        for entry in entries:
+            map_folder = change_entry_folder(entry)
+            if entry["type"] == "marker":
+                marker_file = os.path.join(map_folder, "markers.txt")
+                version, markers = marker_store.snapshot(marker_file)
+                index.update_source(("markers", marker_file), version, lambda f=marker_file, m=markers: marker_factory(f, m))
+            elif entry["type"] == "itemDetails" and item_details_factory:
+                details_file = os.path.join(map_folder, "item-details.json")
+                version, items = item_details_store.snapshot(details_file)
+                index.update_source(("itemDetails", details_file), version, lambda f=entry["folder"], i=items: item_details_factory(f, i))
+        state["seq"] = latest
+
+def rescan_index(index, preset_factory, marker_factory, item_details_factory=None):
+    """Walk every preset and map data file, rebuilding only sources whose version changed since the last call"""
+    live_sources = set()
     
-    return result
+    for key, signature, entries in preset_catalog.get_files():
+        live_sources.add(("preset", key))
+        index.update_source(("preset", key), signature, lambda key=key, entries=entries: preset_factory(key, entries))
+    
+    for map_folder, marker_file, details_file in iter_map_data_files():
+        if marker_file:
+            version, markers = marker_store.snapshot(marker_file)
+            live_sources.add(("markers", marker_file))
+            index.update_source(("markers", marker_file), version, lambda f=marker_file, m=markers: marker_factory(f, m))
+        if details_file and item_details_factory:
+            version, items = item_details_store.snapshot(details_file)
+            live_sources.add(("itemDetails", details_file))
+            index.update_source(("itemDetails", details_file), version, lambda f=map_folder, i=items: item_details_factory(f, i))
+    
+    index.retain_sources(live_sources)
 
-@app.route("/api/presets")
+def refresh_search_index():
+    refresh_index(search_index, preset_documents, marker_documents, item_details_documents)
+
+def load_templates():
+    """Return {url: html} for the frontend templates, re-reading only files that changed"""
+    templates = {}
+    if not os.path.isdir(TEMPLATES_FOLDER):
+        return templates
+    
+    for name in sorted(os.listdir(TEMPLATES_FOLDER)):
+        if not name.endswith(".html"):
+            continue
+        path = os.path.join(TEMPLATES_FOLDER, name)
+        signature = file_signature(path)
+        cached = template_cache.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = template_cache[path] = (signature, f.read())
+        templates[f"/static/templates/{name}"] = cached[1]
+    return templates
+
+@app.route("/api/bootstrap")
 @handle_exceptions
-def get_all_presets():
-    return jsonify(scan_directory(PRESET_FOLDER))
+def get_bootstrap():
+    tree = scan_folder_tree(MAPS_FOLDER) if os.path.exists(MAPS_FOLDER) else {}
+    payload = {
+        "maps": get_maps_recursive(MAPS_FOLDER, loading_order=load_json_file(MAPS_LOADING_ORDER_FILE, {}), tree=tree) if tree else [],
+        "mapSizes": get_sizes_recursive(MAPS_FOLDER, tree=tree) if tree else {},
+        "categories": list_categories(),
+        "pinnedPopups": parse_json_lines(PINNED_FILE),
+        "templates": load_templates(),
+        "map": None,
+        "markers": [],
+        "itemDetails": {}
+    }
+    image_size_cache.save()
+    
+    # A remembered map may have been removed since; never create folders for it here
+    map_name = normalize_map_path(request.args.get('map', ''))
+    map_folder = get_map_folder_path(map_name) if map_name else None
+    if map_folder and os.path.isdir(map_folder):
+        payload["map"] = map_name
+        payload["markers"] = marker_store.get_markers(os.path.join(map_folder, "markers.txt"))
+        payload["itemDetails"] = item_details_store.get(os.path.join(map_folder, "item-details.json"))
+    
+    return jsonify(payload)
+
+@app.route("/api/search")
+@handle_exceptions
+def search():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 20, type=int)
+    fuzzy = request.args.get('fuzzy', '1') not in ('0', 'false')
+    types = [value for value in request.args.get('type', '').split(',') if value]
+    
+    if not query.strip():
+        return jsonify([])
+    
+    refresh_search_index()
+    return jsonify(search_index.search(query, max(limit, 0), fuzzy, types or None))
+
+@app.route("/api/where")
+@handle_exceptions
+def where_to_find():
+    item_name = request.args.get('item', '')
+    if not item_name.strip():
+        return jsonify({"error": "item parameter is required"}), 400
+    
+    refresh_index(item_location_index, preset_contributions, lambda marker_file, markers: marker_contributions(markers))
+    result = item_location_index.lookup(item_name)
+    if result is None:
+        return jsonify({"error": f"Nothing known about {item_name}"}), 404
+    return jsonify(result)
+
+@app.route("/api/loot-yield")
+@handle_exceptions
+def get_loot_yield():
+    if not LootYieldEngine.available():
+        return jsonify({"error": "Loot yield calculation requires NumPy"}), 501
+    
+    fields = [field.strip() for field in request.args.get('fields', 'Drops').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in DROP_FIELDS]
+    if unknown or not fields:
+        return jsonify({"error": f"fields must be a comma-separated subset of {', '.join(DROP_FIELDS)}"}), 400
+    
+    maps = request.args.getlist('map') or None
+    item_name = request.args.get('item')
+    marker_files = [marker_file for map_folder, marker_file, details_file in iter_map_data_files() if marker_file]
+    results = loot_yield_engine.expected_yields(
+        preset_catalog.get_files(), marker_files, maps=maps, item=item_name, fields=fields,
+        remaining=request.args.get('remaining') in ('1', 'true')
+    )
+    
+    if item_name is None:
+        return jsonify({"maps": results})
+    if results is None:
+        return jsonify({"error": f"No drop table yields {item_name}"}), 404
+    return jsonify({
+        "item": item_name,
+        "maps": results,
+        "total": round(sum(result["expected"] for result in results.values()), 3)
+    })
 
 @app.route("/api/save-pinned-popups", methods=["POST"])
 @handle_exceptions
@@ -452,43 +988,83 @@ def save_pinned_popups():
     if not isinstance(data, list):
         return jsonify({"error": "Invalid data format"}), 400
     
-    PINNED_FILE = os.path.join(BASE_DIR, "data", "app-data", "pinned.txt")
     get_marker_key = lambda marker_id: "-".join(map(str, sorted(marker_id))) if isinstance(marker_id, list) else str(marker_id)
     
-    pinned = {}
-    for line in parse_json_lines(PINNED_FILE):
-        if "markerID" in line:
-            pinned[get_marker_key(line["markerID"])] = line
-    
-    if len(data) == 0:
+    with file_lock(PINNED_FILE):
         pinned = {}
-    else:
-        for item in data:
-            if isinstance(item, dict) and "markerID" in item:
-                key = get_marker_key(item["markerID"])
-                if item.get("remove", False):
-                    pinned.pop(key, None)
-                else:
-                    pinned[key] = item
-    
-    with open(PINNED_FILE, "w", encoding="utf-8") as f:
-        for obj in pinned.values():
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-        f.flush()
-        os.fsync(f.fileno())
+        for line in parse_json_lines(PINNED_FILE):
+            if "markerID" in line:
+                pinned[get_marker_key(line["markerID"])] = line
+        
+        if len(data) == 0:
+            pinned = {}
+        else:
+            for item in data:
+                if isinstance(item, dict) and "markerID" in item:
+                    key = get_marker_key(item["markerID"])
+                    if item.get("remove", False):
+                        pinned.pop(key, None)
+                    else:
+                        pinned[key] = item
+        
+        save_json_lines(PINNED_FILE, pinned.values())
+        change_log.record("pinnedPopups")
     
     return jsonify({"status": "saved", "count": len(pinned)})
 
 @app.route("/api/load-pinned-popups", methods=["GET"])
 def load_pinned_popups():
-    return jsonify(parse_json_lines(os.path.join(BASE_DIR, "data", "app-data", "pinned.txt")))
+    return jsonify(parse_json_lines(PINNED_FILE))
+
+@app.route("/api/changes")
+@handle_exceptions
+def get_changes():
+    """Markers, item details and pinned popups changed after the given sequence number"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({"error": "since must be a sequence number"}), 400
+    
+    latest, entries = change_log.since(since)
+    if entries is None:
+        # The log no longer reaches back that far (or was reset), so the client has to reload everything
+        return jsonify({"seq": latest, "reset": True})
+    
+    markers = {"updated": [], "deleted": []}
+    item_details = {"updated": [], "deleted": []}
+    pinned_popups = None
+    for entry in entries:
+        map_folder = change_entry_folder(entry)
+        if entry["type"] == "marker":
+            marker = marker_store.get_marker(os.path.join(map_folder, "markers.txt"), entry["key"])
+            if marker is None:
+                markers["deleted"].append(entry["key"])
+            else:
+                markers["updated"].append(marker)
+        elif entry["type"] == "itemDetails":
+            item = item_details_store.get_item(os.path.join(map_folder, "item-details.json"), entry["key"])
+            if item is None:
+                item_details["deleted"].append({"folder": entry["folder"], "key": entry["key"]})
+            else:
+                item_details["updated"].append({"folder": entry["folder"], "key": entry["key"], "details": item})
+        elif entry["type"] == "pinnedPopups":
+            pinned_popups = parse_json_lines(PINNED_FILE)
+    
+    return jsonify({
+        "seq": latest,
+        "reset": False,
+        "markers": markers,
+        "itemDetails": item_details,
+        "pinnedPopups": pinned_popups
+    })
 
 @app.route("/api/item-details", methods=["GET"])
 def get_item_details():
     map_name = request.args.get('map')
     if not map_name:
         return jsonify({})
-    return jsonify(load_json_file(get_item_details_file_path(map_name), {}))
+    details_file = get_item_details_file_path(map_name)
+    etag = versioned_etag("itemDetails", details_file, item_details_store.version(details_file))
+    return versioned_json(etag, lambda: item_details_store.get(details_file))
 
 @app.route("/api/item-details", methods=["POST"])
 @handle_exceptions
@@ -501,33 +1077,77 @@ def save_item_details():
     if not map_name:
         return jsonify({"error": "Map parameter is required"}), 400
     
-    save_json_file(get_item_details_file_path(map_name), data)
+    item_details_store.replace(get_item_details_file_path(map_name), data)
     return jsonify({"success": True, "message": f"Item details saved successfully for map {map_name}"})
 
+@app.route("/api/item-details/<item_key>", methods=["GET"])
+@handle_exceptions
+def get_item_detail(item_key):
+    map_name = request.args.get('map')
+    if not map_name:
+        return jsonify({"error": "Map parameter is required"}), 400
+    
+    item = item_details_store.get_item(get_item_details_file_path(map_name), item_key)
+    if item is None:
+        return jsonify({"error": "Item not found"}), 404
+    return jsonify(item)
 
-@app.route("/api/upload-image", methods=["POST"])
+@app.route("/api/item-details/<item_key>", methods=["PUT", "PATCH"])
 @handle_exceptions
-def upload_image():
+def upsert_item_detail(item_key):
     data = request.get_json()
-    valid, error = validate_request_data(data, ['imageData'])
-    if not valid:
-        return jsonify({"error": error}), 400
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid data format, expected object"}), 400
     
     map_name = request.args.get('map')
     if not map_name:
         return jsonify({"error": "Map parameter is required"}), 400
     
-    if DEBUG_MODE:
-        print(f"DEBUG: Received map_name: '{map_name}'")
-    
-    image_data = data['imageData']
-    file_extension = data.get('fileExtension', 'png')
+    # PATCH merges the given fields into the stored item, PUT replaces it
+    item = item_details_store.upsert(get_item_details_file_path(map_name), item_key, data, merge=request.method == "PATCH")
+    return jsonify({"success": True, "item": item})
+
+@app.route("/api/item-details/<item_key>", methods=["DELETE"])
+@handle_exceptions
+def delete_item_detail(item_key):
+    map_name = request.args.get('map')
+    if not map_name:
+        return jsonify({"error": "Map parameter is required"}), 400
     
-    if ',' in image_data:
-        image_data = image_data.split(',')[1]
+    removed = item_details_store.delete(get_item_details_file_path(map_name), [item_key])
+    if not removed:
+        return jsonify({"error": "Item not found"}), 404
+    release_item_images(map_name, removed.values())
+    return jsonify({"success": True})
+
+
+class UploadTooLarge(Exception):
+    pass
+
+def read_upload_chunks(stream, limit=MAX_UPLOAD_SIZE):
+    total = 0
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > limit:
+            raise UploadTooLarge()
+        yield chunk
+
+def get_upload_extension(value, default='png'):
+    extension = re.sub(r'[^a-z0-9]', '', (value or '').rsplit('.', 1)[-1].lower())
+    return extension or default
+
+@app.route("/api/upload-image", methods=["POST"])
+@handle_exceptions
+def upload_image():
+    map_name = request.args.get('map')
+    if not map_name:
+        return jsonify({"error": "Map parameter is required"}), 400
     
-    image_bytes = base64.b64decode(image_data)
-    filename = f"{uuid.uuid4().hex}.{file_extension}"
+    if DEBUG_MODE:
+        print(f"DEBUG: Received map_name: '{map_name}'")
     
     map_name_normalized = normalize_map_path(map_name)
     if DEBUG_MODE:
@@ -541,10 +1161,31 @@ def upload_image():
     if DEBUG_MODE:
         print(f"DEBUG: Images folder path: '{images_folder}'")
     
-    os.makedirs(images_folder, exist_ok=True)
-    
-    with open(os.path.join(images_folder, filename), 'wb') as f:
-        f.write(image_bytes)
+    try:
+        if request.mimetype == "multipart/form-data":
+            upload = request.files.get('image')
+            if upload is None:
+                return jsonify({"error": "Missing required field: image"}), 400
+            file_extension = get_upload_extension(request.form.get('fileExtension') or upload.filename)
+            filename = image_store.add(images_folder, read_upload_chunks(upload.stream), file_extension)
+        elif request.mimetype.startswith("image/") or request.mimetype == "application/octet-stream":
+            file_extension = get_upload_extension(request.args.get('fileExtension') or request.mimetype.split('/')[-1])
+            filename = image_store.add(images_folder, read_upload_chunks(request.stream), file_extension)
+        else:
+            # Original JSON body with a base64 data URL, kept for older clients
+            data = request.get_json()
+            valid, error = validate_request_data(data, ['imageData'])
+            if not valid:
+                return jsonify({"error": error}), 400
+            
+            image_data = data['imageData']
+            if ',' in image_data:
+                image_data = image_data.split(',')[1]
+            
+            file_extension = get_upload_extension(data.get('fileExtension', 'png'))
+            filename = image_store.add(images_folder, [base64.b64decode(image_data)], file_extension)
+    except (UploadTooLarge, RequestEntityTooLarge):
+        return jsonify({"error": "Image is too large"}), 413
     
     return jsonify({"success": True, "imagePath": f"images/{filename}", "message": "Image uploaded successfully"})
 
@@ -562,13 +1203,13 @@ def delete_image():
     
     image_path = data['imagePath']
     filename = image_path.split('/')[-1] if image_path.startswith('/api/map-images/') else os.path.basename(image_path)
+    if is_internal_file(filename):
+        return jsonify({"error": "Invalid image path"}), 400
     
     map_name_normalized = normalize_map_path(map_name)
     map_folder = get_map_folder_path(map_name_normalized)
-    full_image_path = os.path.join(map_folder, "images", filename)
     
-    if os.path.exists(full_image_path):
-        os.remove(full_image_path)
+    if image_store.release(os.path.join(map_folder, "images"), filename):
         return jsonify({"success": True, "message": "Image deleted successfully"})
     else:
         return jsonify({"success": False, "error": "Image file not found"})
@@ -587,6 +1228,8 @@ def serve_map_images(image_path):
         return "Invalid image path format", 400
         
     map_path, filename = path_parts
+    if is_internal_file(filename):
+        return "Image not found", 404
     if DEBUG_MODE:
         print(f"DEBUG: Serving image - map_path: '{map_path}', filename: '{filename}'")
     
@@ -598,42 +1241,38 @@ def serve_map_images(image_path):
         print(f"DEBUG: Looking for image at: {os.path.join(images_folder, filename)}")
     
     if os.path.exists(os.path.join(images_folder, filename)):
-        return send_from_directory(images_folder, filename)
+        response = send_from_directory(images_folder, filename)
+        # Uploads are named after their SHA-256, so a name never points at different bytes
+        return set_immutable(response) if HASHED_IMAGE_PATTERN.match(filename) else response
     else:
         return "Image not found", 404
 
 
-def cleanup_item_from_details(map_name, item_key):
+def release_item_images(map_name, items):
+    """Release the uploaded images referenced by removed items; files nothing else uses are deleted in the background"""
+    filenames = []
+    for item_data in items:
+        if isinstance(item_data, dict) and item_data.get('additionalImage'):
+            for image_url in item_data['additionalImage'].split(','):
+                image_url = image_url.strip()
+                if image_url and '/api/map-images/' in image_url:
+                    filenames.append(os.path.basename(image_url))
+    
+    if filenames:
+        image_store.release_later(os.path.join(get_map_folder_path(map_name), "images"), filenames)
+
+def cleanup_items_from_details(map_name, item_keys):
+    """Remove several items with one read and one write of item-details.json; images are released in the background"""
     try:
         map_name_normalized = normalize_map_path(map_name)
-        item_details_path = get_item_details_file_path(map_name_normalized)
-        item_details = load_json_file(item_details_path, {})
-        
-        if item_key in item_details:
-            item_data = item_details[item_key]
-            
-            if 'additionalImage' in item_data and item_data['additionalImage']:
-                for image_url in item_data['additionalImage'].split(','):
-                    image_url = image_url.strip()
-                    if image_url and '/api/map-images/' in image_url:
-                        try:
-                            filename = os.path.basename(image_url)
-                            map_folder = get_map_folder_path(map_name_normalized)
-                            image_path = os.path.join(map_folder, "images", filename)
-                            
-                            if os.path.exists(image_path):
-                                os.remove(image_path)
-                                print(f"Deleted image: {image_path}")
-                        except Exception as e:
-                            print(f"Error deleting image {image_url}: {e}")
-            
-            del item_details[item_key]
-            save_json_file(item_details_path, item_details)
-            print(f"Cleaned up item {item_key} from {map_name}")
-            return True
+        removed = item_details_store.delete(get_item_details_file_path(map_name_normalized), item_keys)
+        release_item_images(map_name_normalized, removed.values())
+        if removed:
+            print(f"Cleaned up {len(removed)} items from {map_name}")
+        return [item_key for item_key in item_keys if item_key in removed]
     except Exception as e:
-        print(f"Error cleaning up item {item_key} from details: {e}")
-    return False
+        print(f"Error cleaning up items from details: {e}")
+    return []
 
 @app.route("/api/cleanup-items", methods=["POST"])
 @handle_exceptions
@@ -651,7 +1290,7 @@ def cleanup_items():
     if not isinstance(item_keys, list):
         return jsonify({"error": "itemKeys must be an array"}), 400
     
-    cleaned_up = [item_key for item_key in item_keys if cleanup_item_from_details(map_name, item_key)]
+    cleaned_up = cleanup_items_from_details(map_name, item_keys)
     
     return jsonify({"success": True, "cleanedUp": cleaned_up, "message": f"Cleaned up {len(cleaned_up)} items"})
 
@@ -661,7 +1300,7 @@ def cleanup_marker_items(marker, map_name):
         return []
     
     marker_id = marker.get('id', 'unknown')
-    cleaned_up = []
+    item_keys = []
     
     for entry in marker['entries']:
         if 'items' in entry:
@@ -669,15 +1308,16 @@ def cleanup_marker_items(marker, map_name):
                 item_name = item.get('itemname', '')
                 if item_name:
                     sanitized_name = re.sub(r'[^a-zA-Z0-9\s]', '', item_name).replace(' ', '_')
-                    item_key = f"{marker_id}_{sanitized_name}"
-                    
-                    if cleanup_item_from_details(map_name, item_key):
-                        cleaned_up.append(item_key)
+                    item_keys.append(f"{marker_id}_{sanitized_name}")
     
-    return cleaned_up
+    return cleanup_items_from_details(map_name, item_keys) if item_keys else []
 
 if __name__ == "__main__":
     import logging
+    import multiprocessing
+    
+    # Tile generation uses a process pool, which needs this in frozen builds
+    multiprocessing.freeze_support()
     
     if not SHOW_HTTP_LOGS:
         log = logging.getLogger('werkzeug')
@@ -697,14 +1337,11 @@ if __name__ == "__main__":
             flask_thread.daemon = True
             flask_thread.start()
             
-            # Wait a moment for Flask to start
-            time.sleep(2)
-            
-            # Create native desktop window
-            window_title = get_window_title()
-            webview.create_window(
-                title=window_title,
-                url='http://127.0.0.1:5000',
+            # Open the window as soon as the server answers, titled from the last version check
+            wait_until_ready(SERVER_URL)
+            window = webview.create_window(
+                title=get_cached_window_title(VERSION_CACHE_FILE),
+                url=SERVER_URL,
                 width=1400,
                 height=900,
                 min_size=(1000, 700),
@@ -714,17 +1351,17 @@ if __name__ == "__main__":
                 shadow=True
             )
             
-            # Start the webview (this blocks until window is closed)
-            webview.start(debug=False)
+            # Start the webview (this blocks until window is closed); the fresh version check retitles it later
+            webview.start(lambda: check_version_in_background(VERSION_CACHE_FILE, window.set_title), debug=False)
             
         except ImportError:
             # just in case, if not working do browser
             import webbrowser
             
             def open_browser():
-                """Open browser after a short delay to ensure server is running"""
-                time.sleep(1.5)
-                webbrowser.open('http://127.0.0.1:5000')
+                """Open browser once the server is answering requests"""
+                if wait_until_ready(SERVER_URL):
+                    webbrowser.open(SERVER_URL)
             
             # Start browser in a separate thread
             browser_thread = threading.Thread(target=open_browser)
@@ -743,9 +1380,9 @@ if __name__ == "__main__":
         import webbrowser
         
         def open_browser():
-            """Open browser after a short delay to ensure server is running"""
-            time.sleep(1.5)
-            webbrowser.open('http://127.0.0.1:5000')
+            """Open browser once the server is answering requests"""
+            if wait_until_ready(SERVER_URL):
+                webbrowser.open(SERVER_URL)
         
         # Start browser in a separate thread
         browser_thread = threading.Thread(target=open_browser)
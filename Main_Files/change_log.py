@@ -0,0 +1,93 @@
+import os
+import time
+import bisect
+import threading
+
+from storage import file_lock, parse_json_lines_from, save_json_lines, append_json_lines
+
+# Record types whose keys are unique across maps, so a record that moved maps is still one record
+GLOBAL_KEY_TYPES = {"marker"}
+
+
+class ChangeLog:
+    """A numbered record of which markers, item details and pinned popups were edited, for /api/changes.
+
+    Only the identity of each touched record is kept (type, map folder, key);
+    readers look up its current value, so a record that no longer exists was
+    deleted. The log is a JSON-lines file shared by every worker process. It
+    keeps the newest `keep` records, and clients asking for anything older are
+    told to reload everything.
+    """
+
+    def __init__(self, log_file, root, keep=10000):
+        self.log_file = log_file
+        self.root = root
+        self.keep = keep
+        self._entries = []
+        self._seqs = []
+        self._file_id = None
+        self._offset = 0
+        self._lock = threading.RLock()
+
+    def _refresh(self):
+        """Pick up what other workers appended since we last looked, reading only the new bytes"""
+        try:
+            stat = os.stat(self.log_file)
+        except OSError:
+            self._entries, self._seqs, self._file_id, self._offset = [], [], None, 0
+            return
+        # Compaction replaces the file, so a new inode or a shorter file means starting over
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id or stat.st_size < self._offset:
+            self._entries, self._seqs, self._file_id, self._offset = [], [], file_id, 0
+        if stat.st_size == self._offset:
+            return
+        entries, self._offset = parse_json_lines_from(self.log_file, self._offset)
+        entries = [entry for entry in entries if isinstance(entry, dict) and "seq" in entry]
+        self._entries.extend(entries)
+        self._seqs.extend(entry["seq"] for entry in entries)
+
+    def latest(self):
+        with self._lock:
+            self._refresh()
+            return self._seqs[-1] if self._seqs else 0
+
+    def record(self, kind, source_file=None, keys=(None,)):
+        """Note that the records with these keys in source_file changed"""
+        if not keys:
+            return
+        folder = os.path.relpath(os.path.dirname(source_file), self.root).replace(os.sep, '/') if source_file else None
+
+        with self._lock, file_lock(self.log_file):
+            self._refresh()
+            # A new log starts at the current time in ms, so a client still holding a number from
+            # a deleted log is always below the new first entry and gets told to reload
+            seq = self._seqs[-1] if self._seqs else int(time.time() * 1000)
+            entries = []
+            for key in keys:
+                seq += 1
+                entry = {"seq": seq, "type": kind}
+                if folder is not None:
+                    entry["folder"] = folder
+                if key is not None:
+                    entry["key"] = key
+                entries.append(entry)
+
+            append_json_lines(self.log_file, entries)
+            self._refresh()
+            if len(self._entries) > 2 * self.keep:
+                save_json_lines(self.log_file, self._entries[-self.keep:])
+                self._refresh()
+
+    def since(self, seq):
+        """Return (latest seq, newest entry per record changed after seq), or (latest, None) if seq is too old or unknown"""
+        with self._lock:
+            self._refresh()
+            latest = self._seqs[-1] if self._seqs else 0
+            if seq > latest or (self._seqs and seq < self._seqs[0] - 1):
+                return latest, None
+            changed = {}
+            for entry in self._entries[bisect.bisect_right(self._seqs, seq):]:
+                folder = None if entry["type"] in GLOBAL_KEY_TYPES else entry.get("folder")
+                changed[(entry["type"], folder, entry.get("key"))] = entry
+            return latest, sorted(changed.values(), key=lambda entry: entry["seq"])
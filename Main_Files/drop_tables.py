@@ -0,0 +1,78 @@
+import re
+
+QUANTITY_PATTERN = re.compile(r"^\s*\d+(\s*-\s*\d+)?\s*$")
+
+
+def split_drop_row(row):
+    """Return (quantity, item, chance) strings from a drop row in any column order.
+
+    Most presets write ["1-2", "Case Fan", "100%"], but some (e.g. Mine Crate)
+    put the item name first, so columns are recognised by their content.
+    """
+    if not isinstance(row, (list, tuple)):
+        return None
+    quantity = item = chance = None
+    for value in row:
+        if not isinstance(value, str):
+            continue
+        if chance is None and "%" in value:
+            chance = value
+        elif quantity is None and QUANTITY_PATTERN.match(value):
+            quantity = value
+        elif item is None:
+            item = value.strip()
+    if not item:
+        return None
+    return quantity, item, chance
+
+def parse_quantity(text):
+    """Return (min, max) from "2" or "1-3"; None if the text is not a quantity"""
+    if not text or not QUANTITY_PATTERN.match(text):
+        return None
+    low, _, high = text.partition("-")
+    low = int(low)
+    high = int(high) if high.strip() else low
+    return (low, high) if low <= high else (high, low)
+
+def parse_chance(text):
+    """Return the chance tiers of a drop as [(probability, quantity or None)].
+
+    "50%" is a single tier that uses the row's quantity, while
+    "100% of 1\\n50% of 2" lists one tier per line with its own quantity.
+    """
+    tiers = []
+    for line in (text or "100%").splitlines():
+        percent, _, quantity = line.partition("%")
+        try:
+            probability = float(percent.strip()) / 100
+        except ValueError:
+            continue
+        quantity = quantity.strip()
+        if quantity.lower().startswith("of"):
+            quantity = quantity[2:].strip()
+        tiers.append((probability, parse_quantity(quantity)))
+    return tiers
+
+def drop_components(row):
+    """Normalize one drop row into (item, min, max, probability) components.
+
+    A row with several tiers, like ["1-2", "Refined Carbon", "100% of 1\\n50% of 2"],
+    is read as a guaranteed base amount plus chances to roll more: the first
+    tier is kept as-is and later tiers count only what they add on top of it.
+    """
+    parsed = split_drop_row(row)
+    if parsed is None:
+        return []
+    quantity, item, chance = parsed
+    row_range = parse_quantity(quantity) or (1, 1)
+
+    components = []
+    base = 0
+    for probability, tier_range in parse_chance(chance):
+        low, high = tier_range or row_range
+        if components:
+            low, high = max(0, low - base), max(0, high - base)
+        else:
+            base = low
+        components.append((item, low, high, probability))
+    return components
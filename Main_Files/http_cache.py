@@ -0,0 +1,131 @@
+import gzip
+import zlib
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import record_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_THRESHOLD = 1024
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html", "text/css", "application/javascript", "text/javascript")
+IMMUTABLE_MAX_AGE = 31536000
+# Compressed bodies kept per (ETag, encoding), least recently used dropped first
+COMPRESSED_CACHE_SIZE = 64
+
+# In-memory content versions restart at 1 with the process, so ETags built from them carry this too
+BOOT_ID = uuid.uuid4().hex[:8]
+
+_compressed = OrderedDict()
+_compressed_lock = threading.Lock()
+
+
+def versioned_etag(*parts):
+    """ETag for a response that is fully determined by parts, e.g. a file path and its store version"""
+    return hashlib.sha1(repr((BOOT_ID,) + parts).encode()).hexdigest()[:20]
+
+def not_modified(request, etag):
+    return request.method in ("GET", "HEAD") and request.if_none_match.contains_weak(etag)
+
+def set_immutable(response):
+    """Let browsers keep a response whose URL changes with its content"""
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    response.cache_control.no_cache = None
+    return response
+
+def choose_encoding(request):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+def compress(data, encoding, etag=None):
+    """Compress data, reusing the result for a strong ETag that was already compressed this way"""
+    if etag is None:
+        return brotli.compress(data, quality=5) if encoding == "br" else gzip.compress(data, compresslevel=6)
+
+    with _compressed_lock:
+        compressed = _compressed.get((etag, encoding))
+        if compressed is not None:
+            _compressed.move_to_end((etag, encoding))
+    record_cache("compressed_bodies", compressed is not None)
+    if compressed is None:
+        compressed = compress(data, encoding)
+        with _compressed_lock:
+            _compressed[(etag, encoding)] = compressed
+            while len(_compressed) > COMPRESSED_CACHE_SIZE:
+                _compressed.popitem(last=False)
+    return compressed
+
+def compress_response(response, request, threshold=COMPRESSION_THRESHOLD):
+    """Compress a buffered text/JSON response in place when it is large enough to be worth it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < threshold:
+        return response
+
+    # A strong ETag names exactly these bytes, so their compressed form can be reused
+    etag, weak = response.get_etag()
+    response.set_data(compress(data, encoding, etag if etag and not weak else None))
+    response.headers["Content-Encoding"] = encoding
+    # The encoded bytes differ per encoding, so only a weak validator still describes them
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def compress_stream(response, request):
+    """Gzip a generated response chunk by chunk, flushing after each so the client still sees it arrive incrementally"""
+    if (response.status_code != 200 or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"]:
+        return response
+
+    chunks = response.response
+    def compressed():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            # Flask lets a generator yield text as well as bytes
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    response.response = compressed()
+    response.headers.pop("Content-Length", None)
+    response.headers["Content-Encoding"] = "gzip"
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def finalize_response(response, request):
+    """Add validators to JSON GET responses, answer 304 when they match, then compress"""
+    if request.method in ("GET", "HEAD") and response.status_code == 200 and not response.direct_passthrough and not response.is_streamed:
+        if response.mimetype == "application/json":
+            if response.get_etag()[0] is None:
+                response.add_etag()
+            if not response.cache_control.max_age and not response.cache_control.no_store:
+                response.cache_control.no_cache = True
+            response = response.make_conditional(request)
+    if response.is_streamed and not response.direct_passthrough:
+        return compress_stream(response, request)
+    return compress_response(response, request)
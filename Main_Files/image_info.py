@@ -0,0 +1,112 @@
+import os
+import struct
+import threading
+
+from storage import file_signature, load_json_file, save_json_file
+from metrics import record_cache
+
+
+def read_image_size(path):
+    """Read [width, height] from a PNG/JPEG/GIF/WebP header without decoding the image"""
+    with open(path, "rb") as f:
+        head = f.read(32)
+
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", head[16:24])
+            return [width, height]
+
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            width, height = struct.unpack("<HH", head[6:10])
+            return [width, height]
+
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return [width & 0x3FFF, height & 0x3FFF]
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return [(bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1]
+            if chunk == b"VP8X":
+                return [int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1]
+            return None
+
+        if head[:2] == b"\xff\xd8":
+            return _read_jpeg_size(f)
+
+    return None
+
+def _read_jpeg_size(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+
+        # SOF0-SOF15 carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) are not frames
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return [width, height]
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageSizeCache:
+    """Image dimensions keyed by path, persisted to disk and invalidated by mtime/size"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self._sizes = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def get(self, path, key=None):
+        key = key or path
+        signature = file_signature(path)
+        if signature is None:
+            return None
+
+        with self._lock:
+            if self._sizes is None:
+                self._sizes = load_json_file(self.cache_file, {})
+            cached = self._sizes.get(key)
+            hit = bool(cached) and cached.get("mtime") == signature[0] and cached.get("size") == signature[1]
+        record_cache("image_sizes", hit)
+        if hit:
+            return cached["dimensions"]
+
+        try:
+            dimensions = read_image_size(path)
+        except OSError:
+            dimensions = None
+        if dimensions is None:
+            return None
+
+        with self._lock:
+            self._sizes[key] = {"mtime": signature[0], "size": signature[1], "dimensions": dimensions}
+            self._dirty = True
+        return dimensions
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                save_json_file(self.cache_file, self._sizes)
+                self._dirty = False
+            except OSError as e:
+                print(f"Error saving image size cache: {e}")
@@ -0,0 +1,120 @@
+import os
+import queue
+import atexit
+import hashlib
+import tempfile
+import threading
+
+from storage import LOCK_SUFFIX, file_lock, load_json_file, save_json_file
+
+INDEX_FILE = "image-index.json"
+UPLOAD_SUFFIX = ".upload"
+# Bookkeeping that shares the images folder but is never an image
+INTERNAL_FILES = (INDEX_FILE, INDEX_FILE + LOCK_SUFFIX)
+
+
+def is_internal_file(filename):
+    return filename in INTERNAL_FILES or filename.endswith(UPLOAD_SUFFIX)
+
+
+class ImageStore:
+    """Content-addressed uploaded images with per-folder reference counts.
+
+    Files are named after the SHA-256 of their bytes, so uploading the same
+    image again only bumps its count in images/image-index.json. A file is
+    removed once its last reference is released. Files that predate the index
+    (random uuid names) count as a single reference.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._release_queue = queue.Queue()
+        self._worker = None
+        atexit.register(self.drain)
+
+    def _index_path(self, images_folder):
+        return os.path.join(images_folder, INDEX_FILE)
+
+    def add(self, images_folder, chunks, file_extension):
+        """Store an upload given as an iterable of byte chunks and return its filename"""
+        os.makedirs(images_folder, exist_ok=True)
+        digest = hashlib.sha256()
+
+        fd, temp_path = tempfile.mkstemp(dir=images_folder, suffix=UPLOAD_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            filename = f"{digest.hexdigest()[:32]}.{file_extension}"
+            target_path = os.path.join(images_folder, filename)
+            with self._lock, file_lock(self._index_path(images_folder)):
+                index = load_json_file(self._index_path(images_folder), {})
+                if os.path.exists(target_path):
+                    os.remove(temp_path)
+                    index[filename] = index.get(filename, 1) + 1
+                else:
+                    os.replace(temp_path, target_path)
+                    index[filename] = 1
+                save_json_file(self._index_path(images_folder), index)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return filename
+
+    def release(self, images_folder, filename):
+        """Drop one reference to filename; returns False if the image does not exist"""
+        if is_internal_file(filename):
+            return False
+        image_path = os.path.join(images_folder, filename)
+        with self._lock, file_lock(self._index_path(images_folder)):
+            index = load_json_file(self._index_path(images_folder), {})
+            tracked = filename in index
+            count = index.pop(filename, 1) - 1
+
+            if not os.path.exists(image_path):
+                if tracked:
+                    save_json_file(self._index_path(images_folder), index)
+                return False
+
+            if count > 0:
+                index[filename] = count
+            else:
+                os.remove(image_path)
+            if tracked:
+                save_json_file(self._index_path(images_folder), index)
+            return True
+
+    def release_later(self, images_folder, filenames):
+        """Queue releases for the background worker so the caller does not wait on disk"""
+        for filename in filenames:
+            self._release_queue.put((images_folder, filename))
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            self._release_next(self._release_queue.get())
+
+    def _release_next(self, job):
+        images_folder, filename = job
+        try:
+            if self.release(images_folder, filename):
+                print(f"Released image: {filename}")
+        except Exception as e:
+            print(f"Error deleting image {filename}: {e}")
+        finally:
+            self._release_queue.task_done()
+
+    def drain(self):
+        """Process whatever is still queued; called at exit"""
+        while True:
+            try:
+                job = self._release_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._release_next(job)
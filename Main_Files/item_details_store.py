@@ -0,0 +1,123 @@
+import atexit
+import itertools
+import threading
+
+from storage import file_signature, file_lock, load_json_file, save_json_file
+from metrics import record_cache
+
+_versions = itertools.count(1)
+
+
+class ItemDetailsDocument:
+    def __init__(self, details_file):
+        self.details_file = details_file
+        self.signature = file_signature(details_file)
+        self.items = load_json_file(details_file, {})
+        self.version = next(_versions)
+        self.dirty = False
+
+
+class ItemDetailsStore:
+    """Keeps each map's item-details.json in memory and writes changes back after a short delay.
+
+    Several edits inside write_delay seconds (e.g. dragging an infobox's size)
+    are coalesced into one atomic rewrite of the file. With write_delay 0 every
+    edit re-reads, changes and writes the file under its lock, which is what
+    several worker processes sharing the files need.
+    """
+
+    def __init__(self, write_delay=1.0, change_log=None):
+        self.write_delay = write_delay
+        self.change_log = change_log
+        self._documents = {}
+        self._lock = threading.RLock()
+        self._write_timer = None
+        atexit.register(self.flush)
+
+    def _document(self, details_file):
+        document = self._documents.get(details_file)
+        # Pick up hand edits, unless we still have unsaved changes of our own
+        hit = document is not None and (document.dirty or document.signature == file_signature(details_file))
+        record_cache("item_details", hit)
+        if not hit:
+            document = ItemDetailsDocument(details_file)
+            self._documents[details_file] = document
+        return document
+
+    def get(self, details_file):
+        with self._lock:
+            return dict(self._document(details_file).items)
+
+    def version(self, details_file):
+        with self._lock:
+            return self._document(details_file).version
+
+    def snapshot(self, details_file):
+        """Return (version, items); the version changes whenever the document does"""
+        with self._lock:
+            document = self._document(details_file)
+            return document.version, dict(document.items)
+
+    def get_item(self, details_file, item_key):
+        with self._lock:
+            return self._document(details_file).items.get(item_key)
+
+    def replace(self, details_file, items):
+        with self._lock, file_lock(details_file):
+            document = self._document(details_file)
+            previous, document.items = document.items, dict(items)
+            self._mark_dirty(document)
+            self._record_changes(details_file, [key for key in set(previous) | set(document.items)
+                                                if previous.get(key) != document.items.get(key)])
+
+    def upsert(self, details_file, item_key, fields, merge=True):
+        """Create or update one item; with merge the given fields are layered over the stored ones"""
+        with self._lock, file_lock(details_file):
+            document = self._document(details_file)
+            existing = document.items.get(item_key)
+            item = dict(existing, **fields) if merge and isinstance(existing, dict) else dict(fields)
+            document.items[item_key] = item
+            self._mark_dirty(document)
+            self._record_changes(details_file, [item_key])
+            return item
+
+    def delete(self, details_file, item_keys):
+        """Remove items and return {item_key: removed_item} for the ones that existed"""
+        with self._lock, file_lock(details_file):
+            document = self._document(details_file)
+            removed = {key: document.items.pop(key) for key in item_keys if key in document.items}
+            if removed:
+                self._mark_dirty(document)
+                self._record_changes(details_file, list(removed))
+            return removed
+
+    def _record_changes(self, details_file, item_keys):
+        if self.change_log is not None:
+            self.change_log.record("itemDetails", details_file, sorted(item_keys))
+
+    def _mark_dirty(self, document):
+        document.version = next(_versions)
+        document.dirty = True
+        if self.write_delay <= 0:
+            self._write(document)
+        elif self._write_timer is None:
+            self._write_timer = threading.Timer(self.write_delay, self.flush)
+            self._write_timer.daemon = True
+            self._write_timer.start()
+
+    def _write(self, document):
+        with file_lock(document.details_file):
+            save_json_file(document.details_file, document.items)
+            document.signature = file_signature(document.details_file)
+        document.dirty = False
+
+    def flush(self):
+        """Write every document with pending changes"""
+        with self._lock:
+            self._write_timer = None
+            for document in self._documents.values():
+                if document.dirty:
+                    try:
+                        self._write(document)
+                    except OSError as e:
+                        print(f"Error saving {document.details_file}: {e}")
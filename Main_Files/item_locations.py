@@ -0,0 +1,106 @@
+import threading
+
+from drop_tables import split_drop_row
+from metrics import record_cache
+
+DROP_FIELDS = ("Drops", "Harvestable Drops", "Butchering")
+KINDS = ("markers", "droppedBy", "scrappedFrom", "recipes", "usedIn")
+
+
+def normalize_item_name(name):
+    return " ".join(name.lower().split())
+
+def preset_contributions(category_key, entries):
+    """Yield (item_name, kind, record_id, record) for drop tables, scrap results and recipes"""
+    for index, entry in enumerate(entries):
+        source = entry.get("item")
+        if not isinstance(source, str):
+            continue
+
+        for field in DROP_FIELDS:
+            for row_index, row in enumerate(entry.get(field) or []):
+                parsed = split_drop_row(row)
+                if parsed:
+                    quantity, item, chance = parsed
+                    yield item, "droppedBy", (category_key, index, field, row_index), {
+                        "source": source, "category": category_key, "field": field,
+                        "quantity": quantity, "chance": chance
+                    }
+
+        for name in entry.get("Scrap Result") or []:
+            if isinstance(name, str):
+                yield name, "scrappedFrom", (category_key, index), {"source": source, "category": category_key}
+
+        for recipe_index, recipe in enumerate(entry.get("Recipe") or []):
+            if not (isinstance(recipe, list) and len(recipe) == 2 and all(isinstance(part, list) for part in recipe)):
+                continue
+            ingredients, outputs = ([name for name in part if isinstance(name, str)] for part in recipe)
+            record = {"item": source, "category": category_key, "ingredients": ingredients, "outputs": outputs}
+            for name in outputs:
+                yield name, "recipes", (category_key, index, recipe_index), record
+            for name in ingredients:
+                yield name, "usedIn", (category_key, index, recipe_index), record
+
+def marker_contributions(markers):
+    for marker in markers:
+        for entry in marker.get("entries") or []:
+            if not isinstance(entry, dict):
+                continue
+            for item in entry.get("items") or []:
+                if isinstance(item, dict) and isinstance(item.get("itemname"), str):
+                    yield item["itemname"], "markers", marker.get("id"), {
+                        "map": marker.get("map"),
+                        "markerId": marker.get("id"),
+                        "name": marker.get("name", ""),
+                        "x": marker.get("x"),
+                        "y": marker.get("y"),
+                        "category": entry.get("category"),
+                        "subcategory": entry.get("subcategory"),
+                        "marked": item.get("marked") == 1
+                    }
+
+
+class ItemLocationIndex:
+    """Materialized item name -> markers, drop sources and recipes, kept per source like SearchIndex"""
+
+    def __init__(self):
+        self._sources = {}
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def update_source(self, source_key, version, contributions_factory):
+        with self._lock:
+            cached = self._sources.get(source_key)
+            record_cache("item_locations", cached is not None and cached[0] == version)
+            if cached is not None and cached[0] == version:
+                return
+            self._remove(source_key, cached[1] if cached else [])
+            added = []
+            for name, kind, record_id, record in contributions_factory():
+                item_key = normalize_item_name(name)
+                item = self._items.setdefault(item_key, {"name": name.strip(), **{k: {} for k in KINDS}})
+                item[kind][(source_key, record_id)] = record
+                added.append((item_key, kind, record_id))
+            self._sources[source_key] = (version, added)
+
+    def retain_sources(self, live_keys):
+        with self._lock:
+            for source_key in [key for key in self._sources if key not in live_keys]:
+                self._remove(source_key, self._sources.pop(source_key)[1])
+
+    def _remove(self, source_key, contributions):
+        for item_key, kind, record_id in contributions:
+            item = self._items.get(item_key)
+            if item is None:
+                continue
+            item[kind].pop((source_key, record_id), None)
+            if not any(item[k] for k in KINDS):
+                del self._items[item_key]
+
+    def lookup(self, name):
+        """Return everything known about where an item can be found, or None"""
+        with self._lock:
+            item = self._items.get(normalize_item_name(name))
+            if item is None:
+                return None
+            return {"item": item["name"], **{kind: list(item[kind].values()) for kind in KINDS}}
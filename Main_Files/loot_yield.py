@@ -0,0 +1,165 @@
+import threading
+from collections import Counter
+
+from drop_tables import drop_components
+from item_locations import DROP_FIELDS, normalize_item_name
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LootTable:
+    """Every drop table in the presets as parallel (source, item, min, max, probability) arrays"""
+
+    def __init__(self, preset_files):
+        self.source_names, self.item_names = [], []
+        self.source_index, self.item_index = {}, {}
+        columns = {"source": [], "item": [], "field": [], "min": [], "max": [], "probability": []}
+        seen = set()
+
+        for key, signature, entries in preset_files:
+            for entry in entries:
+                source = entry.get("item")
+                if not isinstance(source, str):
+                    continue
+                for field_index, field in enumerate(DROP_FIELDS):
+                    rows = entry.get(field)
+                    # The same object can be listed in several preset files
+                    if not rows or (normalize_item_name(source), field) in seen:
+                        continue
+                    seen.add((normalize_item_name(source), field))
+                    for row in rows:
+                        for item, low, high, probability in drop_components(row):
+                            columns["source"].append(self._intern(source, self.source_names, self.source_index))
+                            columns["item"].append(self._intern(item, self.item_names, self.item_index))
+                            columns["field"].append(field_index)
+                            columns["min"].append(low)
+                            columns["max"].append(high)
+                            columns["probability"].append(probability)
+
+        self.source = np.array(columns["source"], dtype=np.int32)
+        self.item = np.array(columns["item"], dtype=np.int32)
+        self.field = np.array(columns["field"], dtype=np.int8)
+        self.min = np.array(columns["min"], dtype=np.float64)
+        self.max = np.array(columns["max"], dtype=np.float64)
+        self.probability = np.array(columns["probability"], dtype=np.float64)
+        self.expected = self.probability * (self.min + self.max) / 2
+        self._matrices = {}
+
+    @staticmethod
+    def _intern(name, names, index):
+        key = normalize_item_name(name)
+        if key not in index:
+            index[key] = len(names)
+            names.append(name.strip())
+        return index[key]
+
+    def yield_matrix(self, fields):
+        """Dense sources x items matrix of expected drops per source for the given drop fields"""
+        fields = tuple(sorted(fields))
+        matrix = self._matrices.get(fields)
+        if matrix is None:
+            mask = np.isin(self.field, [DROP_FIELDS.index(field) for field in fields])
+            matrix = np.zeros((len(self.source_names), len(self.item_names)))
+            np.add.at(matrix, (self.source[mask], self.item[mask]), self.expected[mask])
+            self._matrices[fields] = matrix
+        return matrix
+
+
+def count_sources(markers, remaining=False):
+    """Count how often each item name is placed per map, optionally ignoring marked (looted) ones"""
+    counts = {}
+    for marker in markers:
+        map_counts = counts.setdefault(marker.get("map", ""), Counter())
+        for entry in marker.get("entries") or []:
+            if not isinstance(entry, dict):
+                continue
+            for item in entry.get("items") or []:
+                if not isinstance(item, dict) or not isinstance(item.get("itemname"), str):
+                    continue
+                if remaining and item.get("marked") == 1:
+                    continue
+                map_counts[normalize_item_name(item["itemname"])] += 1
+    return counts
+
+
+class LootYieldEngine:
+    """Expected item yields per map from the markers placed on it and the preset drop tables.
+
+    The drop table is rebuilt only when a preset file changes and per-map source
+    counts only when their marker file's version moves, so a query is a single
+    (maps x sources) @ (sources x items) product.
+    """
+
+    def __init__(self, marker_store):
+        self.marker_store = marker_store
+        self._table = None
+        self._table_signature = None
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def table(self, preset_files):
+        preset_files = list(preset_files)
+        signature = tuple((key, file_signature) for key, file_signature, entries in preset_files)
+        with self._lock:
+            if self._table is None or self._table_signature != signature:
+                self._table = LootTable(preset_files)
+                self._table_signature = signature
+            return self._table
+
+    def _map_counts(self, marker_files, remaining):
+        counts = {}
+        with self._lock:
+            for marker_file in marker_files:
+                version, markers = self.marker_store.snapshot(marker_file)
+                cached = self._counts.get((marker_file, remaining))
+                if cached is None or cached[0] != version:
+                    cached = (version, count_sources(markers, remaining))
+                    self._counts[(marker_file, remaining)] = cached
+                for map_path, map_counts in cached[1].items():
+                    counts.setdefault(map_path, Counter()).update(map_counts)
+            for key in [key for key in self._counts if key[0] not in marker_files]:
+                del self._counts[key]
+        return counts
+
+    def expected_yields(self, preset_files, marker_files, maps=None, item=None, fields=("Drops",), remaining=False):
+        """Return {map: {item: expected}} or, for a single item, {map: {"expected", "sources"}}"""
+        table = self.table(preset_files)
+        counts = self._map_counts(list(marker_files), remaining)
+        map_paths = sorted(path for path in counts if maps is None or path in maps)
+
+        source_counts = np.zeros((len(map_paths), len(table.source_names)))
+        for row, map_path in enumerate(map_paths):
+            for name, count in counts[map_path].items():
+                column = table.source_index.get(name)
+                if column is not None:
+                    source_counts[row, column] = count
+
+        matrix = table.yield_matrix(fields)
+        if item is not None:
+            column = table.item_index.get(normalize_item_name(item))
+            if column is None:
+                return None
+            per_source = source_counts * matrix[:, column]
+            results = {}
+            for row, map_path in enumerate(map_paths):
+                expected = per_source[row].sum()
+                if expected > 0:
+                    nonzero = np.flatnonzero(per_source[row])
+                    results[map_path] = {
+                        "expected": round(float(expected), 3),
+                        "sources": {table.source_names[i]: round(float(per_source[row, i]), 3) for i in nonzero}
+                    }
+            return results
+
+        totals = source_counts @ matrix
+        return {
+            map_path: {table.item_names[i]: round(float(totals[row, i]), 3) for i in np.flatnonzero(totals[row])}
+            for row, map_path in enumerate(map_paths)
+        }
@@ -0,0 +1,198 @@
+import math
+import threading
+
+from spatial_index import GridIndex, marker_point
+from metrics import record_cache
+
+# Same overlap distance as marker-merging.js: 32px icons merge when 30% overlapped
+CLUSTER_RADIUS = 32 * (1 - 0.3)
+MIN_ZOOM = -2
+MAX_ZOOM = 3
+# Each region is clustered on its own, so a marker edit only reclusters the region it is in;
+# clusters meeting at a region edge are merged afterwards. A region is eight merge distances
+# wide at MIN_ZOOM, where clusters are largest
+REGION_SIZE = 8 * CLUSTER_RADIUS * 2 ** -MIN_ZOOM
+
+
+def marker_categories(marker):
+    return {entry.get("category") or entry.get("type") or "Unknown"
+            for entry in marker.get("entries") or [] if isinstance(entry, dict)}
+
+def merge_clusters(members):
+    count = sum(member["count"] for member in members)
+    return {
+        "x": sum(member["x"] * member["count"] for member in members) / count,
+        "y": sum(member["y"] * member["count"] for member in members) / count,
+        "count": count,
+        "markerIds": [marker_id for member in members for marker_id in member["markerIds"]],
+        "categories": sorted({category for member in members for category in member["categories"]})
+    }
+
+def build_clusters(markers, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=CLUSTER_RADIUS):
+    """Greedy hierarchical clustering in the style of supercluster.
+
+    Level max_zoom clusters the raw markers, and every lower level clusters the
+    level above it. In L.CRS.Simple one map unit is 2**zoom screen pixels, so
+    the merge distance in map units is radius / 2**zoom.
+    """
+    current = []
+    for marker in markers:
+        point = marker_point(marker)
+        if point is not None:
+            current.append({
+                "x": point[0],
+                "y": point[1],
+                "count": 1,
+                "markerIds": [marker.get("id")],
+                "categories": sorted(marker_categories(marker))
+            })
+
+    # Past the clustering range every marker is drawn on its own
+    levels = {max_zoom + 1: current}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        distance = radius / 2 ** zoom
+        grid = GridIndex(cell_size=distance)
+        for index, cluster in enumerate(current):
+            grid.insert(index, (cluster["x"], cluster["y"]))
+
+        merged = []
+        visited = set()
+        for index, cluster in enumerate(current):
+            if index in visited:
+                continue
+            visited.add(index)
+
+            x, y = cluster["x"], cluster["y"]
+            neighbors = [other for other in grid.query(x - distance, y - distance, x + distance, y + distance)
+                         if other not in visited
+                         and (current[other]["x"] - x) ** 2 + (current[other]["y"] - y) ** 2 <= distance ** 2]
+            if not neighbors:
+                merged.append(cluster)
+                continue
+
+            visited.update(neighbors)
+            merged.append(merge_clusters([cluster] + [current[other] for other in neighbors]))
+
+        levels[zoom] = merged
+        current = merged
+    return levels
+
+
+def marker_region(point):
+    return (math.floor(point[0] / REGION_SIZE), math.floor(point[1] / REGION_SIZE))
+
+def marker_order(marker):
+    """Cluster a region's markers in a fixed order, so an incremental update matches a full rebuild"""
+    x, y = marker_point(marker)
+    return (x, y, str(marker.get("id")))
+
+def stitch_regions(region_clusters, distance):
+    """Merge clusters from different regions that lie within distance of each other across a region edge.
+
+    region_clusters is [(region, clusters)] for one zoom level. Only clusters
+    within distance of their region's border can have such a neighbour.
+    """
+    stitched, edge = [], []
+    for region, clusters in region_clusters:
+        for cluster in clusters:
+            offset_x, offset_y = cluster["x"] - region[0] * REGION_SIZE, cluster["y"] - region[1] * REGION_SIZE
+            if min(offset_x, offset_y, REGION_SIZE - offset_x, REGION_SIZE - offset_y) <= distance:
+                edge.append((region, cluster))
+            else:
+                stitched.append(cluster)
+
+    grid = GridIndex(cell_size=distance)
+    for index, (_, cluster) in enumerate(edge):
+        grid.insert(index, (cluster["x"], cluster["y"]))
+
+    visited = set()
+    for index, (region, cluster) in enumerate(edge):
+        if index in visited:
+            continue
+        visited.add(index)
+
+        x, y = cluster["x"], cluster["y"]
+        neighbors = [other for other in grid.query(x - distance, y - distance, x + distance, y + distance)
+                     if other not in visited and edge[other][0] != region
+                     and (edge[other][1]["x"] - x) ** 2 + (edge[other][1]["y"] - y) ** 2 <= distance ** 2]
+        visited.update(neighbors)
+        stitched.append(merge_clusters([cluster] + [edge[other][1] for other in neighbors]) if neighbors else cluster)
+    return stitched
+
+
+class MapClusters:
+    """Cluster levels of one map, kept per region so an edit only reclusters the regions it touched"""
+
+    def __init__(self):
+        self.version = None
+        self.markers = {}
+        self.members = {}
+        self.levels = {}
+        self._stitched = {}
+
+    def update(self, version, markers):
+        # MarkerStore replaces a marker's dict when it changes, so unchanged markers are the same objects
+        current = {id(marker): marker for marker in markers}
+        touched = set()
+        for marker_key in self.markers.keys() - current.keys():
+            region = self._region(self.markers.pop(marker_key))
+            if region is not None:
+                self.members[region].pop(marker_key, None)
+                touched.add(region)
+        for marker_key in current.keys() - self.markers.keys():
+            marker = self.markers[marker_key] = current[marker_key]
+            region = self._region(marker)
+            if region is not None:
+                self.members.setdefault(region, {})[marker_key] = marker
+                touched.add(region)
+
+        for region in touched:
+            if self.members.get(region):
+                self.levels[region] = build_clusters(sorted(self.members[region].values(), key=marker_order))
+            else:
+                self.members.pop(region, None)
+                self.levels.pop(region, None)
+        if touched:
+            self._stitched = {}
+        self.version = version
+        return len(touched)
+
+    @staticmethod
+    def _region(marker):
+        point = marker_point(marker)
+        return marker_region(point) if point is not None else None
+
+    def clusters(self, zoom, bbox=None):
+        level = self._stitched.get(zoom)
+        if level is None:
+            region_clusters = [(region, levels[zoom]) for region, levels in sorted(self.levels.items())]
+            if zoom > MAX_ZOOM:
+                level = [cluster for _, clusters in region_clusters for cluster in clusters]
+            else:
+                level = stitch_regions(region_clusters, CLUSTER_RADIUS / 2 ** zoom)
+            self._stitched[zoom] = level
+
+        if bbox is None:
+            return level
+        min_x, min_y, max_x, max_y = bbox
+        return [cluster for cluster in level if min_x <= cluster["x"] <= max_x and min_y <= cluster["y"] <= max_y]
+
+
+class ClusterCache:
+    """Cluster levels per markers file, brought up to date on the first request after that map's markers changed"""
+
+    def __init__(self, marker_store):
+        self.marker_store = marker_store
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def get(self, marker_file, zoom, bbox=None):
+        version, markers = self.marker_store.snapshot(marker_file)
+        with self._lock:
+            state = self._maps.get(marker_file)
+            if state is None:
+                state = self._maps[marker_file] = MapClusters()
+            record_cache("marker_clusters", state.version == version)
+            if state.version != version:
+                state.update(version, markers)
+            return state.clusters(min(max(round(zoom), MIN_ZOOM), MAX_ZOOM + 1), bbox)
@@ -0,0 +1,331 @@
+import os
+import atexit
+import heapq
+import itertools
+import threading
+
+from storage import file_signature, file_lock, parse_json_lines, save_json_lines, append_json_lines
+from spatial_index import GridIndex, marker_point
+from metrics import record_cache
+
+JOURNAL_SUFFIX = ".journal"
+# First line of markers.txt; files without it hold markers placed in the old fixed 1280x720 map frame
+MARKER_FORMAT = 2
+FORMAT_HEADER = {"markerFormat": MARKER_FORMAT}
+
+_anonymous_ids = itertools.count()
+_versions = itertools.count(1)
+
+
+def marker_key(marker):
+    """Markers are keyed by id; markers without one still get a unique slot"""
+    marker_id = marker.get("id")
+    return marker_id if marker_id is not None else ("anonymous", next(_anonymous_ids))
+
+
+class MapMarkers:
+    """In-memory state of a single markers.txt plus its journal"""
+
+    def __init__(self, marker_file):
+        self.marker_file = marker_file
+        self.journal_file = marker_file + JOURNAL_SUFFIX
+        self.markers = {}
+        # Position of each marker in markers order, so a bbox query can return its matches in file order
+        self.positions = {}
+        self._next_position = itertools.count()
+        self.grid = GridIndex()
+        self.version = next(_versions)
+        self.journal_entries = 0
+        self.signature = None
+        # legacy: markers.txt has no format header and its markers were upgraded in memory;
+        # unconverted: it has none and could not be upgraded yet, so it must not be rewritten
+        self.legacy = False
+        self.unconverted = False
+
+    def current_signature(self):
+        return (file_signature(self.marker_file), file_signature(self.journal_file))
+
+    def set(self, key, marker):
+        if key not in self.markers:
+            self.positions[key] = next(self._next_position)
+        self.markers[key] = marker
+        self.grid.insert(key, marker_point(marker))
+        self.version = next(_versions)
+
+    def remove(self, key):
+        self.grid.remove(key)
+        self.positions.pop(key, None)
+        self.version = next(_versions)
+        return self.markers.pop(key, None)
+
+    def apply(self, record):
+        op = record.get("op")
+        if op == "put" and isinstance(record.get("marker"), dict):
+            self.set(marker_key(record["marker"]), record["marker"])
+        elif op == "delete":
+            self.remove(record.get("id"))
+        elif op == "batch" and isinstance(record.get("records"), list):
+            for change in record["records"]:
+                if isinstance(change, dict):
+                    self.apply(change)
+
+
+class MarkerStore:
+    """Keeps each map's markers in memory and persists single edits by appending to a journal.
+
+    The journal is folded back into markers.txt by a background compaction, so a
+    create/update/delete costs one small append instead of a full rewrite. Every
+    write holds the map's file lock and re-reads the files first if another
+    worker process changed them, so several processes can share one maps folder.
+    """
+
+    def __init__(self, compact_threshold=200, compact_delay=5.0, change_log=None, upgrade_legacy_marker=None):
+        self.compact_threshold = compact_threshold
+        self.compact_delay = compact_delay
+        self.change_log = change_log
+        self.upgrade_legacy_marker = upgrade_legacy_marker
+        self._maps = {}
+        self._id_index = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._compact_timer = None
+        atexit.register(self.compact_all)
+
+    def _load(self, marker_file):
+        state = MapMarkers(marker_file)
+        # Taken before reading, so a write that lands mid-read shows up as a change next time
+        state.signature = state.current_signature()
+        lines = parse_json_lines(marker_file)
+        if lines and isinstance(lines[0], dict) and "markerFormat" in lines[0]:
+            lines = lines[1:]
+        elif lines and self.upgrade_legacy_marker is not None:
+            # Journal records are always written in the current format, so only the base file is upgraded
+            upgraded = [self.upgrade_legacy_marker(marker) if isinstance(marker, dict) else marker for marker in lines]
+            if any(marker is None for marker in upgraded):
+                # Converting only some markers would leave the file in two frames, so wait until all of them can be
+                state.unconverted = True
+                print(f"Cannot upgrade {marker_file} yet: its map image size is unknown")
+            else:
+                state.legacy = True
+                lines = upgraded
+        for marker in lines:
+            if isinstance(marker, dict):
+                state.set(marker_key(marker), marker)
+        for record in parse_json_lines(state.journal_file):
+            state.apply(record)
+            state.journal_entries += 1
+        return state
+
+    def _reload(self, marker_file):
+        state = self._maps.get(marker_file)
+        if state is not None:
+            self._unindex(state)
+        state = self._load(marker_file)
+        self._maps[marker_file] = state
+        for marker_id in state.markers:
+            self._id_index[marker_id] = marker_file
+        if state.journal_entries:
+            self._dirty.add(marker_file)
+        return state
+
+    def _state(self, marker_file):
+        state = self._maps.get(marker_file)
+        # Reload when the files were edited outside the app since we last touched them
+        hit = state is not None and state.signature == state.current_signature()
+        record_cache("markers", hit)
+        if not hit:
+            state = self._reload(marker_file)
+            if state.legacy:
+                # Write the upgraded markers back straight away, so they are only ever converted once
+                try:
+                    self.compact(marker_file)
+                except OSError as e:
+                    print(f"Error upgrading {marker_file}: {e}")
+        return state
+
+    def _unindex(self, state):
+        for marker_id in state.markers:
+            if self._id_index.get(marker_id) == state.marker_file:
+                del self._id_index[marker_id]
+
+    def index_folder(self, maps_folder):
+        """Load every markers file under maps_folder so ids can be looked up directly"""
+        with self._lock:
+            seen = set()
+            for root, dirs, files in os.walk(maps_folder):
+                if "markers.txt" in files or "markers.txt" + JOURNAL_SUFFIX in files:
+                    marker_file = os.path.join(root, "markers.txt")
+                    seen.add(marker_file)
+                    self._state(marker_file)
+            # Forget files that vanished from disk, but never ones holding unsaved changes
+            for marker_file in [f for f in self._maps if f not in seen and f not in self._dirty]:
+                self._unindex(self._maps.pop(marker_file))
+
+    def find_marker_file(self, marker_id, maps_folder):
+        """Return the markers file holding marker_id, re-indexing if files changed on disk"""
+        with self._lock:
+            marker_file = self._id_index.get(marker_id)
+            if marker_file is not None:
+                # Re-validates the file signature, reloading it if it was edited externally
+                self._state(marker_file)
+                if self._id_index.get(marker_id) == marker_file:
+                    return marker_file
+            self.index_folder(maps_folder)
+            return self._id_index.get(marker_id)
+
+    def get_markers(self, marker_file):
+        with self._lock:
+            return list(self._state(marker_file).markers.values())
+
+    def version(self, marker_file):
+        with self._lock:
+            return self._state(marker_file).version
+
+    def snapshot(self, marker_file):
+        """Return (version, markers); the version changes whenever this map's markers do"""
+        with self._lock:
+            state = self._state(marker_file)
+            return state.version, list(state.markers.values())
+
+    def query_bbox(self, marker_file, bbox, limit=None):
+        """Return markers whose coordinates fall inside bbox = (min_x, min_y, max_x, max_y).
+
+        Matches come in the same order as get_markers, so with a limit the result
+        is the first limit markers of the file that lie inside the box.
+        """
+        with self._lock:
+            state = self._state(marker_file)
+            keys = state.grid.query(*bbox)
+            if limit is None:
+                keys = sorted(keys, key=state.positions.__getitem__)
+            else:
+                keys = heapq.nsmallest(limit, keys, key=state.positions.__getitem__)
+            return [state.markers[key] for key in keys]
+
+    def get_marker(self, marker_file, marker_id):
+        with self._lock:
+            return self._state(marker_file).markers.get(marker_id)
+
+    def put(self, marker_file, marker):
+        """Create or replace a marker, keeping its position if it already exists"""
+        with self._lock, file_lock(marker_file):
+            state = self._state(marker_file)
+            key = marker_key(marker)
+            state.set(key, marker)
+            self._id_index[key] = marker_file
+            self._journal(state, [{"op": "put", "marker": marker}])
+            self._record_changes(marker_file, [key])
+
+    def delete(self, marker_file, marker_id):
+        """Remove a marker and return it, or None if it was not on this map"""
+        with self._lock, file_lock(marker_file):
+            state = self._state(marker_file)
+            marker = state.remove(marker_id)
+            if marker is not None:
+                if self._id_index.get(marker_id) == marker_file:
+                    del self._id_index[marker_id]
+                self._journal(state, [{"op": "delete", "id": marker_id}])
+                self._record_changes(marker_file, [marker_id])
+            return marker
+
+    def apply_batch(self, changes, maps_folder=None):
+        """Apply (marker_file, op, value) changes with one journal append per touched file.
+
+        op is "put" (value is the marker) or "delete" (value is the id; marker_file may be
+        None to look the id up, including markers created earlier in the same batch).
+        Returns (marker_file, marker) per change, with marker None for an unknown id.
+        Files are locked one at a time, so a batch never waits on two locks at once.
+        """
+        with self._lock:
+            created = {}
+            by_file = {}
+            results = [(None, None)] * len(changes)
+            for index, (marker_file, op, value) in enumerate(changes):
+                if op == "put":
+                    created[marker_key(value)] = marker_file
+                elif marker_file is None:
+                    marker_file = created.get(value) or self._id_index.get(value)
+                    if marker_file is None and maps_folder:
+                        marker_file = self.find_marker_file(value, maps_folder)
+                    if marker_file is None:
+                        continue
+                by_file.setdefault(marker_file, []).append((index, op, value))
+
+            for marker_file, file_changes in by_file.items():
+                with file_lock(marker_file):
+                    state = self._state(marker_file)
+                    records = []
+                    changed = []
+                    for index, op, value in file_changes:
+                        if op == "put":
+                            key = marker_key(value)
+                            state.set(key, value)
+                            self._id_index[key] = marker_file
+                            records.append({"op": "put", "marker": value})
+                            changed.append(key)
+                            results[index] = (marker_file, value)
+                        else:
+                            marker = state.remove(value)
+                            if marker is not None:
+                                if self._id_index.get(value) == marker_file:
+                                    del self._id_index[value]
+                                records.append({"op": "delete", "id": value})
+                                changed.append(value)
+                            results[index] = (marker_file, marker)
+                    if records:
+                        # One journal line per file, so a torn append loses the whole batch rather than half of it
+                        self._journal(state, [{"op": "batch", "records": records}])
+                        self._record_changes(marker_file, changed)
+            return results
+
+    def _journal(self, state, records):
+        append_json_lines(state.journal_file, records)
+        state.journal_entries += len(records)
+        state.signature = state.current_signature()
+        self._dirty.add(state.marker_file)
+        self._schedule_compaction(0 if state.journal_entries >= self.compact_threshold else self.compact_delay)
+
+    def _record_changes(self, marker_file, keys):
+        if self.change_log is not None:
+            # Markers without an id cannot be looked up again, so there is nothing to report for them
+            self.change_log.record("marker", marker_file, [key for key in keys if not isinstance(key, tuple)])
+
+    def _schedule_compaction(self, delay):
+        if self._compact_timer is not None:
+            if delay > 0:
+                return
+            self._compact_timer.cancel()
+        self._compact_timer = threading.Timer(delay, self.compact_all)
+        self._compact_timer.daemon = True
+        self._compact_timer.start()
+
+    def compact(self, marker_file):
+        """Rewrite markers.txt from memory and drop the journal"""
+        with self._lock, file_lock(marker_file):
+            state = self._maps.get(marker_file)
+            if state is None:
+                return
+            if state.signature != state.current_signature() or state.unconverted:
+                # Another process changed the files, or the map image may be readable now; our edits are
+                # in the journal, so reload and fold that
+                state = self._reload(marker_file)
+            if state.unconverted:
+                # The journal keeps the edits until the legacy markers can be converted
+                self._dirty.discard(marker_file)
+                return
+            save_json_lines(marker_file, [FORMAT_HEADER, *state.markers.values()])
+            if os.path.exists(state.journal_file):
+                os.remove(state.journal_file)
+            state.journal_entries = 0
+            state.legacy = False
+            state.signature = state.current_signature()
+            self._dirty.discard(marker_file)
+
+    def compact_all(self):
+        with self._lock:
+            self._compact_timer = None
+            for marker_file in list(self._dirty):
+                try:
+                    self.compact(marker_file)
+                except OSError as e:
+                    print(f"Error compacting {marker_file}: {e}")
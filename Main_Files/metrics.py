@@ -0,0 +1,129 @@
+import sys
+import bisect
+import threading
+from collections import Counter
+
+# Request latency buckets in seconds, Prometheus-style upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+IO_COUNTERS = {
+    "files_opened": "Files opened while serving requests",
+    "bytes_read": "Bytes read through the storage helpers",
+    "bytes_written": "Bytes written through the storage helpers",
+    "json_lines_parsed": "JSON lines parsed",
+    "directory_scans": "Directory listings (listdir/scandir, including each os.walk step)"
+}
+
+_current = threading.local()
+_hooks_installed = False
+
+
+def count(name, amount=1):
+    """Add to an I/O counter of the request running on this thread; a no-op outside requests"""
+    counters = getattr(_current, "counters", None)
+    if counters is not None:
+        counters[name] += amount
+
+def _audit_hook(event, args):
+    counters = getattr(_current, "counters", None)
+    if counters is None:
+        return
+    if event == "open":
+        counters["files_opened"] += 1
+    elif event in ("os.listdir", "os.scandir"):
+        counters["directory_scans"] += 1
+
+def install_io_hooks():
+    """Count file opens and directory listings through audit hooks; they cannot be removed again"""
+    global _hooks_installed
+    if not _hooks_installed:
+        sys.addaudithook(_audit_hook)
+        _hooks_installed = True
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(**labels):
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-endpoint latency histograms, I/O counters and cache hit counts for /api/metrics"""
+
+    def __init__(self):
+        self._latency = {}
+        self._requests = Counter()
+        self._io = {}
+        self._cache = Counter()
+        self._lock = threading.Lock()
+
+    def start_request(self):
+        _current.counters = Counter()
+
+    def finish_request(self, endpoint, method, status, seconds):
+        """Record a finished request and return its I/O counters"""
+        counters = getattr(_current, "counters", None) or Counter()
+        _current.counters = None
+        with self._lock:
+            self._latency.setdefault((endpoint, method), Histogram()).observe(seconds)
+            self._requests[(endpoint, method, status)] += 1
+            self._io.setdefault(endpoint, Counter()).update(counters)
+        return counters
+
+    def record_cache(self, cache, hit):
+        with self._lock:
+            self._cache[(cache, "hit" if hit else "miss")] += 1
+
+    def render(self, prefix="abiotic_maps"):
+        """Everything collected so far in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_request_duration_seconds Request latency by endpoint",
+                f"# TYPE {prefix}_request_duration_seconds histogram"
+            ]
+            for (endpoint, method), histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.bucket_labels(histogram), histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{prefix}_request_duration_seconds_bucket{format_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}")
+                labels = format_labels(endpoint=endpoint, method=method)
+                lines.append(f"{prefix}_request_duration_seconds_sum{labels} {histogram.total:.6f}")
+                lines.append(f"{prefix}_request_duration_seconds_count{labels} {histogram.count}")
+
+            lines += [f"# HELP {prefix}_requests_total Requests by endpoint and status", f"# TYPE {prefix}_requests_total counter"]
+            for (endpoint, method, status), value in sorted(self._requests.items()):
+                lines.append(f"{prefix}_requests_total{format_labels(endpoint=endpoint, method=method, status=status)} {value}")
+
+            for name, description in IO_COUNTERS.items():
+                lines += [f"# HELP {prefix}_{name}_total {description}", f"# TYPE {prefix}_{name}_total counter"]
+                for endpoint, counters in sorted(self._io.items()):
+                    lines.append(f"{prefix}_{name}_total{format_labels(endpoint=endpoint)} {counters[name]}")
+
+            lines += [f"# HELP {prefix}_cache_requests_total Cache lookups by result", f"# TYPE {prefix}_cache_requests_total counter"]
+            for (cache, result), value in sorted(self._cache.items()):
+                lines.append(f"{prefix}_cache_requests_total{format_labels(cache=cache, result=result)} {value}")
+            lines += [f"# HELP {prefix}_cache_hit_ratio Share of cache lookups that were hits", f"# TYPE {prefix}_cache_hit_ratio gauge"]
+            for cache in sorted({cache for cache, result in self._cache}):
+                hits, misses = self._cache[(cache, "hit")], self._cache[(cache, "miss")]
+                lines.append(f"{prefix}_cache_hit_ratio{format_labels(cache=cache)} {hits / (hits + misses):.4f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def bucket_labels(histogram):
+        return [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+
+
+metrics = Metrics()
+record_cache = metrics.record_cache
@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import threading
+
+from storage import file_signature
+from metrics import record_cache
+
+
+class AssetIndex:
+    """In-memory listing of the assets tree so image checks are set lookups instead of stats.
+
+    refresh() costs one stat per known directory and only re-lists a directory
+    whose mtime changed (a file or subfolder was added, removed or renamed).
+    """
+
+    def __init__(self, assets_root):
+        self.assets_root = os.path.normpath(assets_root)
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            seen = set()
+            self._refresh_dir(self.assets_root, seen)
+            for stale in [d for d in self._dirs if d not in seen]:
+                del self._dirs[stale]
+
+    def _refresh_dir(self, directory, seen):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        seen.add(directory)
+        cached = self._dirs.get(directory)
+        if cached is None or cached[0] != mtime:
+            files, subdirs = set(), []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    else:
+                        files.add(entry.name)
+            cached = (mtime, files, subdirs)
+            self._dirs[directory] = cached
+        for name in cached[2]:
+            self._refresh_dir(os.path.join(directory, name), seen)
+
+    def exists(self, path):
+        directory, name = os.path.split(os.path.normpath(path))
+        cached = self._dirs.get(directory)
+        return cached is not None and name in cached[1]
+
+    def folder_signature(self, folder):
+        cached = self._dirs.get(os.path.normpath(folder))
+        return cached[0] if cached is not None else None
+
+
+class PresetCatalog:
+    """Caches parsed preset files and the serialized /api/presets payload.
+
+    Each preset file is re-parsed only when its own mtime/size (or that of the
+    assets folder its images are checked against) changes; the combined JSON
+    body and its ETag are rebuilt only when one of the files changed.
+    """
+
+    def __init__(self, preset_folder, asset_index, load_entries):
+        self.preset_folder = preset_folder
+        self.asset_index = asset_index
+        self.assets_root = asset_index.assets_root
+        self.load_entries = load_entries
+        self._files = {}
+        self._payload = None
+        self._lock = threading.Lock()
+
+    def _signature(self, file_path, assets_folder):
+        return (file_signature(file_path), self.asset_index.folder_signature(assets_folder))
+
+    def get_entries(self, file_path, assets_folder):
+        """Return the parsed entries of one preset file, re-reading it only if it changed"""
+        self.asset_index.refresh()
+        with self._lock:
+            return self._entries(file_path, assets_folder)[0]
+
+    def _entries(self, file_path, assets_folder):
+        cache_key = (file_path, assets_folder)
+        signature = self._signature(file_path, assets_folder)
+        cached = self._files.get(cache_key)
+        record_cache("preset_files", cached is not None and cached[0] == signature)
+        if cached is not None and cached[0] == signature:
+            return cached[1], False
+        entries = self.load_entries(file_path, assets_folder)
+        self._files[cache_key] = (signature, entries)
+        return entries, True
+
+    def _scan(self, directory, category_prefix, found):
+        for item in os.listdir(directory):
+            item_path = os.path.join(directory, item)
+
+            if os.path.isfile(item_path) and item.endswith(".txt"):
+                key = f"{category_prefix}/{item[:-4]}" if category_prefix else item[:-4]
+                assets_folder = os.path.join(self.assets_root, category_prefix or key)
+                found.append((key, item_path, assets_folder))
+            elif os.path.isdir(item_path):
+                new_prefix = f"{category_prefix}/{item}" if category_prefix else item
+                self._scan(item_path, new_prefix, found)
+        return found
+
+    def get_files(self):
+        """Return [(category_key, signature, entries)] for every preset file"""
+        self.asset_index.refresh()
+        with self._lock:
+            found = self._scan(self.preset_folder, "", []) if os.path.isdir(self.preset_folder) else []
+            files = []
+            for key, file_path, assets_folder in found:
+                entries = self._entries(file_path, assets_folder)[0]
+                files.append((key, self._files[(file_path, assets_folder)][0], entries))
+            return files
+
+    def get_payload(self):
+        """Return (json_bytes, etag) for every preset file, grouped by category key"""
+        self.asset_index.refresh()
+        with self._lock:
+            found = self._scan(self.preset_folder, "", []) if os.path.isdir(self.preset_folder) else []
+            changed = self._payload is None or [key for key, _, _ in found] != self._payload[0]
+            result = {}
+            for key, file_path, assets_folder in found:
+                entries, reloaded = self._entries(file_path, assets_folder)
+                changed = changed or reloaded
+                result[key] = entries
+
+            if changed:
+                body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                self._payload = ([key for key, _, _ in found], body, hashlib.sha1(body).hexdigest())
+            return self._payload[1], self._payload[2]
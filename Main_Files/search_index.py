@@ -0,0 +1,209 @@
+import re
+import bisect
+import difflib
+import threading
+from collections import Counter
+
+from metrics import record_cache
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+# Tokens sharing the most bigrams (at least FUZZY_MIN_SHARED) with a query token that difflib then scores
+FUZZY_CANDIDATES = 50
+FUZZY_MIN_SHARED = 2
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def bigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def flatten_text(value):
+    """Collect every string inside nested lists/dicts, e.g. a preset's Drops table"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in flatten_text(item)]
+    if isinstance(value, (list, tuple)):
+        return [text for item in value for text in flatten_text(item)]
+    return []
+
+
+def preset_documents(category_key, entries):
+    for index, entry in enumerate(entries):
+        name = entry.get("item")
+        if not isinstance(name, str):
+            continue
+        texts = {name: 3.0}
+        for field in ("Drops", "Recipe", "Trade"):
+            for text in flatten_text(entry.get(field)):
+                texts.setdefault(text, 1.0)
+        yield ("preset", category_key, index), texts, {
+            "type": "preset",
+            "category": category_key,
+            "item": name,
+            "image": entry.get("image")
+        }
+
+def marker_documents(marker_file, markers):
+    for marker in markers:
+        item_names = [item.get("itemname") for entry in marker.get("entries") or [] if isinstance(entry, dict)
+                      for item in entry.get("items") or [] if isinstance(item, dict) and isinstance(item.get("itemname"), str)]
+        texts = {name: 2.0 for name in item_names}
+        if isinstance(marker.get("name"), str) and marker["name"]:
+            texts.setdefault(marker["name"], 2.0)
+        if texts:
+            yield ("marker", marker_file, marker.get("id")), texts, {
+                "type": "marker",
+                "map": marker.get("map"),
+                "markerId": marker.get("id"),
+                "name": marker.get("name", ""),
+                "items": item_names,
+                "x": marker.get("x"),
+                "y": marker.get("y")
+            }
+
+def item_details_documents(map_folder, items):
+    for item_key, item in items.items():
+        if not isinstance(item, dict):
+            continue
+        texts = {}
+        if isinstance(item.get("name"), str):
+            texts[item["name"]] = 2.0
+        for field in ("notes", "customDescription"):
+            if isinstance(item.get(field), str) and item[field]:
+                texts.setdefault(item[field], 1.0)
+        if texts:
+            yield ("itemDetails", map_folder, item_key), texts, {
+                "type": "itemDetails",
+                "map": map_folder,
+                "itemKey": item_key,
+                "name": item.get("name", "")
+            }
+
+
+class SearchIndex:
+    """Inverted index from tokens to documents, updated one source at a time.
+
+    A source (a preset file, a markers file, an item-details file) is only
+    re-tokenized when the version it is registered with changes. Documents are
+    added as (doc_id, {text: weight}, payload).
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._documents = {}
+        self._postings = {}
+        self._vocabulary = None
+        self._grams = {}
+        self._lock = threading.Lock()
+
+    def update_source(self, source_key, version, documents_factory):
+        """Replace a source's documents if its version changed; documents_factory is only called then"""
+        with self._lock:
+            cached = self._sources.get(source_key)
+            record_cache("search_index", cached is not None and cached[0] == version)
+            if cached is not None and cached[0] == version:
+                return
+            self._remove_documents(cached[1] if cached else [])
+            doc_ids = []
+            for doc_id, texts, payload in documents_factory():
+                self._add_document(doc_id, texts, payload)
+                doc_ids.append(doc_id)
+            self._sources[source_key] = (version, doc_ids)
+
+    def retain_sources(self, live_keys):
+        """Drop sources that no longer exist on disk"""
+        with self._lock:
+            for source_key in [key for key in self._sources if key not in live_keys]:
+                self._remove_documents(self._sources.pop(source_key)[1])
+
+    def _add_document(self, doc_id, texts, payload):
+        weights = {}
+        for text, weight in texts.items():
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0), weight)
+        self._documents[doc_id] = (payload, weights)
+        for token in weights:
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = postings = set()
+                self._vocabulary = None
+                for gram in bigrams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+            postings.add(doc_id)
+
+    def _remove_documents(self, doc_ids):
+        for doc_id in doc_ids:
+            document = self._documents.pop(doc_id, None)
+            if document is None:
+                continue
+            for token in document[1]:
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.discard(doc_id)
+                    if not postings:
+                        del self._postings[token]
+                        self._vocabulary = None
+                        for gram in bigrams(token):
+                            tokens = self._grams.get(gram)
+                            if tokens is not None:
+                                tokens.discard(token)
+                                if not tokens:
+                                    del self._grams[gram]
+
+    def _matching_tokens(self, query_token, fuzzy):
+        """Return {token: score} for exact, prefix and (optionally) fuzzy matches"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        matches = {}
+
+        start = bisect.bisect_left(self._vocabulary, query_token)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(query_token):
+                break
+            matches[token] = EXACT_SCORE if token == query_token else PREFIX_SCORE
+
+        if fuzzy and len(query_token) >= 3:
+            # Only tokens sharing bigrams with the query can come close, so difflib never sees the whole vocabulary
+            shared = Counter()
+            for gram in bigrams(query_token):
+                for token in self._grams.get(gram, ()):
+                    if abs(len(token) - len(query_token)) <= 2:
+                        shared[token] += 1
+            candidates = [token for token, count in shared.most_common(FUZZY_CANDIDATES) if count >= FUZZY_MIN_SHARED]
+            for token in difflib.get_close_matches(query_token, candidates, n=5, cutoff=0.75):
+                matches.setdefault(token, FUZZY_SCORE)
+        return matches
+
+    def search(self, query, limit=20, fuzzy=True, types=None):
+        """Return payloads of documents matching every query token, best first"""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            scores = None
+            for query_token in query_tokens:
+                token_scores = {}
+                for token, score in self._matching_tokens(query_token, fuzzy).items():
+                    for doc_id in self._postings[token]:
+                        weighted = score * self._documents[doc_id][1][token]
+                        if weighted > token_scores.get(doc_id, 0):
+                            token_scores[doc_id] = weighted
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: scores[doc_id] + score for doc_id, score in token_scores.items() if doc_id in scores}
+                if not scores:
+                    return []
+
+            if types:
+                scores = {doc_id: score for doc_id, score in scores.items() if self._documents[doc_id][0].get("type") in types}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+            return [dict(self._documents[doc_id][0], score=round(score, 2)) for doc_id, score in ranked[:limit]]
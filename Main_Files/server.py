@@ -0,0 +1,69 @@
+import os
+import sys
+import argparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve Abiotic Factor Interactive Maps on a production WSGI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (more than one needs gunicorn)")
+    parser.add_argument("--threads", type=int, default=8, help="request threads per worker")
+    return parser.parse_args()
+
+def serve_threaded(host, port, threads):
+    """One process with a pool of request threads: waitress if installed, Werkzeug otherwise"""
+    from app import app
+
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    print(f"Serving on http://{host}:{port} with {threads} threads")
+    if serve is not None:
+        serve(app, host=host, port=port, threads=threads)
+    else:
+        print("waitress is not installed (pip install waitress), falling back to Werkzeug's threaded server")
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True)
+
+def serve_workers(host, port, workers, threads):
+    """Several gunicorn worker processes sharing the data folder through file locks"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("More than one worker needs gunicorn (pip install gunicorn, Linux/macOS only)")
+        sys.exit(1)
+
+    # Read by app.py in every worker: turns off write-behind so edits reach disk before the response
+    os.environ["ABIOTIC_MAPS_MULTIPROCESS"] = "1"
+
+    class MapsApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    print(f"Serving on http://{host}:{port} with {workers} workers x {threads} threads")
+    MapsApplication({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread"
+    }).run()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.workers > 1:
+        serve_workers(args.host, args.port, args.workers, args.threads)
+    else:
+        serve_threaded(args.host, args.port, args.threads)
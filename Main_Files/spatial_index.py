@@ -0,0 +1,57 @@
+import math
+
+
+def marker_point(marker):
+    """Return (x, y) for a marker with numeric coordinates, otherwise None"""
+    x, y = marker.get("x"), marker.get("y")
+    if isinstance(x, (int, float)) and isinstance(y, (int, float)) and not isinstance(x, bool) and not isinstance(y, bool):
+        return (x, y)
+    return None
+
+
+class GridIndex:
+    """Uniform grid over map coordinates for bounding-box lookups of markers"""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._points = {}
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, key, point):
+        self.remove(key)
+        if point is None:
+            return
+        self._points[key] = point
+        self._cells.setdefault(self._cell(*point), set()).add(key)
+
+    def remove(self, key):
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        keys = self._cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """Yield the keys of points inside the box, cell by cell"""
+        min_cell_x, min_cell_y = self._cell(min_x, min_y)
+        max_cell_x, max_cell_y = self._cell(max_x, max_y)
+
+        # Very large boxes over a sparse grid are cheaper to answer from the occupied cells
+        if (max_cell_x - min_cell_x + 1) * (max_cell_y - min_cell_y + 1) > len(self._cells):
+            cells = [cell for cell in self._cells
+                     if min_cell_x <= cell[0] <= max_cell_x and min_cell_y <= cell[1] <= max_cell_y]
+        else:
+            cells = [(cx, cy) for cx in range(min_cell_x, max_cell_x + 1) for cy in range(min_cell_y, max_cell_y + 1)]
+
+        for cell in cells:
+            for key in self._cells.get(cell, ()):
+                x, y = self._points[key]
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield key
@@ -0,0 +1,155 @@
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from metrics import count
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+
+_held_locks = threading.local()
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock next to path, shared by every thread and worker process.
+
+    Re-entering the lock for the same path from the same thread is a no-op, so
+    store methods can call each other while holding it.
+    """
+    held = getattr(_held_locks, "paths", None)
+    if held is None:
+        held = _held_locks.paths = set()
+    if path in held:
+        yield
+        return
+
+    lock_path = path + LOCK_SUFFIX
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds; keep waiting like flock does
+                    continue
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def parse_json_lines(file_path):
+    results = []
+    if os.path.exists(file_path):
+        size = lines = 0
+        with open(file_path, "rb") as f:
+            for line in f:
+                size += len(line)
+                line = line.strip()
+                if line:
+                    lines += 1
+                    try:
+                        results.append(json.loads(line.decode("utf-8")))
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        pass
+        count("bytes_read", size)
+        count("json_lines_parsed", lines)
+    return results
+
+def parse_json_lines_from(file_path, offset=0):
+    """Parse the complete lines after offset; returns (items, offset just past the last complete line)"""
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    count("bytes_read", len(data))
+    # A line still being appended has no newline yet and is picked up by the next call
+    end = data.rfind(b"\n") + 1
+    results = []
+    lines = 0
+    for line in data[:end].split(b"\n"):
+        line = line.strip()
+        if line:
+            lines += 1
+            try:
+                results.append(json.loads(line.decode("utf-8")))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+    count("json_lines_parsed", lines)
+    return results, offset + end
+
+def load_json_file(file_path, default=None):
+    if not os.path.exists(file_path):
+        return default or {}
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+        count("bytes_read", len(data))
+        return json.loads(data.decode("utf-8"))
+    except Exception:
+        return default or {}
+
+@contextmanager
+def _atomic_writer(file_path):
+    """Yield a text file that replaces file_path in one rename once the block finishes"""
+    folder = os.path.dirname(file_path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+            count("bytes_written", f.tell())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def save_json_file(file_path, data):
+    """Write a pretty-printed JSON document atomically, so readers never see it half written"""
+    with _atomic_writer(file_path) as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def save_json_lines(file_path, items):
+    """Write a JSON-lines file atomically"""
+    with _atomic_writer(file_path) as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+def append_json_lines(file_path, items):
+    """Append items in a single write; a line torn by an earlier crash is ended first so it cannot swallow them"""
+    data = "".join(json.dumps(item) + "\n" for item in items).encode("utf-8")
+    with open(file_path, "a+b") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+    count("bytes_written", len(data))
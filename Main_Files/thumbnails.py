@@ -0,0 +1,60 @@
+import os
+import hashlib
+import tempfile
+
+from storage import file_signature
+from metrics import record_cache
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Map tabs are drawn at 100x50 CSS pixels; twice that stays sharp on high-DPI screens
+THUMBNAIL_SIZE = (200, 100)
+
+
+class ThumbnailCache:
+    """Small JPEG variants of map images stored under cache_folder.
+
+    A thumbnail is named after the map path and the source's mtime/size, so
+    listing maps only stats the images and a changed image gets a new URL.
+    """
+
+    def __init__(self, cache_folder, size=THUMBNAIL_SIZE):
+        self.cache_folder = cache_folder
+        self.size = size
+
+    @staticmethod
+    def available():
+        return Image is not None
+
+    def version(self, source_path, key):
+        signature = file_signature(source_path)
+        if signature is None:
+            return None
+        return hashlib.sha1(f"{key}\0{signature[0]}\0{signature[1]}".encode("utf-8")).hexdigest()[:16]
+
+    def thumbnail_path(self, source_path, key):
+        """Return the cached thumbnail for a map image, rendering it on first use"""
+        version = self.version(source_path, key)
+        if version is None:
+            return None, None
+
+        path = os.path.join(self.cache_folder, f"{version}-{self.size[0]}x{self.size[1]}.jpg")
+        hit = os.path.exists(path)
+        record_cache("thumbnails", hit)
+        if not hit:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            with Image.open(source_path) as image:
+                thumbnail = ImageOps.fit(image.convert("RGB"), self.size, Image.LANCZOS)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_folder, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    thumbnail.save(f, "JPEG", quality=80, optimize=True)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        return path, version
@@ -0,0 +1,189 @@
+import os
+import sys
+import math
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import file_signature, file_lock, load_json_file, save_json_file
+from metrics import record_cache
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+TILE_SIZE = 256
+META_FILE = "meta.json"
+
+
+def min_zoom_for(width, height, tile_size=TILE_SIZE):
+    """Lowest zoom worth cutting: the one at which the whole image fits in a single tile"""
+    return -max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+def render_row(data, mode, size, output_dir, zoom, y, tile_size, tile_format):
+    """Save one row of tiles from a strip of pixels; runs inside a worker process"""
+    strip = Image.frombytes(mode, size, data)
+    for x in range(size[0] // tile_size):
+        column_dir = os.path.join(output_dir, str(zoom), str(x))
+        os.makedirs(column_dir, exist_ok=True)
+        tile = strip.crop((x * tile_size, 0, (x + 1) * tile_size, tile_size))
+        tile.save(os.path.join(column_dir, f"{y}.{tile_format}"), "JPEG" if tile_format == "jpg" else "PNG", quality=85)
+    return size[0] // tile_size
+
+
+class TileCache:
+    """Builds and serves z/x/y tile pyramids for map images under cache_folder.
+
+    Tiles follow Leaflet's L.CRS.Simple for bounds [[0, 0], [height, width]]:
+    zoom 0 is full resolution, lower zooms are negative, and tile rows count
+    up to -1 from the top of the image to its bottom edge at y = 0. A pyramid
+    lives in a folder named after the source's mtime/size, so it is only
+    regenerated when the map image itself changes.
+    """
+
+    def __init__(self, cache_folder, tile_size=TILE_SIZE, workers=None):
+        self.cache_folder = cache_folder
+        self.tile_size = tile_size
+        self.workers = workers
+        self._executor = None
+        self._building = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return Image is not None
+
+    def _pyramid_dir(self, source_path, key):
+        signature = file_signature(source_path)
+        if signature is None:
+            return None, None
+        version = hashlib.sha1(f"{signature[0]}-{signature[1]}-{self.tile_size}".encode()).hexdigest()[:16]
+        map_dir = os.path.join(self.cache_folder, key.replace('/', os.sep))
+        return map_dir, os.path.join(map_dir, version)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def ensure_pyramid(self, source_path, key, wait=False):
+        """Return (pyramid_dir, meta) for a map image.
+
+        A missing pyramid is generated on a background thread and meta is None
+        until it is done, unless wait is set.
+        """
+        map_dir, pyramid_dir = self._pyramid_dir(source_path, key)
+        if pyramid_dir is None:
+            return None, None
+
+        meta = load_json_file(os.path.join(pyramid_dir, META_FILE)) or None
+        record_cache("tile_pyramids", meta is not None)
+        if meta is not None:
+            return pyramid_dir, meta
+
+        with self._lock:
+            thread = self._building.get(pyramid_dir)
+            if thread is None:
+                thread = threading.Thread(target=self._build, args=(source_path, map_dir, pyramid_dir), daemon=True)
+                self._building[pyramid_dir] = thread
+                thread.start()
+        if not wait:
+            return pyramid_dir, None
+        thread.join()
+        return pyramid_dir, load_json_file(os.path.join(pyramid_dir, META_FILE)) or None
+
+    def _build(self, source_path, map_dir, pyramid_dir):
+        meta_path = os.path.join(pyramid_dir, META_FILE)
+        try:
+            # Another worker process may be cutting the same pyramid
+            with file_lock(meta_path):
+                if not os.path.exists(meta_path):
+                    self._generate(source_path, map_dir, pyramid_dir)
+        except Exception as e:
+            print(f"Error generating tiles for {source_path}: {e}")
+        finally:
+            with self._lock:
+                self._building.pop(pyramid_dir, None)
+
+    def _generate(self, source_path, map_dir, pyramid_dir):
+        # Remove pyramids cut from older versions of this image
+        if os.path.isdir(map_dir):
+            for entry in os.listdir(map_dir):
+                entry_path = os.path.join(map_dir, entry)
+                if entry_path != pyramid_dir and os.path.isdir(entry_path):
+                    shutil.rmtree(entry_path, ignore_errors=True)
+
+        size = self.tile_size
+        with Image.open(source_path) as image:
+            width, height = image.size
+            has_alpha = image.mode in ("RGBA", "LA", "P")
+            tile_format = "jpg" if source_path.lower().endswith((".jpg", ".jpeg")) or not has_alpha else "png"
+            level = image.convert("RGB" if tile_format == "jpg" else "RGBA")
+        min_zoom = min_zoom_for(width, height, size)
+
+        executor = self._get_executor()
+        futures = []
+        for zoom in range(0, min_zoom - 1, -1):
+            scale = 2 ** zoom
+            level = level.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS) if zoom else level
+
+            # The tile grid starts at the image's bottom-left corner, so the top row is padded
+            columns, rows = math.ceil(level.width / size), math.ceil(level.height / size)
+            canvas = Image.new(level.mode, (columns * size, rows * size))
+            canvas.paste(level, (0, rows * size - level.height))
+
+            # Each row of tiles is encoded by a worker, so even the full-resolution level uses every core
+            for row in range(rows):
+                strip = canvas.crop((0, row * size, columns * size, (row + 1) * size))
+                futures.append(executor.submit(render_row, strip.tobytes(), strip.mode, strip.size,
+                                               pyramid_dir, zoom, row - rows, size, tile_format))
+        tile_count = sum(future.result() for future in futures)
+
+        save_json_file(os.path.join(pyramid_dir, META_FILE), {
+            "width": width,
+            "height": height,
+            "tileSize": size,
+            "minZoom": min_zoom,
+            "maxZoom": 0,
+            "format": tile_format,
+            "tiles": tile_count
+        })
+
+    def tile_path(self, pyramid_dir, meta, z, x, y):
+        """Return the file of one tile, or None if it is outside the pyramid"""
+        if not meta["minZoom"] <= z <= meta["maxZoom"]:
+            return None
+        path = os.path.join(pyramid_dir, str(z), str(x), f"{y}.{meta['format']}")
+        return path if os.path.exists(path) else None
+
+
+def generate_all(maps_folder, cache_folder, extensions):
+    """Pre-build the pyramids for every map image under maps_folder"""
+    tile_cache = TileCache(cache_folder)
+    for root, dirs, files in os.walk(maps_folder):
+        if os.path.basename(root) == "images":
+            continue
+        for name in files:
+            if name.lower().endswith(tuple(extensions)):
+                source_path = os.path.join(root, name)
+                key = os.path.relpath(source_path, maps_folder).replace(os.sep, '/')
+                pyramid_dir, meta = tile_cache.ensure_pyramid(source_path, key, wait=True)
+                if meta is None:
+                    continue
+                print(f"{key}: zoom {meta['minZoom']}-{meta['maxZoom']}, {meta['tiles']} tiles")
+
+
+if __name__ == "__main__":
+    if Image is None:
+        print("Pillow is required to generate tiles (pip install Pillow)")
+        sys.exit(1)
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    generate_all(
+        os.path.join(base_dir, "data", "app-data", "maps"),
+        os.path.join(base_dir, "data", "app-data", "cache", "tiles"),
+        ['.png', '.jpg', '.jpeg', '.gif', '.webp']
+    )
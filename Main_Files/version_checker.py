@@ -1,11 +1,20 @@
 import requests
 import json
+import time
+import threading
+
+from storage import load_json_file, save_json_file
 
 # Current version of app (gotta make sure to change with each relaease :)
 CURRENT_VERSION = "1.0.0"
 GITHUB_REPO = "ComradeAleks/Abiotic-Factor-Interactive-maps"
+APP_TITLE = "Abiotic Factor Interactive Maps"
+
+# How long a check result is reused; failed checks are retried sooner
+VERSION_CACHE_TTL = 6 * 60 * 60
+FAILED_CHECK_TTL = 10 * 60
 
-def get_latest_version():
+def fetch_latest_version():
     """Get the latest release version from GitHub"""
     try:
         url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
@@ -17,6 +26,23 @@ def get_latest_version():
     except Exception:
         return None
 
+def get_latest_version(cache_file=None):
+    """Latest release version, answered from cache_file while its entry is younger than the TTL"""
+    if cache_file is None:
+        return fetch_latest_version()
+    
+    cached = load_json_file(cache_file, {})
+    ttl = VERSION_CACHE_TTL if cached.get("latest") else FAILED_CHECK_TTL
+    if "checkedAt" in cached and time.time() - cached["checkedAt"] < ttl:
+        return cached.get("latest")
+    
+    latest = fetch_latest_version()
+    try:
+        save_json_file(cache_file, {"checkedAt": time.time(), "latest": latest or cached.get("latest")})
+    except OSError:
+        pass
+    return latest or cached.get("latest")
+
 def compare_versions(current, latest):
     """Compare version strings (simple semantic versioning)"""
     if not latest:
@@ -41,9 +67,8 @@ def compare_versions(current, latest):
     except:
         return "unknown"
 
-def get_version_info():
+def get_version_info(latest_version):
     """Get version info for the app title"""
-    latest_version = get_latest_version()
     status = compare_versions(CURRENT_VERSION, latest_version)
     
     if status == "outdated":
@@ -55,10 +80,26 @@ def get_version_info():
     else:
         return f"v{CURRENT_VERSION}"
 
-def get_window_title():
+def get_window_title(cache_file=None):
     """Get the complete window title with version info"""
-    version_info = get_version_info()
-    return f"Abiotic Factor Interactive Maps - {version_info}"
+    version_info = get_version_info(get_latest_version(cache_file))
+    return f"{APP_TITLE} - {version_info}"
+
+def get_cached_window_title(cache_file):
+    """Title from whatever the last check stored, without touching the network"""
+    return f"{APP_TITLE} - {get_version_info(load_json_file(cache_file, {}).get('latest'))}"
+
+def check_version_in_background(cache_file, on_title):
+    """Run the version check on a daemon thread and pass the resulting title to on_title"""
+    def check():
+        try:
+            on_title(get_window_title(cache_file))
+        except Exception as e:
+            print(f"Version check failed: {e}")
+    
+    thread = threading.Thread(target=check, daemon=True)
+    thread.start()
+    return thread
 
 if __name__ == "__main__":
     print(f"Current version: {CURRENT_VERSION}")
@@ -0,0 +1,343 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+import contextlib
+
+from synthetic_data import generate, item_name
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Case:
+    """One benchmarked request; prepare runs untimed before each call, e.g. to create what a delete removes"""
+
+    def __init__(self, name, method, request, prepare=None, expect=(200,)):
+        self.name = name
+        self.method = method
+        self.request = request
+        self.prepare = prepare
+        self.expect = expect
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def load_app(data_dir):
+    """Import app.py against the synthetic data folder; must happen before anything else imports it"""
+    os.environ["ABIOTIC_MAPS_DATA_DIR"] = data_dir
+    sys.path.insert(0, os.path.join(REPO_DIR, "Main_Files"))
+    import app as app_module
+    app_module.SHOW_HTTP_LOGS = False
+    return app_module
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_cases(app_module, info, seed=0):
+    rng = random.Random(seed)
+    maps = info["maps"]
+    ids = itertools.count(info["nextMarkerId"] + 1000000)
+    width, height = info["mapSize"]
+    uploads = itertools.count()
+
+    def some_map():
+        return rng.choice(maps)
+
+    def new_marker(map_path):
+        return {"id": next(ids), "map": map_path, "x": rng.uniform(0, width), "y": rng.uniform(0, height),
+                "name": "Bench marker", "entries": [{"category": "Food", "subcategory": "",
+                                                     "items": [{"itemname": item_name(rng.randrange(info["itemCount"])), "marked": 0}]}]}
+
+    def some_item():
+        return item_name(rng.randrange(info["itemCount"]))
+
+    def image_upload():
+        data = b"\x89PNG\r\n\x1a\n" + f"bench-{next(uploads)}".encode() * 64
+        return {"data": {"image": (io.BytesIO(data), "bench.png"), "fileExtension": "png"},
+                "content_type": "multipart/form-data"}
+
+    # State handed from prepare to request, one slot per case
+    pending = {}
+
+    def prepare_marker(case_name):
+        def prepare(client):
+            map_path = some_map()
+            marker = new_marker(map_path)
+            client.post("/api/markers", json=marker)
+            pending[case_name] = (map_path, marker)
+        return prepare
+
+    def prepare_item(client):
+        map_path = some_map()
+        key = f"bench_{next(ids)}"
+        client.put(f"/api/item-details/{key}?map={map_path}", json={"name": "Bench", "notes": "x"})
+        pending["item"] = (map_path, key)
+
+    def prepare_image(client):
+        map_path = some_map()
+        response = client.post(f"/api/upload-image?map={map_path}", **image_upload())
+        pending["image"] = (map_path, response.get_json()["imagePath"])
+
+    def update_marker():
+        map_path, marker = pending["update"]
+        return f"/api/markers/{marker['id']}", {"json": dict(marker, name="Renamed")}
+
+    def delete_marker():
+        map_path, marker = pending["delete"]
+        return f"/api/markers/{marker['id']}?map={map_path}", {}
+
+    def replace_item_details():
+        map_path = some_map()
+        items = app_module.item_details_store.get(app_module.get_item_details_file_path(map_path))
+        return f"/api/item-details?map={map_path}", {"json": items}
+
+    presets_etag = {}
+
+    def presets_conditional():
+        if "etag" not in presets_etag:
+            with app_module.app.test_client() as client:
+                presets_etag["etag"] = client.get("/api/presets").headers.get("ETag")
+        return "/api/presets", {"headers": {"If-None-Match": presets_etag["etag"]}}
+
+    top_level = next((path for path in info["presets"] if "/" not in path), None)
+    nested = next((path for path in info["presets"] if "/" in path), None)
+    image_map = maps[0]
+    image_name = sorted(os.listdir(os.path.join(app_module.get_map_folder_path(image_map), "images")))[0]
+
+    def prepare_tiles(client):
+        # Pyramids are cut in the background; time the serving, not the first generation
+        app_module.tile_cache.ensure_pyramid(app_module.get_map_image_path(image_map), image_map, wait=True)
+
+    cases = [
+        Case("health", "GET", lambda: ("/api/health", {})),
+        Case("export", "GET", lambda: ("/api/export", {})),
+        Case("metrics", "GET", lambda: ("/api/metrics", {})),
+        Case("index", "GET", lambda: ("/", {})),
+        Case("maps", "GET", lambda: ("/api/maps", {})),
+        Case("map_sizes", "GET", lambda: ("/api/map-sizes", {})),
+        Case("categories", "GET", lambda: ("/api/categories", {})),
+        Case("presets", "GET", lambda: ("/api/presets", {})),
+        Case("presets_gzip", "GET", lambda: ("/api/presets", {"headers": {"Accept-Encoding": "gzip"}})),
+        Case("presets_not_modified", "GET", presets_conditional, expect=(304,)),
+        Case("bootstrap", "GET", lambda: (f"/api/bootstrap?map={some_map()}", {})),
+        Case("markers_all", "GET", lambda: ("/api/markers", {})),
+        Case("markers_all_ndjson", "GET", lambda: ("/api/markers?format=ndjson", {})),
+        Case("changes", "GET", lambda: (f"/api/changes?since={app_module.change_log.latest() - 50}", {})),
+        Case("markers_map", "GET", lambda: (f"/api/markers?map={some_map()}", {})),
+        Case("markers_bbox", "GET", lambda: (f"/api/markers?map={some_map()}&bbox=0,0,{width // 2},{height // 2}&limit=100", {})),
+        Case("markers_clusters", "GET", lambda: (f"/api/markers/clusters?map={some_map()}&zoom={rng.choice([-2, 0, 2])}", {})),
+        Case("create_marker", "POST", lambda: ("/api/markers", {"json": new_marker(some_map())})),
+        Case("update_marker", "PUT", update_marker, prepare=prepare_marker("update")),
+        Case("delete_marker", "DELETE", delete_marker, prepare=prepare_marker("delete")),
+        Case("delete_marker_without_map", "DELETE", lambda: (f"/api/markers/{pending['delete_any'][1]['id']}", {}),
+             prepare=prepare_marker("delete_any")),
+        Case("markers_batch", "POST", lambda: ("/api/markers/batch", {"json": {"operations": [
+            op for marker in [new_marker(some_map()) for _ in range(5)]
+            for op in ({"op": "create", "marker": marker}, {"op": "delete", "id": marker["id"]})]}})),
+        Case("presets_by_type", "GET", lambda: (f"/api/presets/{top_level}", {})),
+        Case("presets_by_subcategory", "GET", lambda: (f"/api/presets/{nested}", {})),
+        Case("preset_file", "GET", lambda: (f"/presets/{nested}.txt", {})),
+        Case("search", "GET", lambda: (f"/api/search?q={some_item()}", {})),
+        Case("search_fuzzy", "GET", lambda: ("/api/search?q=Synthetc Itm", {})),
+        Case("where", "GET", lambda: (f"/api/where?item={some_item()}", {}), expect=(200, 404)),
+        Case("loot_yield_item", "GET", lambda: (f"/api/loot-yield?item={some_item()}", {}), expect=(200, 404, 501)),
+        Case("loot_yield_all", "GET", lambda: ("/api/loot-yield", {}), expect=(200, 501)),
+        Case("load_pinned", "GET", lambda: ("/api/load-pinned-popups", {})),
+        Case("save_pinned", "POST", lambda: ("/api/save-pinned-popups", {"json": [{"markerID": rng.randrange(1, 50), "x": 1, "y": 2}]})),
+        Case("item_details", "GET", lambda: (f"/api/item-details?map={some_map()}", {})),
+        Case("item_details_replace", "POST", replace_item_details),
+        Case("item_detail", "GET", lambda: (f"/api/item-details/{pending['item'][1]}?map={pending['item'][0]}", {}), prepare=prepare_item),
+        Case("item_detail_patch", "PATCH", lambda: (f"/api/item-details/{pending['item'][1]}?map={pending['item'][0]}", {"json": {"notes": "patched"}}), prepare=prepare_item),
+        Case("item_detail_delete", "DELETE", lambda: (f"/api/item-details/{pending['item'][1]}?map={pending['item'][0]}", {}), prepare=prepare_item),
+        Case("cleanup_items", "POST", lambda: (f"/api/cleanup-items?map={pending['item'][0]}", {"json": {"itemKeys": [pending['item'][1]]}}), prepare=prepare_item),
+        Case("upload_image", "POST", lambda: (f"/api/upload-image?map={some_map()}", image_upload())),
+        Case("delete_image", "DELETE", lambda: (f"/api/delete-image?map={pending['image'][0]}", {"json": {"imagePath": pending['image'][1]}}), prepare=prepare_image),
+        Case("map_image_file", "GET", lambda: (f"/api/map-images/{image_map}/images/{image_name}", {})),
+        Case("map_image", "GET", lambda: (f"/maps/{some_map()}", {})),
+        Case("data_file", "GET", lambda: ("/data/assets/Unknown.png", {})),
+        Case("map_thumbnail", "GET", lambda: (f"/api/map-thumbnails/{some_map()}", {})),
+    ]
+    if app_module.TileCache.available():
+        cases += [
+            Case("tile_info", "GET", lambda: (f"/api/tile-info/{image_map}", {}), prepare=prepare_tiles),
+            Case("tile", "GET", lambda: (f"/api/tiles/{image_map}/0/0/-1", {}), prepare=prepare_tiles),
+        ]
+    return cases
+
+def call(client, case):
+    if case.prepare:
+        case.prepare(client)
+    url, kwargs = case.request()
+    start = time.perf_counter()
+    response = client.open(url, method=case.method, **kwargs)
+    response.get_data()
+    elapsed = time.perf_counter() - start
+    response.close()
+    return elapsed, response.status_code
+
+def run_case(client, case, iterations, warmup):
+    for _ in range(warmup):
+        call(client, case)
+    latencies, errors = [], 0
+    for _ in range(iterations):
+        elapsed, status = call(client, case)
+        latencies.append(elapsed)
+        if status not in case.expect:
+            errors += 1
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "n": len(latencies),
+        "errors": errors,
+        "mean_ms": round(1000 * total / len(latencies), 3),
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p90_ms": round(1000 * percentile(latencies, 0.90), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+        "max_ms": round(1000 * latencies[-1], 3),
+        "throughput_rps": round(len(latencies) / total, 1) if total else None
+    }
+
+def measure_peak_memory(client, case, iterations):
+    """Peak Python heap growth while serving the case; run separately since tracing slows every call"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for _ in range(iterations):
+            call(client, case)
+        return round((tracemalloc.get_traced_memory()[1] - baseline) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes on Linux
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+def compare(old_path, new_path, threshold):
+    """Print p50/p99 changes between two result files; returns True when nothing regressed past threshold"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)["routes"]
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)["routes"]
+
+    ok = True
+    print(f"{'route':32} {'p50 old':>10} {'p50 new':>10} {'change':>8} {'p99 old':>10} {'p99 new':>10} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        row = [name.ljust(32)]
+        for key in ("p50_ms", "p99_ms"):
+            change = new[name][key] / old[name][key] - 1 if old[name][key] else 0.0
+            if key == "p50_ms" and change > threshold:
+                ok = False
+            row += [f"{old[name][key]:10.3f}", f"{new[name][key]:10.3f}", f"{change:+8.0%}"]
+        print(" ".join(row))
+    for name in sorted(set(old) ^ set(new)):
+        print(f"{name.ljust(32)} only in {'old' if name in old else 'new'} results")
+    return ok
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every API route against a synthetic data folder")
+    parser.add_argument("--maps", type=int, default=20)
+    parser.add_argument("--folders", type=int, default=4, help="top-level map folders (0 puts maps at the root)")
+    parser.add_argument("--depth", type=int, default=2, help="folder nesting depth above each map")
+    parser.add_argument("--markers", type=int, default=200, help="markers per map")
+    parser.add_argument("--preset-files", type=int, default=10)
+    parser.add_argument("--preset-entries", type=int, default=500, help="entries per preset file")
+    parser.add_argument("--item-details", type=int, default=100, help="item-details entries per map")
+    parser.add_argument("--images", type=int, default=5, help="uploaded images per map")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-iterations", type=int, default=5, help="calls per route while tracing memory (0 to skip)")
+    parser.add_argument("--routes", help="comma-separated subset of route names to run")
+    parser.add_argument("--data-dir", help="generate into this folder and keep it instead of a temp folder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 slowdown that counts as a regression in --compare")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.compare:
+        sys.exit(0 if compare(*args.compare, args.threshold) else 1)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="afm-bench-")
+    scale = {
+        "maps": args.maps, "folders": args.folders, "depth": args.depth, "markers_per_map": args.markers,
+        "preset_files": args.preset_files, "entries_per_preset": args.preset_entries,
+        "item_details": args.item_details, "images_per_map": args.images
+    }
+    try:
+        start = time.perf_counter()
+        info = generate(data_dir, seed=args.seed, **scale)
+        generate_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stderr):
+            app_module = load_app(data_dir)
+        import_seconds = time.perf_counter() - start
+
+        cases = build_cases(app_module, info, args.seed)
+        if args.routes:
+            wanted = set(args.routes.split(","))
+            cases = [case for case in cases if case.name in wanted]
+
+        routes = {}
+        # The app logs with print; keep stdout for the JSON results
+        with app_module.app.test_client() as client, contextlib.redirect_stdout(sys.stderr):
+            for case in cases:
+                routes[case.name] = run_case(client, case, args.iterations, args.warmup)
+                if args.memory_iterations:
+                    routes[case.name]["peak_memory_kb"] = measure_peak_memory(client, case, args.memory_iterations)
+                print(f"{case.name}: p50 {routes[case.name]['p50_ms']} ms", file=sys.stderr)
+
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "scale": scale,
+                "markers": info["markerCount"],
+                "iterations": args.iterations,
+                "generate_seconds": round(generate_seconds, 3),
+                "import_seconds": round(import_seconds, 3)
+            },
+            "routes": routes,
+            "process": {"peak_rss_kb": peak_rss_kb()}
+        }
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import json
+import zlib
+import struct
+import random
+import hashlib
+
+CATEGORY_NAMES = ["Base and Building", "Food", "People and Enemies", "Utility and Travel", "Weapons and Gear"]
+
+
+def png_bytes(width, height, color=(40, 60, 80)):
+    """A valid RGB PNG of the given size, built without Pillow"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(color) * width
+    pixels = zlib.compress(row * height, 9)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", pixels) + chunk(b"IEND", b"")
+
+def write_json_lines(path, items):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+def item_name(index):
+    return f"Synthetic Item {index}"
+
+def preset_entry(rng, name, category, item_count):
+    drops = [[f"{rng.randint(0, 1)}-{rng.randint(2, 4)}", item_name(rng.randrange(item_count)), f"{rng.choice([100, 50, 25, 10, 1])}%"]
+             for _ in range(rng.randint(0, 4))]
+    if drops and rng.random() < 0.2:
+        drops[0] = [drops[0][1], "1", "100% of 1\n50% of 2"]
+    return {
+        "item": name,
+        "image": "Unknown.png",
+        "link": f"https://example.invalid/wiki/{name.replace(' ', '_')}",
+        "category": category,
+        "Appears in": False,
+        "Trade": False,
+        "Drops": drops or False,
+        "Harvestable Drops": False,
+        "Butchering": False,
+        "Scrap Result": [item_name(rng.randrange(item_count)) for _ in range(rng.randint(0, 2))] or False,
+        "Recipe": [[[item_name(rng.randrange(item_count)) for _ in range(2)], [name]]] if rng.random() < 0.5 else False,
+        "Farming": False
+    }
+
+def marker(rng, marker_id, map_path, item_count, width, height):
+    return {
+        "id": marker_id,
+        "map": map_path,
+        "x": round(rng.uniform(0, width), 2),
+        "y": round(rng.uniform(0, height), 2),
+        "name": f"Marker {marker_id}",
+        "entries": [{
+            "category": rng.choice(CATEGORY_NAMES),
+            "subcategory": "",
+            "items": [{"itemname": item_name(rng.randrange(item_count)), "marked": rng.choice([0, 0, 1])}
+                      for _ in range(rng.randint(1, 3))]
+        }]
+    }
+
+def generate(root, maps=20, folders=4, depth=2, markers_per_map=200, preset_files=10,
+             entries_per_preset=500, item_details=100, images_per_map=5, map_size=(2048, 1536), seed=0):
+    """Write a synthetic data/ tree under root and return a description of what was created"""
+    rng = random.Random(seed)
+    item_count = max(1, preset_files * entries_per_preset)
+    os.makedirs(os.path.join(root, "assets"), exist_ok=True)
+    with open(os.path.join(root, "assets", "Unknown.png"), "wb") as f:
+        f.write(png_bytes(16, 16))
+
+    preset_paths = []
+    for file_index in range(preset_files):
+        # The first file sits at the top level like "Resource Nodes.txt", the rest in category folders
+        category = CATEGORY_NAMES[file_index % len(CATEGORY_NAMES)]
+        preset_path = "Loose Items" if file_index == 0 else f"{category}/Subcategory {file_index}"
+        entries = [preset_entry(rng, item_name(file_index * entries_per_preset + i), preset_path, item_count)
+                   for i in range(entries_per_preset)]
+        write_json_lines(os.path.join(root, "presets", *preset_path.split("/")[:-1], preset_path.split("/")[-1] + ".txt"), entries)
+        preset_paths.append(preset_path)
+
+    maps_folder = os.path.join(root, "app-data", "maps")
+    map_image = png_bytes(*map_size)
+    upload_image = png_bytes(64, 64, (200, 30, 30))
+    map_paths = []
+    next_marker_id = 1
+    for map_index in range(maps):
+        # Spread maps over nested folders: Folder-0/Folder-0-1/Map-7/Map-7.png
+        parts = []
+        if folders:
+            folder = map_index % folders
+            parts.append(f"Folder-{folder}")
+            for level in range(1, depth):
+                parts.append(f"Folder-{folder}-{(map_index // folders) % 2}-{level}")
+        name = f"Map-{map_index}"
+        map_folder = os.path.join(maps_folder, *parts, name)
+        os.makedirs(os.path.join(map_folder, "images"), exist_ok=True)
+        with open(os.path.join(map_folder, f"{name}.png"), "wb") as f:
+            f.write(map_image)
+        map_path = "/".join(parts + [name, f"{name}.png"])
+        map_paths.append(map_path)
+
+        markers = [marker(rng, next_marker_id + i, map_path, item_count, *map_size) for i in range(markers_per_map)]
+        next_marker_id += markers_per_map
+        # The format header marks the coordinates as already being in the image's own frame
+        write_json_lines(os.path.join(map_folder, "markers.txt"), [{"markerFormat": 2}] + markers)
+
+        images = []
+        for image_index in range(images_per_map):
+            data = upload_image + str((map_index, image_index)).encode()
+            filename = f"{hashlib.sha256(data).hexdigest()[:32]}.png"
+            with open(os.path.join(map_folder, "images", filename), "wb") as f:
+                f.write(data)
+            images.append(filename)
+
+        details = {}
+        for detail_index, source in enumerate(markers[:item_details]):
+            key = f"{source['id']}_{source['entries'][0]['items'][0]['itemname'].replace(' ', '_')}"
+            details[key] = {
+                "name": source["entries"][0]["items"][0]["itemname"],
+                "location": f"Room {detail_index}",
+                "notes": "Synthetic notes " * 5,
+                "additionalImage": f"/api/map-images/{map_path}/images/{images[detail_index % len(images)]}" if images else ""
+            }
+        with open(os.path.join(map_folder, "item-details.json"), "w", encoding="utf-8") as f:
+            json.dump(details, f, indent=2)
+
+    with open(os.path.join(maps_folder, "maps-loading-order.json"), "w", encoding="utf-8") as f:
+        json.dump({}, f)
+    write_json_lines(os.path.join(root, "app-data", "pinned.txt"),
+                     [{"markerID": i + 1, "x": 10 * i, "y": 10 * i} for i in range(min(20, next_marker_id - 1))])
+
+    return {
+        "maps": map_paths,
+        "presets": preset_paths,
+        "markerCount": next_marker_id - 1,
+        "itemCount": item_count,
+        "mapSize": list(map_size),
+        "nextMarkerId": next_marker_id
+    }
@@ -338,7 +338,7 @@ class InfoboxUI {
       }
       
       window.InfoBoxSaveLoad.markerItemData.set(itemKey, itemData);
-      window.InfoBoxSaveLoad.saveMarkerItemData();
+      window.InfoBoxSaveLoad.saveItem(itemKey);
     }
   }
 
@@ -12,8 +12,7 @@
     if (this.initialized) return;
     
     try {
-      this.template = await fetch('/static/templates/item-information-template.html')
-        .then(response => response.text());
+      this.template = await window.TemplateUtils.fetchTemplate('/static/templates/item-information-template.html');
       
       await this.waitForDataModules();
       
@@ -130,8 +130,7 @@ class ItemInformationBoxManager {
     if (this.initialized) return;
     
     try {
-      this.sharedData.template = await fetch('/static/templates/item-information-template.html')
-        .then(response => response.text());
+      this.sharedData.template = await window.TemplateUtils.fetchTemplate('/static/templates/item-information-template.html');
       
       await this.loadPresetData();
       
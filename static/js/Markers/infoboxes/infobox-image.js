@@ -7,87 +7,71 @@ class InfoboxImages {
   // Takes a file from the user and uploads it to the server, then adds it to the infobox
   static async uploadAndAddImage(infoboxInstance, file, replaceIndex = null) {
     try {
-      const reader = new FileReader();
-      reader.onload = async (e) => {
+      const itemKey = infoboxInstance.box.dataset.itemKey;
+      
+      if (itemKey && window.InfoBoxSaveLoad && window.currentMap) {
         try {
-          const imageData = e.target.result;
-          const itemKey = infoboxInstance.box.dataset.itemKey;
+          const fileExtension = file.name.split('.').pop().toLowerCase();
           
-          if (itemKey && window.InfoBoxSaveLoad && window.currentMap) {
-            try {
-              const fileExtension = file.name.split('.').pop().toLowerCase();
-              
-              let mapPath = window.currentMap;
-              console.log('DEBUG: Original window.currentMap:', mapPath);
-              
-              if (mapPath.includes('.')) {
-                const parts = mapPath.split('/');
-                parts.pop();
-                mapPath = parts.join('/');
+          let mapPath = window.currentMap;
+          console.log('DEBUG: Original window.currentMap:', mapPath);
+          
+          if (mapPath.includes('.')) {
+            const parts = mapPath.split('/');
+            parts.pop();
+            mapPath = parts.join('/');
+          }
+          
+          mapPath = mapPath.replace(/\\/g, '/');
+          console.log('DEBUG: Final mapPath for upload:', mapPath);
+          
+          const formData = new FormData();
+          formData.append('image', file);
+          formData.append('fileExtension', fileExtension);
+          
+          const response = await fetch(`/api/upload-image?map=${encodeURIComponent(mapPath)}`, {
+            method: 'POST',
+            body: formData
+          });
+          
+          const result = await response.json();
+          
+          if (result.success) {
+            const normalizedMapPath = mapPath.replace(/\\/g, '/');
+            const imageUrl = `/api/map-images/${normalizedMapPath}/${result.imagePath}`;
+            
+            const actualItemName = infoboxInstance.getItemNameFromBox();
+            
+            let itemData = window.InfoBoxSaveLoad.getOrCreateItemData(itemKey, actualItemName);
+            if (itemData) {
+              let images = [];
+              if (itemData.additionalImage) {
+                images = itemData.additionalImage.split(',').map(url => url.trim()).filter(url => url);
               }
               
-              mapPath = mapPath.replace(/\\/g, '/');
-              console.log('DEBUG: Final mapPath for upload:', mapPath);
+              if (replaceIndex !== null && replaceIndex < images.length) {
+                images[replaceIndex] = imageUrl;
+              } else {
+                images.push(imageUrl);
+              }
               
-              const response = await fetch(`/api/upload-image?map=${encodeURIComponent(mapPath)}`, {
-                method: 'POST',
-                headers: {
-                  'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                  imageData: imageData,
-                  fileExtension: fileExtension
-                })
-              });
+              itemData.additionalImage = images.join(',');
               
-              const result = await response.json();
+              window.InfoBoxSaveLoad.markerItemData.set(itemKey, itemData);
+              window.InfoBoxSaveLoad.saveItem(itemKey, { additionalImage: itemData.additionalImage });
+              console.log('Image uploaded and saved successfully. URL:', imageUrl);
               
-              if (result.success) {
-                const normalizedMapPath = mapPath.replace(/\\/g, '/');
-                const imageUrl = `/api/map-images/${normalizedMapPath}/${result.imagePath}`;
-                
-                const actualItemName = infoboxInstance.getItemNameFromBox();
-                
-                let itemData = window.InfoBoxSaveLoad.getOrCreateItemData(itemKey, actualItemName);
-                if (itemData) {
-                  let images = [];
-                  if (itemData.additionalImage) {
-                    images = itemData.additionalImage.split(',').map(url => url.trim()).filter(url => url);
-                  }
-                  
-                  if (replaceIndex !== null && replaceIndex < images.length) {
-                    images[replaceIndex] = imageUrl;
-                  } else {
-                    images.push(imageUrl);
-                  }
-                  
-                  itemData.additionalImage = images.join(',');
-                  
-                  window.InfoBoxSaveLoad.markerItemData.set(itemKey, itemData);
-                  window.InfoBoxSaveLoad.saveMarkerItemData();
-                  console.log('Image uploaded and saved successfully. URL:', imageUrl);
-                  
-                  InfoboxImages.refreshAdditionalImages(infoboxInstance);
-                }
-              } else {
-                console.error('Failed to upload image:', result.error);
-                alert('Failed to upload image. Please try again.');
-              }
-            } catch (error) {
-              console.error('Error uploading image:', error);
-              alert('Error uploading image. Please check your connection and try again.');
+              InfoboxImages.refreshAdditionalImages(infoboxInstance);
             }
+          } else {
+            console.error('Failed to upload image:', result.error);
+            alert('Failed to upload image. Please try again.');
           }
         } catch (error) {
-          console.error('Error processing image upload:', error);
-          alert('Error processing image. Please try again.');
+          console.error('Error uploading image:', error);
+          alert('Error uploading image. Please check your connection and try again.');
         }
-      };
-      reader.onerror = (error) => {
-        console.error('Error reading file:', error);
-        alert('Error reading file. Please try again.');
-      };
-      reader.readAsDataURL(file);
+      }
     } catch (error) {
       console.error('Error in uploadAndAddImage:', error);
       alert('Error uploading image. Please try again.');
@@ -259,7 +243,7 @@ class InfoboxImages {
         itemData.additionalImage = images.length > 0 ? images.join(',') : '';
         
         window.InfoBoxSaveLoad.markerItemData.set(itemKey, itemData);
-        window.InfoBoxSaveLoad.saveMarkerItemData();
+        window.InfoBoxSaveLoad.saveItem(itemKey, { additionalImage: itemData.additionalImage });
         
         const infoBox = document.querySelector(`[data-item-key="${itemKey}"]`);
         if (infoBox) {
@@ -346,7 +330,7 @@ class InfoboxImages {
         if (itemData) {
           itemData.additionalImage = '';
           window.InfoBoxSaveLoad.markerItemData.set(itemKey, itemData);
-          window.InfoBoxSaveLoad.saveMarkerItemData();
+          window.InfoBoxSaveLoad.saveItem(itemKey, { additionalImage: itemData.additionalImage });
           console.log('Cleared failed image for item:', itemKey);
         }
       }
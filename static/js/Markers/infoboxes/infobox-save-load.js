@@ -3,6 +3,7 @@ class InfoBoxSaveLoad {
   constructor() {
     this.markerItemData = new Map();
     this.mapDataCache = new Map();
+    this.pendingSaves = new Map();
     this.initialized = false;
   }
 
@@ -34,9 +35,10 @@ class InfoBoxSaveLoad {
         return;
       }
 
-      const response = await fetch(`/api/item-details?map=${encodeURIComponent(window.currentMap)}`);
-      if (response.ok) {
-        const data = await response.json();
+      const bootstrapped = await Bootstrap.takeForMap("itemDetails", window.currentMap);
+      const response = bootstrapped ? null : await fetch(`/api/item-details?map=${encodeURIComponent(window.currentMap)}`);
+      if (bootstrapped || response.ok) {
+        const data = bootstrapped || await response.json();
         this.markerItemData = new Map(Object.entries(data));
         this.mapDataCache.set(window.currentMap, new Map(this.markerItemData));
         console.log(`Loaded marker item data from server for map: ${window.currentMap}`);
@@ -122,6 +124,75 @@ class InfoBoxSaveLoad {
     }
   }
 
+  // Saves one item to the server; with fields only those are merged into the stored item
+  saveItem(itemKey, fields = null) {
+    const mapName = window.currentMap;
+    return this.queueItemRequest(itemKey, () => this.sendItem(itemKey, fields, mapName));
+  }
+
+  // Requests for the same item are sent one after another, so a PATCH can never overtake the PUT
+  // creating the item and a DELETE can never be overtaken by a save queued before it
+  queueItemRequest(itemKey, send) {
+    const previous = this.pendingSaves.get(itemKey) || Promise.resolve();
+    const request = previous.then(send);
+    this.pendingSaves.set(itemKey, request);
+    request.then(() => {
+      if (this.pendingSaves.get(itemKey) === request) this.pendingSaves.delete(itemKey);
+    });
+    return request;
+  }
+
+  async sendItem(itemKey, fields, mapName) {
+    try {
+      if (!mapName) {
+        console.warn('No current map, cannot save item data');
+        return;
+      }
+
+      // Read when the request is sent, so a queued PUT carries every edit made in the meantime
+      const itemData = mapName === window.currentMap ? this.markerItemData.get(itemKey) : this.mapDataCache.get(mapName)?.get(itemKey);
+      if (!itemData) return;
+
+      const response = await fetch(`/api/item-details/${encodeURIComponent(itemKey)}?map=${encodeURIComponent(mapName)}`, {
+        method: fields ? 'PATCH' : 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(fields || itemData)
+      });
+
+      if (response.ok) {
+        if (mapName === window.currentMap) this.mapDataCache.set(mapName, new Map(this.markerItemData));
+      } else {
+        console.error('Failed to save item data:', await response.json());
+      }
+    } catch (error) {
+      console.error('Could not save item data:', error);
+    }
+  }
+
+  // Removes one item from the server, after any save of it that is still queued
+  deleteItem(itemKey) {
+    const mapName = window.currentMap;
+    return this.queueItemRequest(itemKey, () => this.sendDelete(itemKey, mapName));
+  }
+
+  async sendDelete(itemKey, mapName) {
+    try {
+      if (!mapName) return;
+
+      const response = await fetch(`/api/item-details/${encodeURIComponent(itemKey)}?map=${encodeURIComponent(mapName)}`, {
+        method: 'DELETE'
+      });
+
+      if (response.ok || response.status === 404) {
+        if (mapName === window.currentMap) this.mapDataCache.set(mapName, new Map(this.markerItemData));
+      } else {
+        console.error('Failed to delete item data:', await response.json());
+      }
+    } catch (error) {
+      console.error('Could not delete item data:', error);
+    }
+  }
+
   // Moves old data from localStorage to server then cleans up localStorage
   async migrateFromLocalStorage() {
     try {
@@ -162,7 +233,7 @@ class InfoBoxSaveLoad {
     }
 
     this.markerItemData.set(itemKey, baseData);
-    this.saveMarkerItemData();
+    this.saveItem(itemKey);
     return baseData;
   }
 
@@ -175,7 +246,7 @@ class InfoBoxSaveLoad {
     const itemData = this.markerItemData.get(itemKey);
     itemData[fieldName] = value;
     this.markerItemData.set(itemKey, itemData);
-    this.saveMarkerItemData();
+    this.saveItem(itemKey, { [fieldName]: value });
     return true;
   }
 
@@ -189,7 +260,7 @@ class InfoBoxSaveLoad {
     itemData.infoboxWidth = width;
     itemData.infoboxHeight = height;
     this.markerItemData.set(itemKey, itemData);
-    this.saveMarkerItemData();
+    this.saveItem(itemKey, { infoboxWidth: width, infoboxHeight: height });
     return true;
   }
 
@@ -234,13 +305,12 @@ class InfoBoxSaveLoad {
   // Finds and removes item data that doesn't belong to any existing markers
   async cleanupOrphanedData() {
     try {
-      const response = await fetch('/api/markers');
-      if (!response.ok) {
+      const markers = await MarkerSync.all();
+      if (!markers) {
         console.warn('Could not fetch markers for cleanup');
         return 0;
       }
       
-      const markers = await response.json();
       const validKeys = new Set();
       
       markers.forEach(marker => {
@@ -293,10 +363,10 @@ class InfoBoxSaveLoad {
   isReady() { return this.initialized; } // Checks if system is initialized and ready
   getItemData(itemKey) { return this.markerItemData.get(itemKey); } // Gets data for a specific item
   hasItemData(itemKey) { return this.markerItemData.has(itemKey); } // Checks if item data exists
-  setItemData(itemKey, data) { this.markerItemData.set(itemKey, data); this.saveMarkerItemData(); } // Sets item data and saves
+  setItemData(itemKey, data) { this.markerItemData.set(itemKey, data); this.saveItem(itemKey); } // Sets item data and saves
   removeItemData(itemKey) { // Removes item data and saves if it existed
     const existed = this.markerItemData.delete(itemKey);
-    if (existed) this.saveMarkerItemData();
+    if (existed) this.deleteItem(itemKey);
     return existed;
   }
 
@@ -507,7 +577,7 @@ class InfoBoxSaveLoad {
       }
       
       this.markerItemData.set(itemKey, itemData);
-      this.saveMarkerItemData();
+      this.saveItem(itemKey);
     }
   }
 
@@ -517,7 +587,7 @@ class InfoBoxSaveLoad {
       let customData = this.getOrCreateItemData(itemKey, '') || {};
       customData[fieldType] = value;
       this.markerItemData.set(itemKey, customData);
-      this.saveMarkerItemData();
+      this.saveItem(itemKey, { [fieldType]: value });
     }
   }
 
@@ -544,11 +614,8 @@ class InfoBoxSaveLoad {
       
       if (!marker) {
         try {
-          const response = await fetch('/api/markers');
-          if (response.ok) {
-            const allMarkers = await response.json();
-            marker = allMarkers.find(m => m.id == markerId);
-          }
+          const allMarkers = await MarkerSync.all() || [];
+          marker = allMarkers.find(m => m.id == markerId);
         } catch (error) {
           console.warn('Error searching all maps for marker in infobox restoration:', error);
         }
@@ -608,7 +675,7 @@ class InfoBoxSaveLoad {
     
     let template;
     try {
-      template = await fetch('/static/templates/item-information-template.html').then(response => response.text());
+      template = await window.TemplateUtils.fetchTemplate('/static/templates/item-information-template.html');
     } catch (error) {
       console.warn('Template not loaded for restoration');
       return null;
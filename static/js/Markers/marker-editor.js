@@ -50,7 +50,7 @@ class MarkerEditor {
   // creates and positions the popup window with template content and settings
   async createPopup(popupPoint, categories, existingMarker) {
     if (!presetSelectorTemplate) {
-      presetSelectorTemplate = await (await fetch('/static/templates/preset-selector-template.html')).text();
+      presetSelectorTemplate = await window.TemplateUtils.fetchTemplate('/static/templates/preset-selector-template.html');
     }
 
     const popup = Object.assign(document.createElement('div'), {
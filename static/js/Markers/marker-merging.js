@@ -8,6 +8,7 @@ class MarkerMerging {
     this.iconSize = 32;
     this.overlapThreshold = 0.3;
     this.zoomRange = { min: -2, max: 3 };
+    this.requestId = 0;
     
     this.map.on('zoomend moveend', () => this.handleMapChange());
   }
@@ -33,38 +34,59 @@ class MarkerMerging {
     return zoom >= this.zoomRange.min && zoom <= this.zoomRange.max;
   }
 
-  // begins clustering by creating clusters and swapping individual markers for cluster markers
+  // begins clustering by swapping individual markers for cluster markers
   startClustering() {
     this.isActive = true;
-    this.createClusters();
-    this.hideClusteredMarkers();
-    this.showClusterMarkers();
+    this.updateClusters();
   }
 
   // stops clustering and returns to showing individual markers
   stopClustering() {
     this.isActive = false;
+    this.requestId++;
     this.hideClusterMarkers();
     this.clearClusters();
     this.showOriginalMarkers();
   }
 
-  // refreshes clusters when map moves but clustering should stay active
-  updateClusters() {
+  // fetches clusters for the current view and swaps them in, ignoring answers that arrive after a newer request
+  async updateClusters() {
+    const requestId = ++this.requestId;
+    const clusters = await this.fetchClusters();
+    if (requestId !== this.requestId || !this.isActive) return;
+
     this.showOriginalMarkers();
-    this.hideClusterMarkers();
-    this.createClusters();
+    this.clearClusters();
+    this.clusters = clusters;
+    this.createClusterMarkers();
     this.hideClusteredMarkers();
     this.showClusterMarkers();
   }
 
+  // asks the server for the precomputed clusters in view and matches their ids to the markers on the map
+  async fetchClusters() {
+    if (!window.leafletMarkers?.length) return [];
+    const bounds = this.map.getBounds().pad(0.5);
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].join(',');
+
+    try {
+      const res = await fetch(`/api/markers/clusters?map=${encodeURIComponent(currentMap)}&zoom=${this.map.getZoom()}&bbox=${bbox}`);
+      if (!res.ok) throw new Error(`Clusters failed: ${res.status}`);
+      const byId = new Map(window.leafletMarkers.map(marker => [marker.markerData?.id, marker]));
+      // Hidden markers are left out, so a cluster of one visible marker shows that marker instead
+      return (await res.json())
+        .map(cluster => cluster.markerIds.map(id => byId.get(id)).filter(Boolean))
+        .filter(cluster => cluster.length > 1);
+    } catch (error) {
+      console.warn('Falling back to local clustering:', error);
+      return this.createLocalClusters();
+    }
+  }
+
   // groups overlapping markers into clusters by checking pixel distances
-  createClusters() {
-    this.clearClusters();
-    if (!window.leafletMarkers?.length) return;
-    
+  createLocalClusters() {
     const unprocessed = [...window.leafletMarkers];
-    this.clusters = [];
+    const clusters = [];
     
     while (unprocessed.length > 0) {
       const cluster = [unprocessed.shift()];
@@ -74,10 +96,10 @@ class MarkerMerging {
         }
       }
       if (cluster.length > 1) {
-        this.clusters.push(cluster);
+        clusters.push(cluster);
       }
     }
-    this.createClusterMarkers();
+    return clusters;
   }
 
   // checks if two markers overlap on screen based on their pixel positions
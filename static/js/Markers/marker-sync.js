@@ -0,0 +1,43 @@
+// Keeps a copy of every map's markers, refreshed from /api/changes instead of downloading them all again
+const MarkerSync = {
+  markers: null,
+  seq: null,
+  request: null,
+
+  // Resolves to every marker, or null if they could not be loaded
+  async all() {
+    if (!this.request) {
+      this.request = this.refresh().finally(() => { this.request = null; });
+    }
+    await this.request;
+    return this.markers ? Array.from(this.markers.values()) : null;
+  },
+
+  async refresh() {
+    try {
+      if (this.markers) {
+        const res = await fetch(`/api/changes?since=${this.seq}`);
+        const changes = res.ok ? await res.json() : null;
+        if (changes && !changes.reset) {
+          changes.markers.deleted.forEach(id => this.markers.delete(id));
+          changes.markers.updated.forEach(marker => this.markers.set(marker.id, marker));
+          this.seq = changes.seq;
+          return;
+        }
+      }
+      await this.reload();
+    } catch (err) {
+      console.warn("Failed to sync markers:", err);
+    }
+  },
+
+  // Reads the sequence number before the full listing, so edits made in between are picked up by the next refresh
+  async reload() {
+    const { seq } = await fetch("/api/changes?since=-1").then(res => res.json());
+    const markers = await fetch("/api/markers").then(res => res.json());
+    this.markers = new Map(markers.map(marker => [marker.id, marker]));
+    this.seq = seq;
+  }
+};
+
+window.MarkerSync = MarkerSync;
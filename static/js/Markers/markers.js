@@ -343,8 +343,8 @@ async function refreshMapMarkers() {
 // loads all markers for a specific map from the server and sets up event handlers
 async function loadMarkersForMap(mapName, leafletMap, bounds) {
   try {
-    const response = await fetch(`/api/markers?map=${encodeURIComponent(mapName)}`);
-    markers = await response.json();
+    markers = await Bootstrap.takeForMap("markers", mapName)
+      || await fetch(`/api/markers?map=${encodeURIComponent(mapName)}`).then(res => res.json());
 
     await clearAndAddMarkers({ mapName, leafletMap, filterMap: true });
 
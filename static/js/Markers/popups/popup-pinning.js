@@ -12,8 +12,7 @@ class PopupPinning {
     if (found) return found;
     
     try {
-      const response = await fetch('/api/markers');
-      return response.ok ? (await response.json()).find(m => m.id === markerId) : null;
+      return (await MarkerSync.all() || []).find(m => m.id === markerId) || null;
     } catch (error) {
       console.warn('Error searching all maps for marker:', error);
       return null;
@@ -183,13 +183,15 @@ class PopupSavingSystem {
     this.isLoading = true;
     
     try {
-      const response = await fetch('/api/load-pinned-popups');
-      if (!response.ok) {
-        throw new Error(`Load failed: ${response.status}`);
+      let pinnedData = await Bootstrap.take("pinnedPopups");
+      if (!pinnedData) {
+        const response = await fetch('/api/load-pinned-popups');
+        if (!response.ok) {
+          throw new Error(`Load failed: ${response.status}`);
+        }
+        pinnedData = await response.json();
       }
       
-      const pinnedData = await response.json();
-      
       if (!pinnedData || pinnedData.length === 0) {
         return;
       }
@@ -305,11 +307,8 @@ class PopupSavingSystem {
       }
       
       try {
-        const response = await fetch('/api/markers');
-        if (response.ok) {
-          const allMarkers = await response.json();
-          return allMarkers.find(m => m.id === id);
-        }
+        const allMarkers = await MarkerSync.all() || [];
+        return allMarkers.find(m => m.id === id);
       } catch (error) {
         console.warn('Error searching all maps for marker:', error);
       }
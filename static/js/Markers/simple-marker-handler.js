@@ -79,10 +79,7 @@ class NewMarkerFileHandler {
   // This function fetches all markers from the server
   async loadMarkers() {
     try {
-      const response = await fetch("/api/markers");
-      const markers = await response.json();
-      
-      return markers;
+      return await MarkerSync.all() || [];
 
     } catch (error) {
       console.error('Load markers error:', error);
@@ -7,9 +7,9 @@ let currentMapPath = [];
 
 window.pinnedPopupsLoaded = false;
 
-// Loads map image sizes from the server for proper scaling
-fetch("/api/map-sizes")
-  .then(res => res.json())
+// Loads map image sizes from the server for proper scaling; the first map waits for these
+const mapSizesReady = Bootstrap.get("mapSizes")
+  .then(sizes => sizes || fetch("/api/map-sizes").then(res => res.json()))
   .then(sizes => mapImageSizes = sizes)
   .catch(err => console.error("Failed to load map sizes:", err));
 
@@ -18,11 +18,12 @@ document.addEventListener("DOMContentLoaded", async () => {
   const tabContainer = document.getElementById("map-tabs");
   
   try {
-    const maps = await fetch("/api/maps").then(res => res.json());
+    const maps = await Bootstrap.get("maps") || await fetch("/api/maps").then(res => res.json());
     if (!maps.length) return tabContainer.innerText = "No maps found.";
     allMaps = maps;
     const lastMap = localStorage.getItem("lastMapUsed");
     showMapTabs(maps, tabContainer);
+    await mapSizesReady;
     
     if (lastMap) {
       const mapData = findMapDataByPath(maps, lastMap);
@@ -62,21 +63,21 @@ function showMapTabs(maps, container) {
     if (item.type === "map") {
       const tab = Object.assign(document.createElement("img"), {
         className: "map-tab",
-        src: `/maps/${item.path}`,
+        src: item.thumbnail || `/maps/${item.path}`,
         alt: item.name,
         title: item.name
       });
       tab.addEventListener("click", () => loadMap(item.path));
       container.appendChild(tab);
     } else if (item.type === "folder") {
-      const firstMapPath = findFirstMap(item.maps);
+      const firstMapItem = findFirstMapItem(item.maps);
       const tabContainer = document.createElement("div");
       tabContainer.className = "map-tab folder-tab";
       tabContainer.style.position = "relative";
       tabContainer.title = `${item.name} (${item.mapCount} maps)`;
       
       const tab = Object.assign(document.createElement("img"), {
-        src: firstMapPath ? `/maps/${firstMapPath}` : '/data/assets/Unknown.png',
+        src: firstMapItem ? (firstMapItem.thumbnail || `/maps/${firstMapItem.path}`) : '/data/assets/Unknown.png',
         alt: item.name,
         style: "width: 100%; height: 100%; object-fit: cover;"
       });
@@ -133,10 +134,16 @@ function findMapDataByPath(maps, targetPath) {
 
 // Finds the first available map in a collection or folder
 function findFirstMap(maps) {
+  const firstMap = findFirstMapItem(maps);
+  return firstMap ? firstMap.path : null;
+}
+
+// Finds the first map entry (with its path and thumbnail) in a collection or folder
+function findFirstMapItem(maps) {
   for (const map of maps) {
-    if (map.type === "map") return map.path;
+    if (map.type === "map") return map;
     if (map.type === "folder") {
-      const nested = findFirstMap(map.maps);
+      const nested = findFirstMapItem(map.maps);
       if (nested) return nested;
     }
   }
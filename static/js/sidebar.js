@@ -19,7 +19,7 @@ class Sidebar {
 
   // Fetches category data from the server and builds the sidebar category tree
   async init() {
-    const data = await fetch("/api/categories").then(res => res.json());
+    const data = await Bootstrap.get("categories") || await fetch("/api/categories").then(res => res.json());
     this.renderCategoryTree(data);
   }
 
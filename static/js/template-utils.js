@@ -1,3 +1,45 @@
+// Fetches everything the first paint needs in one request; sections are handed out on demand
+const Bootstrap = {
+  request: null,
+  used: new Set(),
+
+  load() {
+    if (!this.request) {
+      const map = localStorage.getItem("lastMapUsed") || "";
+      this.request = fetch(`/api/bootstrap?map=${encodeURIComponent(map)}`)
+        .then(res => res.ok ? res.json() : null)
+        .catch(err => {
+          console.error("Failed to load bootstrap data:", err);
+          return null;
+        });
+    }
+    return this.request;
+  },
+
+  // Returns a section of the payload, or null so the caller falls back to its own request
+  async get(section) {
+    const data = await this.load();
+    return data && data[section] !== undefined ? data[section] : null;
+  },
+
+  // Like get, but only the first time, since these sections go stale once the user edits anything
+  async take(section) {
+    const value = await this.get(section);
+    if (value === null || this.used.has(section)) return null;
+    this.used.add(section);
+    return value;
+  },
+
+  // Like take, but only for the map the payload was built for
+  async takeForMap(section, mapName) {
+    const data = await this.load();
+    return data && data.map === mapName ? this.take(section) : null;
+  }
+};
+
+window.Bootstrap = Bootstrap;
+Bootstrap.load();
+
 const TemplateUtils = {
   // Replaces template placeholders with actual data values
   fillTemplate(template, data) {
@@ -10,8 +52,7 @@ const TemplateUtils = {
 
   // Loads multiple template files from URLs and returns them as an object
   async loadTemplates(templateUrls) {
-    const responses = await Promise.all(Object.values(templateUrls).map(url => fetch(url)));
-    const templateTexts = await Promise.all(responses.map(r => r.text()));
+    const templateTexts = await Promise.all(Object.values(templateUrls).map(url => this.fetchTemplate(url)));
     
     const templates = {};
     const urlKeys = Object.keys(templateUrls);
@@ -24,6 +65,13 @@ const TemplateUtils = {
     return templates;
   },
 
+  // Returns a template's HTML, preferring the copy that came with the bootstrap payload
+  async fetchTemplate(url) {
+    const templates = await Bootstrap.get("templates");
+    if (templates && templates[url] !== undefined) return templates[url];
+    return fetch(url).then(response => response.text());
+  },
+
   // Parses HTML text and extracts main content and template elements
   parseHTMLTemplate(htmlText) {
     const parser = new DOMParser();
@@ -0,0 +1,18 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The app's modules import each other by bare name, as they do when run from Main_Files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Main_Files"))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A test client for app.py serving an empty data folder under tmp_path"""
+    # app.py reads its data folder at import time
+    monkeypatch.setenv("ABIOTIC_MAPS_DATA_DIR", str(tmp_path))
+    os.makedirs(tmp_path / "app-data" / "maps" / "Facility", exist_ok=True)
+    app_module = importlib.reload(sys.modules["app"]) if "app" in sys.modules else importlib.import_module("app")
+    return app_module.app.test_client()
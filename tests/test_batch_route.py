@@ -0,0 +1,63 @@
+def batch(client, operations):
+    response = client.post("/api/markers/batch", json={"operations": operations})
+    assert response.status_code == 200
+    return response.get_json()
+
+def marker_ids(client, map_name):
+    return sorted(marker["id"] for marker in client.get(f"/api/markers?map={map_name}").get_json())
+
+
+def test_invalid_map_types_fail_only_their_own_operation(client):
+    result = batch(client, [
+        {"op": "create", "marker": {"id": 1, "map": "Facility", "x": 1, "y": 1}},
+        {"op": "create", "marker": {"id": 2, "map": 123}},
+        {"op": "update", "marker": {"id": 3, "map": ["Facility"]}},
+        {"op": "delete", "id": 1, "map": 5},
+        {"op": "create", "marker": {"id": 4, "map": "Facility", "x": 2, "y": 2}}
+    ])
+
+    assert [entry["status"] for entry in result["results"]] == ["saved", "error", "error", "error", "saved"]
+    assert all(entry["error"] == "map must be a string" for entry in result["results"][1:4])
+    assert result["failed"] == 3
+    assert result["success"] is False
+    assert marker_ids(client, "Facility") == [1, 4]
+
+def test_mixed_batch_reports_each_operation(client):
+    batch(client, [{"op": "create", "marker": {"id": 1, "map": "Facility", "x": 1, "y": 1}}])
+
+    result = batch(client, [
+        {"op": "create", "marker": {"id": 2, "map": "Facility", "x": 2, "y": 2}},
+        {"op": "create", "marker": {"id": 3}},
+        {"op": "move", "id": 1},
+        "not an operation",
+        {"op": "delete", "id": 99, "map": "Facility"},
+        {"op": "delete", "id": 1}
+    ])
+
+    statuses = [(entry["op"], entry["status"]) for entry in result["results"]]
+    assert statuses == [("create", "saved"), ("create", "error"), ("move", "error"),
+                        (None, "error"), ("delete", "error"), ("delete", "deleted")]
+    assert result["results"][1]["error"] == "Missing required field: map"
+    assert result["results"][4]["error"] == "Marker not found"
+    assert marker_ids(client, "Facility") == [2]
+
+def test_valid_batch_succeeds(client):
+    result = batch(client, [
+        {"op": "create", "marker": {"id": 1, "map": "Facility", "x": 1, "y": 1}},
+        {"op": "update", "marker": {"id": 1, "map": "Facility", "x": 5, "y": 5}},
+        {"op": "create", "marker": {"id": 2, "map": "Facility", "x": 2, "y": 2}},
+        {"op": "delete", "id": 2, "map": "Facility"}
+    ])
+
+    assert result == {"success": True, "failed": 0, "results": [
+        {"op": "create", "id": 1, "status": "saved"},
+        {"op": "update", "id": 1, "status": "saved"},
+        {"op": "create", "id": 2, "status": "saved"},
+        {"op": "delete", "id": 2, "status": "deleted"}
+    ]}
+    assert client.get("/api/markers?map=Facility").get_json() == [{"id": 1, "map": "Facility", "x": 5, "y": 5}]
+
+def test_operations_must_be_a_list(client):
+    response = client.post("/api/markers/batch", json={"operations": {"op": "create"}})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "operations must be an array"}
@@ -0,0 +1,92 @@
+import os
+import time
+
+from change_log import ChangeLog
+from marker_store import MarkerStore
+
+
+def map_file(root, folder="Map-0"):
+    return os.path.join(root, folder, "markers.txt")
+
+
+def test_sequence_continues_across_instances(tmp_path):
+    log_file, root = str(tmp_path / "changes.txt"), str(tmp_path)
+    first, second = ChangeLog(log_file, root), ChangeLog(log_file, root)
+
+    before = int(time.time() * 1000)
+    first.record("marker", map_file(root), [1, 2])
+    second.record("marker", map_file(root), [3])
+    first.record("pinnedPopups")
+
+    latest, entries = ChangeLog(log_file, root).since(first.latest() - 4)
+    assert [entry["seq"] for entry in entries] == list(range(latest - 3, latest + 1))
+    assert entries[0]["seq"] > before
+    assert [entry.get("key") for entry in entries] == [1, 2, 3, None]
+
+def test_since_resets_for_numbers_it_cannot_answer(tmp_path):
+    log = ChangeLog(str(tmp_path / "changes.txt"), str(tmp_path))
+    log.record("marker", map_file(str(tmp_path)), [1, 2])
+    latest = log.latest()
+
+    assert log.since(latest) == (latest, [])
+    assert log.since(latest + 1) == (latest, None)
+    assert log.since(latest - 10) == (latest, None)
+
+def test_newest_change_per_record_wins(tmp_path):
+    root = str(tmp_path)
+    log = ChangeLog(str(tmp_path / "changes.txt"), root)
+    log.record("marker", map_file(root, "A"), [1])
+    first = log.latest()
+    log.record("itemDetails", map_file(root, "A"), ["item"])
+    log.record("itemDetails", map_file(root, "B"), ["item"])
+    # Marker ids are unique across maps, so a marker moved to another map is still one record
+    log.record("marker", map_file(root, "B"), [1])
+
+    _, entries = log.since(first - 1)
+    assert [(entry["type"], entry["folder"]) for entry in entries] == [("itemDetails", "A"), ("itemDetails", "B"), ("marker", "B")]
+
+def test_torn_tail_is_skipped(tmp_path):
+    log_file, root = str(tmp_path / "changes.txt"), str(tmp_path)
+    reader = ChangeLog(log_file, root)
+    ChangeLog(log_file, root).record("marker", map_file(root), [1])
+    latest = reader.latest()
+    with open(log_file, "ab") as f:
+        f.write(b'{"seq": 999')
+
+    assert reader.latest() == latest
+    ChangeLog(log_file, root).record("marker", map_file(root), [2])
+    assert [entry["key"] for entry in reader.since(latest)[1]] == [2]
+
+def test_compaction_by_another_instance_is_picked_up(tmp_path):
+    log_file, root = str(tmp_path / "changes.txt"), str(tmp_path)
+    reader = ChangeLog(log_file, root, keep=3)
+    writer = ChangeLog(log_file, root, keep=3)
+    writer.record("marker", map_file(root), [1])
+    first = reader.latest()
+
+    writer.record("marker", map_file(root), list(range(2, 10)))
+    latest = writer.latest()
+    with open(log_file, "rb") as f:
+        assert len(f.read().splitlines()) == 3
+
+    assert reader.since(first) == (latest, None)
+    assert [entry["key"] for entry in reader.since(latest - 2)[1]] == [8, 9]
+
+def test_changes_since_across_two_store_instances(tmp_path):
+    log_file = str(tmp_path / "changes.txt")
+    marker_file = str(tmp_path / "Map-0" / "markers.txt")
+    os.makedirs(os.path.dirname(marker_file))
+    first = MarkerStore(compact_delay=3600, change_log=ChangeLog(log_file, str(tmp_path)))
+    second = MarkerStore(compact_delay=3600, change_log=ChangeLog(log_file, str(tmp_path)))
+
+    first.put(marker_file, {"id": 1, "x": 1, "y": 1})
+    seen = second.change_log.latest()
+    first.put(marker_file, {"id": 2, "x": 2, "y": 2})
+    first.delete(marker_file, 1)
+
+    latest, entries = second.change_log.since(seen)
+    assert latest == first.change_log.latest() == seen + 2
+    assert [(entry["key"], entry["folder"]) for entry in entries] == [(2, "Map-0"), (1, "Map-0")]
+    assert second.get_marker(marker_file, 1) is None
+    assert second.get_marker(marker_file, 2) == {"id": 2, "x": 2, "y": 2}
+    assert second.change_log.since(latest) == (latest, [])
@@ -0,0 +1,28 @@
+from drop_tables import split_drop_row, parse_quantity, parse_chance, drop_components
+
+
+def test_columns_are_recognised_in_any_order():
+    assert split_drop_row(["1-2", "Case Fan", "100%"]) == ("1-2", "Case Fan", "100%")
+    assert split_drop_row(["Case Fan", "50%", "3"]) == ("3", "Case Fan", "50%")
+    assert split_drop_row(["1", "25%"]) is None
+    assert split_drop_row("Case Fan") is None
+
+def test_quantities():
+    assert parse_quantity("2") == (2, 2)
+    assert parse_quantity("1 - 3") == (1, 3)
+    assert parse_quantity("3-1") == (1, 3)
+    assert parse_quantity("some") is None
+    assert parse_quantity("") is None
+
+def test_chance_tiers():
+    assert parse_chance("50%") == [(0.5, None)]
+    assert parse_chance(None) == [(1.0, None)]
+    assert parse_chance("100% of 1\n50% of 2\nrare") == [(1.0, (1, 1)), (0.5, (2, 2))]
+
+def test_later_tiers_add_on_top_of_the_first():
+    assert drop_components(["1-2", "Refined Carbon", "100% of 1\n50% of 2"]) == [
+        ("Refined Carbon", 1, 1, 1.0),
+        ("Refined Carbon", 1, 1, 0.5)
+    ]
+    assert drop_components(["1-2", "Case Fan", "25%"]) == [("Case Fan", 1, 2, 0.25)]
+    assert drop_components([]) == []
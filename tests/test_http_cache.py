@@ -0,0 +1,100 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify, request
+
+import http_cache
+from http_cache import COMPRESSED_CACHE_SIZE, compress, finalize_response, set_immutable, versioned_etag
+
+BIG = {"markers": [{"id": n, "name": f"Marker {n}"} for n in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route("/big")
+    def big():
+        return jsonify(BIG)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        return app.response_class((json.dumps(marker) + "\n" for marker in BIG["markers"]), mimetype="application/x-ndjson")
+
+    @app.route("/image")
+    def image():
+        return app.response_class(b"\x89PNG" * 1000, mimetype="image/png")
+
+    @app.after_request
+    def after(response):
+        return finalize_response(response, request)
+
+    return app.test_client()
+
+
+def test_json_gets_an_etag_and_answers_304(client):
+    response = client.get("/small")
+    etag = response.headers["ETag"]
+    assert response.cache_control.no_cache
+
+    again = client.get("/small", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+def test_large_json_is_gzipped_with_a_weak_etag(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data)) == BIG
+    assert response.headers["ETag"].startswith('W/"')
+
+    # The weak tag still validates, with or without compression
+    assert client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert client.get("/big", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_small_identity_and_binary_responses_are_left_alone(client):
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+
+    plain = client.get("/big")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_json() == BIG
+    assert not plain.headers["ETag"].startswith("W/")
+
+def test_streams_are_gzipped_chunk_by_chunk(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert [json.loads(line) for line in lines] == BIG["markers"]
+
+def test_brotli_is_preferred_when_installed(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == ("br" if http_cache.brotli is not None else "gzip")
+
+
+def test_compressed_bodies_are_reused_per_etag(monkeypatch):
+    monkeypatch.setattr(http_cache, "_compressed", http_cache.OrderedDict())
+    data = json.dumps(BIG).encode()
+    first = compress(data, "gzip", "etag-1")
+    assert compress(data, "gzip", "etag-1") is first
+    assert compress(data, "gzip") is not first
+
+    for n in range(COMPRESSED_CACHE_SIZE):
+        compress(data, "gzip", f"other-{n}")
+    assert len(http_cache._compressed) == COMPRESSED_CACHE_SIZE
+    assert ("etag-1", "gzip") not in http_cache._compressed
+
+def test_versioned_etag_follows_its_parts():
+    assert versioned_etag("markers", "a.txt", 1) == versioned_etag("markers", "a.txt", 1)
+    assert versioned_etag("markers", "a.txt", 1) != versioned_etag("markers", "a.txt", 2)
+
+def test_set_immutable():
+    response = set_immutable(Flask(__name__).response_class(b""))
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == http_cache.IMMUTABLE_MAX_AGE
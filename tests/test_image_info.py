@@ -0,0 +1,73 @@
+import os
+import struct
+
+import pytest
+
+import image_info
+from image_info import ImageSizeCache, read_image_size
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x02\x00\x00\x00" + b"\x00" * 16
+
+def jpeg(width, height, sof=0xC0):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    dht = b"\xff\xc4" + struct.pack(">H", 5) + b"\x00\x00\x00"
+    frame = bytes([0xFF, sof]) + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + dht + frame + b"\xff\xd9"
+
+
+@pytest.mark.parametrize("name, data, size", [
+    ("map.png", png(2048, 1536), [2048, 1536]),
+    ("map.gif", b"GIF89a" + struct.pack("<HH", 640, 480) + b"\x00" * 24, [640, 480]),
+    ("map.jpg", jpeg(1920, 1080), [1920, 1080]),
+    ("progressive.jpg", jpeg(300, 200, sof=0xC2), [300, 200]),
+    ("lossy.webp", b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 10 + struct.pack("<HH", 800, 600) + b"\x00" * 4, [800, 600]),
+    ("lossless.webp", b"RIFF\x00\x00\x00\x00WEBPVP8L" + b"\x00" * 5 + ((1023) | (767 << 14)).to_bytes(4, "little") + b"\x00" * 7,
+     [1024, 768]),
+    ("extended.webp", b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + (4095).to_bytes(3, "little") + (2999).to_bytes(3, "little") + b"\x00" * 2,
+     [4096, 3000]),
+])
+def test_sizes_are_read_from_the_header(tmp_path, name, data, size):
+    assert read_image_size(write(tmp_path, name, data)) == size
+
+@pytest.mark.parametrize("data", [b"not an image", b"\xff\xd8\xff\xe0\x00", b"RIFF\x00\x00\x00\x00WEBPVP8Z" + b"\x00" * 20, b""])
+def test_unknown_or_truncated_headers_give_none(tmp_path, data):
+    assert read_image_size(write(tmp_path, "broken.png", data)) is None
+
+@pytest.mark.parametrize("image_format, extension", [("JPEG", "jpg"), ("WEBP", "webp"), ("PNG", "png"), ("GIF", "gif")])
+def test_sizes_match_pillow(tmp_path, image_format, extension):
+    Image = pytest.importorskip("PIL.Image")
+    path = str(tmp_path / f"map.{extension}")
+    Image.new("RGB", (333, 217), (40, 60, 80)).save(path, image_format)
+    assert read_image_size(path) == [333, 217]
+
+
+def test_cache_is_persisted_and_invalidated_by_file_changes(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "cache" / "image-sizes.json")
+    image = write(tmp_path, "map.png", png(100, 50))
+
+    cache = ImageSizeCache(cache_file)
+    assert cache.get(image, key="Map/map.png") == [100, 50]
+    cache.save()
+
+    # A fresh cache answers from the saved file without reading the image again
+    reads = []
+    monkeypatch.setattr(image_info, "read_image_size", lambda path: reads.append(path) or read_image_size(path))
+    assert ImageSizeCache(cache_file).get(image, key="Map/map.png") == [100, 50]
+    assert reads == []
+
+    write(tmp_path, "map.png", png(200, 100) + b"\x00")
+    assert ImageSizeCache(cache_file).get(image, key="Map/map.png") == [200, 100]
+    assert reads == [image]
+
+def test_missing_file_is_not_cached(tmp_path):
+    cache = ImageSizeCache(str(tmp_path / "image-sizes.json"))
+    assert cache.get(str(tmp_path / "missing.png")) is None
+    cache.save()
+    assert not os.path.exists(tmp_path / "image-sizes.json")
@@ -0,0 +1,67 @@
+import os
+import json
+
+from image_store import ImageStore, INDEX_FILE, is_internal_file
+
+
+def read_index(images_folder):
+    with open(os.path.join(images_folder, INDEX_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+def image_files(images_folder):
+    return sorted(name for name in os.listdir(images_folder) if not is_internal_file(name))
+
+
+def test_same_bytes_are_stored_once(tmp_path):
+    images_folder = str(tmp_path / "images")
+    store = ImageStore()
+    first = store.add(images_folder, [b"same ", b"bytes"], "png")
+    # Chunk boundaries do not matter, only the content
+    second = store.add(images_folder, [b"same bytes"], "png")
+    other = store.add(images_folder, [b"other bytes"], "png")
+
+    assert first == second != other
+    assert image_files(images_folder) == sorted([first, other])
+    assert read_index(images_folder) == {first: 2, other: 1}
+
+def test_file_is_deleted_on_the_last_release(tmp_path):
+    images_folder = str(tmp_path / "images")
+    store = ImageStore()
+    filename = store.add(images_folder, [b"shared"], "png")
+    store.add(images_folder, [b"shared"], "png")
+
+    assert store.release(images_folder, filename)
+    assert image_files(images_folder) == [filename]
+    assert read_index(images_folder) == {filename: 1}
+
+    assert store.release(images_folder, filename)
+    assert image_files(images_folder) == []
+    assert read_index(images_folder) == {}
+    assert not store.release(images_folder, filename)
+
+def test_untracked_files_count_as_one_reference(tmp_path):
+    images_folder = tmp_path / "images"
+    images_folder.mkdir()
+    (images_folder / "0b7c4f3e-uuid.png").write_bytes(b"from before the index")
+
+    assert ImageStore().release(str(images_folder), "0b7c4f3e-uuid.png")
+    assert image_files(str(images_folder)) == []
+
+def test_bookkeeping_files_are_never_released(tmp_path):
+    images_folder = str(tmp_path / "images")
+    store = ImageStore()
+    store.add(images_folder, [b"image"], "png")
+
+    assert not store.release(images_folder, INDEX_FILE)
+    assert not store.release(images_folder, "partial.upload")
+    assert os.path.exists(os.path.join(images_folder, INDEX_FILE))
+
+def test_release_later_deletes_in_the_background(tmp_path):
+    images_folder = str(tmp_path / "images")
+    store = ImageStore()
+    filenames = [store.add(images_folder, [data], "png") for data in (b"a", b"b")]
+
+    store.release_later(images_folder, filenames)
+    store._release_queue.join()
+
+    assert image_files(images_folder) == []
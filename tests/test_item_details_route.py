@@ -0,0 +1,37 @@
+import base64
+
+
+def upload(client, data):
+    response = client.post("/api/upload-image?map=Facility", json={"imageData": base64.b64encode(data).decode(), "fileExtension": "png"})
+    return f"/api/map-images/Facility/{response.get_json()['imagePath']}"
+
+def wait_for_releases():
+    import app
+    app.image_store._release_queue.join()
+
+def image_exists(client, image_url):
+    return client.get(image_url).status_code == 200
+
+
+def test_delete_item_releases_its_images(client):
+    kept, shared = upload(client, b"kept"), upload(client, b"shared")
+    client.put("/api/item-details/1_a?map=Facility", json={"name": "A", "additionalImage": f"{kept},{shared}"})
+    # Uploading the same bytes again for another item adds a second reference
+    assert upload(client, b"shared") == shared
+    client.put("/api/item-details/2_b?map=Facility", json={"name": "B", "additionalImage": shared})
+
+    assert client.delete("/api/item-details/1_a?map=Facility").get_json() == {"success": True}
+    wait_for_releases()
+
+    assert not image_exists(client, kept)
+    assert image_exists(client, shared)
+    assert client.get("/api/item-details/1_a?map=Facility").status_code == 404
+
+def test_delete_missing_item_releases_nothing(client):
+    image = upload(client, b"image")
+    client.put("/api/item-details/1_a?map=Facility", json={"name": "A", "additionalImage": image})
+
+    assert client.delete("/api/item-details/2_b?map=Facility").status_code == 404
+    wait_for_releases()
+
+    assert image_exists(client, image)
@@ -0,0 +1,44 @@
+import json
+
+from change_log import ChangeLog
+from item_details_store import ItemDetailsStore
+
+
+def read(details_file):
+    with open(details_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_edits_are_written_behind_in_one_rewrite(tmp_path):
+    details_file = tmp_path / "item-details.json"
+    store = ItemDetailsStore(write_delay=3600)
+    store.upsert(str(details_file), "a", {"name": "Case Fan", "width": 100})
+    store.upsert(str(details_file), "a", {"width": 120})
+    store.upsert(str(details_file), "b", {"name": "Tech Scrap"})
+
+    assert not details_file.exists()
+    assert store.get_item(str(details_file), "a") == {"name": "Case Fan", "width": 120}
+
+    store.flush()
+    assert read(details_file) == {"a": {"name": "Case Fan", "width": 120}, "b": {"name": "Tech Scrap"}}
+
+def test_write_through_is_seen_by_another_store(tmp_path):
+    details_file = str(tmp_path / "item-details.json")
+    reader = ItemDetailsStore(write_delay=0)
+    assert reader.get(details_file) == {}
+
+    ItemDetailsStore(write_delay=0).upsert(details_file, "a", {"name": "Case Fan"}, merge=False)
+    assert reader.get(details_file) == {"a": {"name": "Case Fan"}}
+
+def test_only_changed_items_are_logged(tmp_path):
+    details_file = str(tmp_path / "Map-0" / "item-details.json")
+    log = ChangeLog(str(tmp_path / "changes.txt"), str(tmp_path))
+    store = ItemDetailsStore(write_delay=0, change_log=log)
+    store.replace(details_file, {"a": {"name": "Case Fan"}, "b": {"name": "Tech Scrap"}})
+    seen = log.latest()
+
+    store.replace(details_file, {"a": {"name": "Case Fan"}, "c": {"name": "Duct Tape"}})
+    store.delete(details_file, ["missing"])
+
+    _, entries = log.since(seen)
+    assert [(entry["folder"], entry["key"]) for entry in entries] == [("Map-0", "b"), ("Map-0", "c")]
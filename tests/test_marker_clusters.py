@@ -0,0 +1,88 @@
+import random
+
+from marker_clusters import ClusterCache, MapClusters, REGION_SIZE, MIN_ZOOM, MAX_ZOOM
+from marker_store import MarkerStore
+
+
+def marker(marker_id, x, y, category="Tools"):
+    return {"id": marker_id, "x": x, "y": y, "entries": [{"category": category}]}
+
+def memberships(clusters):
+    return sorted(sorted(cluster["markerIds"]) for cluster in clusters)
+
+def fresh(markers):
+    state = MapClusters()
+    state.update(1, markers)
+    return state
+
+def summary(state, zoom):
+    return sorted((sorted(c["markerIds"]), round(c["x"], 6), round(c["y"], 6), c["count"]) for c in state.clusters(zoom))
+
+
+def test_markers_across_a_region_edge_merge_at_every_zoom():
+    state = fresh([marker(100, REGION_SIZE - 0.5, 5), marker(101, REGION_SIZE + 0.5, 5)])
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+        assert memberships(state.clusters(zoom)) == [[100, 101]]
+    assert memberships(state.clusters(MAX_ZOOM + 1)) == [[100], [101]]
+
+def test_markers_around_a_region_corner_merge():
+    corner = REGION_SIZE
+    state = fresh([marker(1, corner - 1, corner - 1), marker(2, corner + 1, corner - 1),
+                   marker(3, corner - 1, corner + 1), marker(4, corner + 1, corner + 1)])
+    cluster, = state.clusters(0)
+    assert sorted(cluster["markerIds"]) == [1, 2, 3, 4]
+    assert (cluster["x"], cluster["y"]) == (corner, corner)
+
+def test_distant_markers_on_either_side_of_an_edge_stay_apart():
+    state = fresh([marker(1, REGION_SIZE - 2, 5, "Tools"), marker(2, REGION_SIZE + 2, 5, "Farming")])
+    assert memberships(state.clusters(MAX_ZOOM)) == [[1], [2]]
+    cluster, = state.clusters(MIN_ZOOM)
+    assert cluster["categories"] == ["Farming", "Tools"]
+
+def test_every_marker_is_in_exactly_one_cluster_per_zoom():
+    rng = random.Random(3)
+    markers = [marker(i, rng.uniform(0, 3 * REGION_SIZE), rng.uniform(0, 2 * REGION_SIZE)) for i in range(2000)]
+    state = fresh(markers)
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 2):
+        clusters = state.clusters(zoom)
+        assert sorted(i for cluster in clusters for i in cluster["markerIds"]) == list(range(2000))
+        assert sum(cluster["count"] for cluster in clusters) == 2000
+
+def test_incremental_update_matches_a_full_rebuild():
+    rng = random.Random(7)
+    markers = {i: marker(i, rng.uniform(0, 3 * REGION_SIZE), rng.uniform(0, 2 * REGION_SIZE)) for i in range(1500)}
+    state = MapClusters()
+    state.update(1, list(markers.values()))
+
+    for i in rng.sample(sorted(markers), 40):
+        markers[i] = marker(i, rng.uniform(0, 3 * REGION_SIZE), rng.uniform(0, 2 * REGION_SIZE))
+    for i in rng.sample(sorted(markers), 20):
+        del markers[i]
+    markers[5000] = marker(5000, REGION_SIZE, REGION_SIZE)
+    assert 0 < state.update(2, list(markers.values())) <= 6
+
+    rebuilt = fresh(list(markers.values()))
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 2):
+        assert summary(state, zoom) == summary(rebuilt, zoom)
+
+def test_update_without_changes_reclusters_nothing():
+    markers = [marker(1, 10, 10), marker(2, 12, 10)]
+    state = fresh(markers)
+    assert state.update(2, markers) == 0
+
+def test_bbox_limits_the_clusters():
+    state = fresh([marker(1, 10, 10), marker(2, 500, 500)])
+    assert memberships(state.clusters(MAX_ZOOM, (0, 0, 100, 100))) == [[1]]
+
+def test_cache_follows_the_marker_store(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = MarkerStore(compact_delay=3600)
+    cache = ClusterCache(store)
+    store.put(marker_file, marker(1, 10, 10))
+    store.put(marker_file, marker(2, 11, 10))
+    assert memberships(cache.get(marker_file, 0)) == [[1, 2]]
+
+    store.put(marker_file, marker(2, 400, 10))
+    assert memberships(cache.get(marker_file, 0)) == [[1], [2]]
+    store.delete(marker_file, 1)
+    assert memberships(cache.get(marker_file, 0.4)) == [[2]]
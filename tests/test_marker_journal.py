@@ -0,0 +1,73 @@
+import os
+import json
+
+from marker_store import MarkerStore, JOURNAL_SUFFIX, FORMAT_HEADER
+
+
+def marker(marker_id, x=10, y=20):
+    return {"id": marker_id, "map": "Map-0/Map-0.png", "x": x, "y": y, "entries": []}
+
+def make_store(**kwargs):
+    # Keep the background compaction from folding the journal away mid-test
+    return MarkerStore(compact_delay=3600, **kwargs)
+
+def marker_ids(marker_file):
+    """Ids as a freshly started process would load them"""
+    return sorted(m["id"] for m in make_store().get_markers(marker_file))
+
+
+def test_journal_replays_into_a_new_store(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    store.put(marker_file, marker(1))
+    store.put(marker_file, marker(2))
+    store.delete(marker_file, 1)
+
+    assert os.path.exists(marker_file + JOURNAL_SUFFIX)
+    assert marker_ids(marker_file) == [2]
+
+def test_torn_append_is_skipped_and_later_appends_survive(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    make_store().put(marker_file, marker(1))
+    with open(marker_file + JOURNAL_SUFFIX, "ab") as f:
+        f.write(b'{"op": "put", "marker": {"id": 2')
+
+    assert marker_ids(marker_file) == [1]
+    make_store().put(marker_file, marker(3))
+    assert marker_ids(marker_file) == [1, 3]
+
+def test_compaction_folds_the_journal_into_markers_txt(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    store.put(marker_file, marker(1))
+    store.put(marker_file, marker(2))
+    store.compact(marker_file)
+
+    assert not os.path.exists(marker_file + JOURNAL_SUFFIX)
+    with open(marker_file, encoding="utf-8") as f:
+        assert json.loads(f.readline()) == FORMAT_HEADER
+    assert marker_ids(marker_file) == [1, 2]
+
+def test_update_keeps_the_marker_in_place(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    for marker_id in (1, 2, 3):
+        store.put(marker_file, marker(marker_id))
+    store.put(marker_file, marker(2, x=99))
+    store.compact(marker_file)
+
+    assert [(m["id"], m["x"]) for m in store.get_markers(marker_file)] == [(1, 10), (2, 99), (3, 10)]
+    assert [(m["id"], m["x"]) for m in make_store().get_markers(marker_file)] == [(1, 10), (2, 99), (3, 10)]
+
+def test_files_edited_outside_the_app_are_reloaded(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    store.put(marker_file, marker(1))
+    store.compact(marker_file)
+    assert [m["id"] for m in store.get_markers(marker_file)] == [1]
+
+    with open(marker_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(json.dumps(line) for line in [FORMAT_HEADER, marker(5), marker(6)]) + "\n")
+
+    assert [m["id"] for m in store.get_markers(marker_file)] == [5, 6]
+    assert store.get_marker(marker_file, 1) is None
@@ -0,0 +1,94 @@
+import os
+import json
+
+from marker_store import MarkerStore, JOURNAL_SUFFIX, FORMAT_HEADER
+
+
+def marker(marker_id, x=10, y=20):
+    return {"id": marker_id, "map": "Map-0/Map-0.png", "x": x, "y": y, "entries": []}
+
+def make_store(**kwargs):
+    # Keep the background compaction from folding the journal away mid-test
+    return MarkerStore(compact_delay=3600, **kwargs)
+
+def marker_ids(marker_file):
+    """Ids as a freshly started process would load them"""
+    return sorted(m["id"] for m in make_store().get_markers(marker_file))
+
+
+def test_batch_is_one_journal_record(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    store.put(marker_file, marker(1))
+    store.apply_batch([(marker_file, "put", marker(2)), (marker_file, "put", marker(3)), (None, "delete", 1)])
+
+    with open(marker_file + JOURNAL_SUFFIX, "rb") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 2
+    assert marker_ids(marker_file) == [2, 3]
+
+def test_torn_batch_is_dropped_as_a_whole(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    store.put(marker_file, marker(1))
+    store.apply_batch([(marker_file, "put", marker(2)), (marker_file, "put", marker(3)), (marker_file, "delete", 1)])
+
+    journal_file = marker_file + JOURNAL_SUFFIX
+    with open(journal_file, "rb") as f:
+        single, batch = f.read().splitlines()
+    with open(journal_file, "wb") as f:
+        f.write(single + b"\n" + batch[:len(batch) // 2])
+
+    assert marker_ids(marker_file) == [1]
+
+def test_legacy_markers_are_upgraded_once(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    with open(marker_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(marker(1, x=100, y=50)) + "\n")
+
+    def upgrade(m):
+        return dict(m, x=m["x"] * 2, y=m["y"] * 2)
+
+    for _ in range(2):
+        markers = make_store(upgrade_legacy_marker=upgrade).get_markers(marker_file)
+        assert [(m["x"], m["y"]) for m in markers] == [(200, 100)]
+
+def test_legacy_file_waits_until_every_marker_can_be_upgraded(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    with open(marker_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(marker(1, x=100, y=50)) + "\n")
+    image_size = {}
+
+    def upgrade(m):
+        return dict(m, x=m["x"] * 2, y=m["y"] * 2) if image_size else None
+
+    store = make_store(upgrade_legacy_marker=upgrade)
+    store.put(marker_file, marker(2, x=7, y=7))
+    store.compact(marker_file)
+    with open(marker_file, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [marker(1, x=100, y=50)]
+    assert os.path.exists(marker_file + JOURNAL_SUFFIX)
+
+    image_size["known"] = True
+    store.compact(marker_file)
+    with open(marker_file, encoding="utf-8") as f:
+        header, *markers = [json.loads(line) for line in f]
+    assert header == FORMAT_HEADER
+    assert {m["id"]: (m["x"], m["y"]) for m in markers} == {1: (200, 100), 2: (7, 7)}
+
+def test_bbox_query_keeps_file_order_under_a_limit(tmp_path):
+    marker_file = str(tmp_path / "markers.txt")
+    store = make_store()
+    # Spread over many grid cells, in an order unrelated to their position
+    for marker_id, x in enumerate([900, 10, 500, 300, 700, 100, 5000]):
+        store.put(marker_file, marker(marker_id, x=x, y=x % 400))
+    store.put(marker_file, marker(2, x=20, y=20))
+    store.delete(marker_file, 3)
+
+    box = (0, 0, 1000, 1000)
+    assert [m["id"] for m in store.query_bbox(marker_file, box)] == [0, 1, 2, 4, 5]
+    assert [m["id"] for m in store.query_bbox(marker_file, box, limit=3)] == [0, 1, 2]
+    # The same first matches as a store reading the files from scratch
+    assert [m["id"] for m in make_store().query_bbox(marker_file, box, limit=3)] == [0, 1, 2]
+    assert store.query_bbox(marker_file, box, limit=0) == []
+    assert [m["id"] for m in store.query_bbox(marker_file, (4000, 0, 6000, 1000))] == [6]
@@ -0,0 +1,81 @@
+from search_index import SearchIndex, item_details_documents, marker_documents, preset_documents, tokenize
+
+
+PRESETS = [
+    {"item": "Case Fan", "image": "fan.png", "Drops": [["1-2", "Tech Scrap", "50%"]]},
+    {"item": "Tech Scrap", "Recipe": "Salvaged from electronics"},
+    {"item": "Duct Tape"},
+    {"image": "nameless.png"}
+]
+
+def make_index():
+    index = SearchIndex()
+    index.update_source("presets/Loose Items", 1, lambda: preset_documents("Loose Items", PRESETS))
+    return index
+
+def names(results):
+    return [result.get("item") or result.get("name") for result in results]
+
+
+def test_tokens_are_lowercase_words():
+    assert tokenize("Case-Fan (MK2), x10!") == ["case", "fan", "mk2", "x10"]
+
+def test_exact_matches_rank_above_prefix_and_field_matches():
+    index = make_index()
+    # "Tech Scrap" is an item name in one preset and a drop in another, which weighs less
+    assert names(index.search("tech scrap")) == ["Tech Scrap", "Case Fan"]
+    assert names(index.search("scr")) == ["Tech Scrap", "Case Fan"]
+    assert index.search("tech scrap")[0]["score"] > index.search("scr")[0]["score"]
+
+def test_every_query_token_must_match():
+    index = make_index()
+    assert names(index.search("case fan")) == ["Case Fan"]
+    assert index.search("case tape") == []
+    assert index.search("!!!") == []
+
+def test_fuzzy_matching_can_be_turned_off():
+    index = make_index()
+    assert names(index.search("duckt tape")) == ["Duct Tape"]
+    assert index.search("duckt tape", fuzzy=False) == []
+
+def test_source_is_only_rebuilt_when_its_version_changes():
+    index = make_index()
+    calls = []
+
+    def documents():
+        calls.append(1)
+        return preset_documents("Loose Items", [{"item": "Wrench"}])
+
+    index.update_source("presets/Loose Items", 1, documents)
+    assert calls == []
+    assert names(index.search("wrench")) == []
+
+    index.update_source("presets/Loose Items", 2, documents)
+    assert calls == [1]
+    assert names(index.search("wrench")) == ["Wrench"]
+    # The old documents and their tokens are gone
+    assert index.search("case") == []
+    assert "case" not in index._postings
+
+def test_retain_sources_drops_deleted_files_and_types_filter():
+    index = make_index()
+    markers = [{"id": 7, "map": "Map-0/Map-0.png", "name": "Fan stash", "x": 1, "y": 2,
+                "entries": [{"items": [{"itemname": "Case Fan"}]}]}]
+    index.update_source("markers/Map-0", 1, lambda: marker_documents("Map-0/markers.txt", markers))
+    index.update_source("details/Map-0", 1, lambda: item_details_documents("Map-0", {"7_Case_Fan": {"name": "Case Fan", "notes": "Behind the desk"}}))
+
+    assert sorted(result["type"] for result in index.search("case fan")) == ["itemDetails", "marker", "preset"]
+    assert [result["markerId"] for result in index.search("fan", types={"marker"})] == [7]
+    assert [result["itemKey"] for result in index.search("desk")] == ["7_Case_Fan"]
+
+    index.retain_sources({"presets/Loose Items"})
+    assert [result["type"] for result in index.search("case fan")] == ["preset"]
+
+def test_limit_keeps_the_best_results():
+    index = SearchIndex()
+    entries = [{"item": f"Bolt {n}"} for n in range(30)]
+    index.update_source("presets/Bolts", 1, lambda: preset_documents("Bolts", entries))
+
+    results = index.search("bolt", limit=5)
+    assert len(results) == 5
+    assert len(index.search("bolt")) == 20
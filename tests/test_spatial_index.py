@@ -0,0 +1,55 @@
+import random
+
+from spatial_index import GridIndex, marker_point
+
+
+def brute_force(points, box):
+    min_x, min_y, max_x, max_y = box
+    return {key for key, (x, y) in points.items() if min_x <= x <= max_x and min_y <= y <= max_y}
+
+
+def test_query_matches_a_linear_scan():
+    rng = random.Random(7)
+    grid = GridIndex(cell_size=50)
+    points = {key: (rng.uniform(-500, 1500), rng.uniform(-500, 1500)) for key in range(2000)}
+    for key, point in points.items():
+        grid.insert(key, point)
+
+    for _ in range(50):
+        x, y = rng.uniform(-600, 1500), rng.uniform(-600, 1500)
+        box = (x, y, x + rng.uniform(0, 800), y + rng.uniform(0, 800))
+        assert set(grid.query(*box)) == brute_force(points, box)
+    # Larger than the occupied grid, so answered from the occupied cells
+    assert set(grid.query(-10 ** 6, -10 ** 6, 10 ** 6, 10 ** 6)) == set(points)
+
+def test_box_edges_and_cell_borders_are_inclusive():
+    grid = GridIndex(cell_size=64)
+    grid.insert("corner", (64, 128))
+    grid.insert("negative", (-64, -0.5))
+
+    assert list(grid.query(0, 0, 64, 128)) == ["corner"]
+    assert list(grid.query(64, 128, 100, 200)) == ["corner"]
+    assert list(grid.query(-64, -1, -64, 0)) == ["negative"]
+    assert list(grid.query(65, 0, 100, 200)) == []
+
+def test_insert_moves_and_remove_forgets():
+    grid = GridIndex(cell_size=10)
+    grid.insert("a", (5, 5))
+    grid.insert("a", (500, 500))
+    assert list(grid.query(0, 0, 10, 10)) == []
+    assert list(grid.query(495, 495, 505, 505)) == ["a"]
+
+    grid.insert("a", None)
+    assert list(grid.query(495, 495, 505, 505)) == []
+
+    grid.insert("b", (1, 1))
+    grid.remove("b")
+    grid.remove("missing")
+    assert list(grid.query(0, 0, 10, 10)) == []
+    assert grid._cells == {}
+
+def test_marker_point_needs_numeric_coordinates():
+    assert marker_point({"x": 1, "y": 2.5}) == (1, 2.5)
+    assert marker_point({"x": "1", "y": 2}) is None
+    assert marker_point({"x": True, "y": 2}) is None
+    assert marker_point({"y": 2}) is None